@@ -0,0 +1,142 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import json
+import multiprocessing
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import time
+
+# The benchmarks import the project the same way its scripts do.
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src"))
+
+from benchmarks.stages import STAGES, measure_stage
+
+DEFAULT_SIZES = [100, 1000, 10000]
+RESULTS_PATH = "benchmarks/results"
+
+
+def run_benchmarks(stages: list[str], sizes: list[int]) -> list[dict]:
+    results = []
+    for size in sizes:
+        for stage in stages:
+            # A fresh process per stage, so its peak memory is its own.
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result = executor.submit(measure_stage, stage, size).result()
+            print(format_result(result))
+            results.append(result)
+    return results
+
+
+def format_result(result: dict) -> str:
+    line = (
+        f"{result['stage']:<20} {result['size']:>6} cards  "
+        f"{result['throughput']:>10.1f}/s  "
+        f"p50 {result['p50_ms']:>8.3f}ms  p99 {result['p99_ms']:>8.3f}ms  "
+        f"peak RSS {result['peak_rss_mb']:>7.1f}MB"
+    )
+    if "kb_per_item" in result:
+        line += f"  {result['kb_per_item']:.1f}KB each"
+    if "bytes_per_card" in result:
+        line += f"  {result['bytes_per_card']:.0f}B per card"
+    return line
+
+
+def get_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare_results(base_path: str, new_path: str):
+    with open(base_path) as f:
+        base = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+
+    base_results = {(r["stage"], r["size"]): r for r in base["results"]}
+    print(f"{base['commit']} -> {new['commit']}")
+    for result in new["results"]:
+        base_result = base_results.get((result["stage"], result["size"]))
+        if base_result is None or not base_result["throughput"]:
+            continue
+
+        speedup = result["throughput"] / base_result["throughput"]
+        # Print faster stages in green, and slower ones in red.
+        color = "\033[92m" if speedup >= 1 else "\033[91m"
+        print(
+            f"{result['stage']:<20} {result['size']:>6} cards  "
+            f"{color}{speedup:>6.2f}x\033[0m  "
+            f"p99 {base_result['p99_ms']:.3f}ms -> {result['p99_ms']:.3f}ms"
+        )
+
+
+def main():
+    argparser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmark the generation and rendering hot paths.",
+    )
+    argparser.add_argument(
+        "--stages",
+        nargs="+",
+        choices=list(STAGES),
+        default=list(STAGES),
+        help="Which stages to benchmark (default: all).",
+    )
+    argparser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=int,
+        default=DEFAULT_SIZES,
+        help="Synthetic collection sizes to benchmark, in cards.",
+    )
+    argparser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Where to save the results (default: benchmarks/results/<commit>.json).",
+    )
+    argparser.add_argument(
+        "--compare",
+        nargs=2,
+        metavar=("BASE", "NEW"),
+        help="Compare two saved results instead of running the benchmarks.",
+    )
+    args = argparser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    commit = get_commit()
+    results = run_benchmarks(args.stages, args.sizes)
+
+    output_path = args.output or f"{RESULTS_PATH}/{commit}.json"
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(
+            {
+                "commit": commit,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Saved results to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,355 @@
+from collections import Counter
+from contextlib import contextmanager, redirect_stdout
+from functools import partial
+import io
+import json
+import os
+import pathlib
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from PIL import Image
+import render_cards
+from benchmarks.synthetic import (
+    load_gallery_cards,
+    synthetic_cards,
+    synthetic_collection,
+    write_synthetic_art,
+)
+from mechanics.card_table import CardTable
+from pokemon_content.pokemon_elements import PokemonElements
+from pokemon_content.pokemon_rarity import PokemonRarity
+from pokemon_content.pokemon_stats import generate_card_stats, simulate_card_layout
+from rendering.art_cache import use_art_cache
+from rendering.card_source import load_card_table
+from rendering.render_assets import render_assets
+from rendering.render_format import RenderFormat
+from util.ability_name_library import (
+    AbilityNameStore,
+    draw_ability_name,
+    get_all_abilities,
+)
+from util.fake_gpt_call import use_fake_gpt_client
+
+
+@contextmanager
+def working_directory(path: str):
+    previous_path = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous_path)
+
+
+def timed(fn, items) -> list[float]:
+    latencies = []
+    for item in items:
+        start_time = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - start_time)
+    return latencies
+
+
+def bench_render_card(n_cards: int) -> tuple[int, list[float]]:
+    cards = synthetic_cards(n_cards)
+    assets = render_cards.warm_render_assets(render_assets())
+    with tempfile.TemporaryDirectory() as collection_path:
+        write_synthetic_art(collection_path, cards)
+        use_art_cache(f"{collection_path}/art_cache")
+        latencies = timed(
+            lambda card: render_cards.render_card(card, collection_path, assets), cards
+        )
+    return len(cards), latencies
+
+
+# Art that is already card-sized, so the card_base stages mostly time the compositing.
+CARD_READY_ART_SIZE = (render_cards.IDEAL_CARD_WIDTH, 218)
+
+
+def bench_card_base(n_cards: int) -> tuple[int, list[float]]:
+    cards = synthetic_cards(n_cards)
+    assets = render_cards.warm_render_assets(render_assets())
+    with tempfile.TemporaryDirectory() as collection_path:
+        write_synthetic_art(collection_path, cards, CARD_READY_ART_SIZE)
+        use_art_cache(f"{collection_path}/art_cache")
+        latencies = timed(
+            lambda card: render_cards.render_card_base(card, collection_path, assets),
+            cards,
+        )
+    return len(cards), latencies
+
+
+def bench_card_base_per_card(n_cards: int) -> tuple[int, list[float]]:
+    """The baseline for card_base: the template and status icons composited per card."""
+    cards = synthetic_cards(n_cards)
+    assets = render_cards.warm_render_assets(render_assets())
+
+    def render_base(card, collection_path):
+        template = assets.card_template(card.element.name)
+        with Image.open(f"{collection_path}/images/{card.image_file}") as art:
+            scale = render_cards.IDEAL_CARD_WIDTH / art.size[0]
+            art = art.resize((int(art.size[0] * scale), int(art.size[1] * scale)))
+        canvas = Image.new("RGBA", template.size, (0, 0, 0, 0))
+        canvas.paste(
+            art,
+            (
+                int(template.size[0] / 2 - art.size[0] / 2),
+                int(210 - art.size[1] / 2),
+            ),
+        )
+        canvas.paste(template, (0, 0), template)
+        render_cards.render_weakness_and_resist(card.element, canvas, assets)
+        return canvas
+
+    with tempfile.TemporaryDirectory() as collection_path:
+        write_synthetic_art(collection_path, cards, CARD_READY_ART_SIZE)
+        latencies = timed(lambda card: render_base(card, collection_path), cards)
+    return len(cards), latencies
+
+
+def bench_encode(n_cards: int, render_format: RenderFormat) -> tuple[int, list[float]]:
+    # Encoding only depends on the image, so the gallery's renders are reused.
+    gallery_cards = synthetic_cards(len(load_gallery_cards()))
+    assets = render_cards.warm_render_assets(render_assets())
+    with tempfile.TemporaryDirectory() as collection_path:
+        write_synthetic_art(collection_path, gallery_cards)
+        use_art_cache(f"{collection_path}/art_cache")
+        images = [
+            render_cards.render_card(card, collection_path, assets)
+            for card in gallery_cards
+        ]
+
+    n_bytes = 0
+
+    def encode(i):
+        nonlocal n_bytes
+        n_bytes += len(render_format.encode(images[i % len(images)]))
+
+    latencies = timed(encode, range(n_cards))
+    return n_cards, latencies, {"kb_per_item": n_bytes / n_cards / 1024}
+
+
+def bench_render_ability(n_cards: int) -> tuple[int, list[float]]:
+    abilities = [a for card in synthetic_cards(n_cards) for a in card.abilities]
+    assets = render_cards.warm_render_assets(render_assets())
+    latencies = timed(lambda a: render_cards.render_ability(a, assets), abilities)
+    return len(abilities), latencies
+
+
+def bench_render_element_cost(n_cards: int) -> tuple[int, list[float]]:
+    costs = [
+        a.costs_as_elements for card in synthetic_cards(n_cards) for a in card.abilities
+    ]
+    assets = render_cards.warm_render_assets(render_assets())
+    latencies = timed(lambda c: render_cards.render_element_cost(c, assets), costs)
+    return len(costs), latencies
+
+
+def bench_generate_card(n_cards: int) -> tuple[int, list[float]]:
+    # No latency and no cache, so only our own code is measured.
+    use_fake_gpt_client(latency=0)
+    collection = synthetic_collection(0)
+    random.seed(0)
+    card_specs = [
+        (random.choice(PokemonElements.ALL), random.choice(PokemonRarity.ALL))
+        for _ in range(n_cards)
+    ]
+    latencies = timed(
+        lambda spec: collection.generate_card(element=spec[0], rarity=spec[1]),
+        card_specs,
+    )
+    return n_cards, latencies
+
+
+def bench_card_stats(n_cards: int, repeats: int = 5) -> tuple[int, list[float]]:
+    # Each repeat rolls the stats of all the cards in one batch.
+    rng = np.random.default_rng(0)
+    rarity_index, series_index, is_neutral_card = simulate_card_layout(
+        n_cards, len(PokemonRarity.ALL), rng
+    )
+    latencies = timed(
+        lambda _: generate_card_stats(rarity_index, series_index, is_neutral_card, rng),
+        range(repeats),
+    )
+    return len(rarity_index) * repeats, latencies
+
+
+def bench_card_memory(n_cards: int, as_table: bool) -> tuple[int, list[float], dict]:
+    """Load cards from JSON, as Card objects or as a CardTable, and measure what they hold."""
+    lines = [json.dumps(card.to_json()) for card in synthetic_cards(n_cards)]
+
+    def load_cards():
+        if as_table:
+            return CardTable.from_json(
+                [json.loads(line) for line in lines],
+                PokemonElements.ALL,
+                PokemonRarity.ALL,
+                PokemonElements.get_element_by_name,
+                PokemonRarity.get_rarity_by_name,
+            )
+        return [render_cards.card_from_json(json.loads(line)) for line in lines]
+
+    latencies = timed(lambda _: load_cards(), range(1))
+
+    # Measured on a second load, since tracing slows everything down.
+    tracemalloc.start()
+    cards = load_cards()
+    held_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del cards
+    return n_cards, latencies, {"bytes_per_card": held_bytes / n_cards}
+
+
+def bench_load_collection(
+    n_cards: int, as_table: bool
+) -> tuple[int, list[float], dict]:
+    """Load every card of an exported collection, from its JSON or its card table."""
+    collection = synthetic_collection(n_cards)
+    with tempfile.TemporaryDirectory() as path:
+        if as_table:
+            collection_path = f"{path}/collection.cards"
+            CardTable.from_cards(
+                collection.cards, collection.elements, collection.rarities
+            ).save(collection_path)
+            n_bytes = sum(
+                file.stat().st_size for file in pathlib.Path(collection_path).iterdir()
+            )
+
+            def load_cards():
+                return list(load_card_table(collection_path).cards())
+
+        else:
+            collection_path = f"{path}/collection.json"
+            with open(collection_path, "w") as f:
+                json.dump(collection.to_json(), f, indent=2)
+            n_bytes = os.path.getsize(collection_path)
+
+            def load_cards():
+                with open(collection_path) as f:
+                    data = json.load(f)
+                return [render_cards.card_from_json(card) for card in data["cards"]]
+
+        latencies = timed(lambda _: load_cards(), range(1))
+    return n_cards, latencies, {"kb_per_item": n_bytes / n_cards / 1024}
+
+
+def bench_card_table_lookup(n_cards: int, n_lookups: int = 1000):
+    # Look up random cards by index, straight after opening the table.
+    collection = synthetic_collection(n_cards)
+    rng = random.Random(0)
+    card_indices = [rng.randint(1, n_cards) for _ in range(n_lookups)]
+    with tempfile.TemporaryDirectory() as path:
+        table_path = f"{path}/collection.cards"
+        CardTable.from_cards(
+            collection.cards, collection.elements, collection.rarities
+        ).save(table_path)
+        table = load_card_table(table_path)
+        latencies = timed(lambda i: table.card(table.row_of(i)), card_indices)
+    return n_lookups, latencies
+
+
+def bench_ability_name_draw(n_names: int, n_draws: int = 1000):
+    # A store with n_names names, to check draws stay flat as the library grows.
+    keys = [ability.ability_key for ability in get_all_abilities(PokemonElements.ALL)]
+    with tempfile.TemporaryDirectory() as path:
+        store = AbilityNameStore(f"{path}/ability_names.sqlite")
+        for i, key in enumerate(keys):
+            store.add_names(key, [f"{key} {j}" for j in range(i, n_names, len(keys))])
+
+        # Draw the way generation does: each key's next name, without replacement.
+        rng = random.Random(0)
+        key_counts = Counter()
+        draws = []
+        for key in (rng.choice(keys) for _ in range(n_draws)):
+            draws.append((key, key_counts[key]))
+            key_counts[key] += 1
+        latencies = timed(lambda draw: draw_ability_name(store, *draw, 0), draws)
+    return n_draws, latencies
+
+
+def bench_generate_style(n_cards: int) -> tuple[int, list[float]]:
+    # Only first cards of a series, so each one picks a new subject and detail.
+    collection = synthetic_collection(0)
+    random.seed(0)
+    style_specs = [
+        (
+            random.choice(PokemonElements.ALL),
+            random.choice(PokemonRarity.ALL),
+            random.choice([None, 0, 1, 2]),
+        )
+        for _ in range(n_cards)
+    ]
+    latencies = timed(lambda spec: collection.generate_style(None, *spec), style_specs)
+    return n_cards, latencies
+
+
+def bench_export(n_cards: int, repeats: int = 3) -> tuple[int, list[float]]:
+    collection = synthetic_collection(n_cards)
+    with tempfile.TemporaryDirectory() as path, working_directory(path):
+        latencies = timed(lambda _: collection.export(), range(repeats))
+    return n_cards * repeats, latencies
+
+
+STAGES = {
+    "render_card": bench_render_card,
+    "card_base": bench_card_base,
+    "card_base_per_card": bench_card_base_per_card,
+    "render_ability": bench_render_ability,
+    "render_element_cost": bench_render_element_cost,
+    "encode_png": partial(bench_encode, render_format=RenderFormat("png")),
+    "encode_png_draft": partial(
+        bench_encode, render_format=RenderFormat("png", is_draft=True)
+    ),
+    "encode_webp": partial(bench_encode, render_format=RenderFormat("webp")),
+    "encode_jpeg": partial(bench_encode, render_format=RenderFormat("jpeg")),
+    "generate_card": bench_generate_card,
+    "generate_style": bench_generate_style,
+    "card_stats": bench_card_stats,
+    "cards_in_memory": partial(bench_card_memory, as_table=False),
+    "card_table": partial(bench_card_memory, as_table=True),
+    "load_json": partial(bench_load_collection, as_table=False),
+    "load_card_table": partial(bench_load_collection, as_table=True),
+    "card_table_lookup": bench_card_table_lookup,
+    "ability_name_draw": bench_ability_name_draw,
+    "export": bench_export,
+}
+
+
+def run_stage(stage: str, n_cards: int) -> dict:
+    # The stages print per card, which would swamp the results (and the timings).
+    with redirect_stdout(io.StringIO()):
+        n_items, latencies, *extra = STAGES[stage](n_cards)
+
+    return {
+        "stage": stage,
+        "size": n_cards,
+        "items": n_items,
+        "total_s": sum(latencies),
+        "throughput": n_items / sum(latencies) if sum(latencies) else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        # Anything else the stage measured, like the size of its output.
+        **(extra[0] if extra else {}),
+    }
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def measure_stage(stage: str, n_cards: int) -> dict:
+    """Run a stage and add the peak memory use of the process it ran in."""
+    result = run_stage(stage, n_cards)
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    peak_rss_bytes = peak_rss if sys.platform == "darwin" else peak_rss * 1024
+    result["peak_rss_mb"] = peak_rss_bytes / (1024 * 1024)
+    return result
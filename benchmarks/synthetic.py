@@ -0,0 +1,76 @@
+import json
+import os
+import pathlib
+from PIL import Image
+from mechanics.card import Card
+from pokemon_content.pokemon_collection import PokemonCollection
+from pokemon_content.pokemon_elements import PokemonElements
+from pokemon_content.pokemon_rarity import PokemonRarity
+from content.style import Style
+
+GALLERY_CARDS_PATH = "gallery/cards"
+
+# Midjourney's --ar 3:2 output size.
+ART_SIZE = (1456, 816)
+N_ART_IMAGES = 8
+
+
+def load_gallery_cards() -> list[dict]:
+    card_files = sorted(pathlib.Path(GALLERY_CARDS_PATH).glob("*.json"))
+    return [json.loads(card_file.read_text()) for card_file in card_files]
+
+
+def synthetic_cards(n_cards: int) -> list[Card]:
+    """Repeat the gallery cards until there are n_cards, each with a unique name."""
+    gallery_cards = load_gallery_cards()
+    cards = []
+    for i in range(n_cards):
+        data = gallery_cards[i % len(gallery_cards)]
+        card = Card.from_json(
+            data, PokemonElements.get_element_by_name, PokemonRarity.get_rarity_by_name
+        )
+        card.index = i + 1
+        lap = i // len(gallery_cards)
+        card.name = data["name"] if lap == 0 else f"{data['name']} {lap + 1}"
+        cards.append(card)
+    return cards
+
+
+def synthetic_collection(n_cards: int) -> PokemonCollection:
+    collection = PokemonCollection(
+        f"benchmark-{n_cards}",
+        theme_style=Style(subject_type="pokemon", style_suffix="--niji"),
+        elements=PokemonElements.ALL,
+        rarities=PokemonRarity.ALL,
+    )
+    collection.cards = synthetic_cards(n_cards)
+    collection.card_names_seen = {card.name for card in collection.cards}
+    return collection
+
+
+def write_synthetic_art(
+    collection_path: str, cards: list[Card], art_size: tuple[int, int] = ART_SIZE
+):
+    """Give every card art, linking a few generated images rather than writing one each."""
+    images_path = pathlib.Path(collection_path, "images")
+    os.makedirs(images_path, exist_ok=True)
+
+    art_files = []
+    for i in range(N_ART_IMAGES):
+        gradient = Image.linear_gradient("L").resize(art_size)
+        art = Image.merge(
+            "RGB",
+            (
+                gradient,
+                gradient.rotate(90 * (i % 4), expand=False),
+                gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT),
+            ),
+        )
+        art_file = images_path / f"_art_{i}.png"
+        art.save(art_file)
+        art_files.append(art_file)
+
+    for card in cards:
+        card_art_path = images_path / card.image_file
+        if not card_art_path.exists():
+            os.link(art_files[card.index % N_ART_IMAGES], card_art_path)
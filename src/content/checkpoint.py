@@ -0,0 +1,81 @@
+from dataclasses import asdict, dataclass, field
+import json
+import os
+from content.collection import Collection
+from util.file_util import write_json_atomic
+
+CHECKPOINT_FILE = "_checkpoint.json"
+
+# Bumped whenever a checkpoint from an earlier version can't be carried on exactly.
+CHECKPOINT_VERSION = 2
+
+
+@dataclass
+class GenerationCheckpoint:
+    """Everything needed to carry on a generation run exactly where it stopped."""
+
+    collection_seed: int
+    series_elements: list[str]
+    subject_override: str | None = None
+    next_series: int = 0
+    next_card_index: int = 1
+    subjects_seen: list[str] = field(default_factory=list)
+    card_names_seen: list[str] = field(default_factory=list)
+    version: int = CHECKPOINT_VERSION
+
+    @classmethod
+    def capture(
+        cls,
+        collection: Collection,
+        collection_seed: int,
+        series_elements: list[str],
+        subject_override: str | None,
+        next_series: int,
+    ) -> "GenerationCheckpoint":
+        return cls(
+            collection_seed=collection_seed,
+            series_elements=series_elements,
+            subject_override=subject_override,
+            next_series=next_series,
+            next_card_index=len(collection.cards) + 1,
+            subjects_seen=sorted(collection.subjects_seen),
+            card_names_seen=sorted(collection.card_names_seen),
+        )
+
+    def restore(self, collection: Collection):
+        # Cards written after the checkpoint are generated again from the same state.
+        collection.discard_cards_from(self.next_card_index)
+        collection.subjects_seen = set(self.subjects_seen)
+        collection.card_names_seen = set(self.card_names_seen)
+        collection.ability_key_counts = collection.count_ability_keys(collection.cards)
+        collection.collection_seed = self.collection_seed
+
+    def save(self, collection: Collection):
+        write_json_atomic(get_checkpoint_path(collection), asdict(self), indent=None)
+
+    @classmethod
+    def load(cls, collection: Collection) -> "GenerationCheckpoint | None":
+        path = get_checkpoint_path(collection)
+        if not os.path.exists(path):
+            return None
+
+        with open(path) as f:
+            data = json.load(f)
+
+        # Older runs drew their cards differently, so they can't be carried on.
+        if data.get("version", 1) != CHECKPOINT_VERSION:
+            raise ValueError(
+                f"{path} was saved by an older version and can't be resumed. "
+                "Start a new run instead."
+            )
+        return cls(**data)
+
+    @staticmethod
+    def clear(collection: Collection):
+        path = get_checkpoint_path(collection)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def get_checkpoint_path(collection: Collection) -> str:
+    return os.path.join(collection.collection_path, CHECKPOINT_FILE)
@@ -1,13 +1,42 @@
-from dataclasses import dataclass, field
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 from functools import cached_property
 import json
 import os
 import random
 import shutil
+from typing import Callable
 from content.style import Style
 from mechanics.card import Card
+from mechanics.card_table import CardTable
 from mechanics.element import Element
 from mechanics.rarity import Rarity
+from util.file_util import write_json_atomic, write_jsonl_atomic
+from util.seed_util import derive_seed
+
+
+@dataclass
+class SeriesPlan:
+    """A series that has been planned, but not generated yet."""
+
+    first_card_index: int
+    element: Element
+    n_cards: int
+    starting_rarity_index: int
+    subject: str | None = None
+
+    def to_json(self):
+        return {
+            "first_card_index": self.first_card_index,
+            "element": self.element.name,
+            "n_cards": self.n_cards,
+            "starting_rarity_index": self.starting_rarity_index,
+            "subject": self.subject,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict, get_element: Callable[[str], Element]):
+        return cls(**{**data, "element": get_element(data["element"])})
 
 
 @dataclass
@@ -23,57 +52,169 @@ class Collection:
     # Prevent duplicate cards and names.
     subjects_seen: set[str] = field(default_factory=set)
     card_names_seen: set[str] = field(default_factory=set)
+    # How many abilities with each key the cards have, to draw their names without
+    # replacement.
+    ability_key_counts: Counter[str] = field(default_factory=Counter)
+
+    # When set, each card is written to disk as soon as it's generated.
+    is_streaming_export: bool = False
+
+    # When set, each series and card draws from its own random stream, derived from
+    # this seed and its index, instead of from the global one.
+    collection_seed: int | None = None
 
     def generate_random_cards(
-        self, element: Element = None, subject_override: str = None
+        self,
+        element: Element = None,
+        subject_override: str = None,
+        generate_text: bool = True,
     ) -> list[Card]:
-        element = element if element else random.choice(self.elements)
-        n_series = random.randint(1, 3)
-        return self.generate_card_series(element, n_series, subject_override)
+        """Plan and generate one series, numbered on from the cards so far."""
+        plan = self.plan_series(
+            [element], subject_override, len(self.cards) + 1, self.subjects_seen
+        )[0]
+        return self.generate_series(plan, generate_text)
 
-    def generate_card_series(
-        self, element: Element, n: int = 1, subject_override: str = None
-    ) -> list[Card]:
+    def plan_series(
+        self,
+        series_elements: list[Element | None],
+        subject_override: str = None,
+        first_card_index: int = 1,
+        subjects_seen: set[str] = None,
+    ) -> list[SeriesPlan]:
+        """
+        Decide the element, length, rarities and subject of each series, and so the
+        index of every card, before any card is generated. Each series draws these
+        from its own random stream, keyed on its first card's index.
+        """
+        subjects_seen = set(subjects_seen) if subjects_seen else set()
+        plans = []
+        for element in series_elements:
+            rng = self.get_rng("series", first_card_index)
+            element = element if element else rng.choice(self.elements)
+            n_cards = rng.randint(1, 3)
 
-        # The last card in the series is always the highest in the series.
-        # Each card in the series is one rarity higher than the previous.
-        # Find the index of the starting rarity based on which rarities are available
+            # The last card in the series is always the highest in the series.
+            # Each card in the series is one rarity higher than the previous.
+            # Find the index of the starting rarity based on which rarities are available
+            rarity_range = max(len(self.rarities) - n_cards, 0)
+            starting_rarity_index = (
+                rng.randint(0, rarity_range) if rarity_range > 0 else 0
+            )
+            subject = self.pick_series_subject(
+                element, subject_override, subjects_seen, rng
+            )
+
+            plans.append(
+                SeriesPlan(
+                    first_card_index=first_card_index,
+                    element=element,
+                    n_cards=n_cards,
+                    starting_rarity_index=starting_rarity_index,
+                    subject=subject,
+                )
+            )
+            first_card_index += n_cards
+        return plans
+
+    def pick_series_subject(
+        self,
+        element: Element,
+        subject_override: str | None,
+        subjects_seen: set[str],
+        rng: random.Random,
+    ) -> str | None:
+        """Pick the subject for a new series, and add it to subjects_seen."""
+        pass
+
+    def generate_series(
+        self, plan: SeriesPlan, generate_text: bool = True
+    ) -> list[Card]:
+        if plan.subject:
+            self.subjects_seen.add(plan.subject)
 
-        rarity_range = max(len(self.rarities) - n, 0)
-        starting_rarity_index = (
-            random.randint(0, rarity_range) if rarity_range > 0 else 0
-        )
         new_cards = []
         card_style = None
-
-        for i in range(n):
-            rarity_index = min(len(self.rarities) - 1, starting_rarity_index + i)
-            rarity = self.rarities[rarity_index]
+        for card_index, rarity, series_index in self.get_series_cards(plan):
             card = self.generate_card(
-                element=element,
+                element=plan.element,
                 rarity=rarity,
                 inherited_style=card_style,
-                series_index=i if n > 1 else None,
-                subject_override=subject_override,
+                series_index=series_index,
+                subject=plan.subject,
+                generate_text=generate_text,
+                card_index=card_index,
             )
 
-            if i == 0:
+            if card_style is None:
                 card_style = card.style
 
             new_cards.append(card)
 
         return new_cards
 
+    def get_series_cards(
+        self, plan: SeriesPlan
+    ) -> list[tuple[int, Rarity, int | None]]:
+        """The index, rarity and series index of each card in a planned series."""
+        return [
+            (
+                plan.first_card_index + i,
+                self.rarities[
+                    min(len(self.rarities) - 1, plan.starting_rarity_index + i)
+                ],
+                i if plan.n_cards > 1 else None,
+            )
+            for i in range(plan.n_cards)
+        ]
+
     def generate_card(
         self,
         element: Element,
         rarity: Rarity,
-        style: Style = None,
+        inherited_style: Style = None,
         series_index: int | None = None,
-        subject_override: str = None,
+        subject: str = None,
+        generate_text: bool = True,
+        card_index: int | None = None,
     ) -> Card:
         pass
 
+    def skip_series(self, plans: list[SeriesPlan]):
+        """
+        Account for series that are generated somewhere else (e.g. by an earlier
+        shard), so the cards after them come out as if this collection had
+        generated them too.
+        """
+        pass
+
+    def add_shard_series(self, cards: list[Card]):
+        pass
+
+    def get_card_rng(self, card_index: int) -> random.Random:
+        """
+        The random stream for one card. It only depends on the collection seed and
+        the card's index, so the card's draws are the same however many draws the
+        cards before it made.
+        """
+        return self.get_rng("card", card_index)
+
+    def get_rng(self, *parts) -> random.Random:
+        if self.collection_seed is None:
+            # Without a collection seed, everything shares the global stream.
+            return random
+        return random.Random(derive_seed(self.collection_seed, *parts))
+
+    def get_names_seed(self) -> int:
+        # Collections without a seed all draw their names in the same order.
+        return self.collection_seed if self.collection_seed is not None else 0
+
+    @staticmethod
+    def count_ability_keys(cards: list[Card]) -> Counter[str]:
+        return Counter(
+            ability.ability_key for card in cards for ability in card.abilities
+        )
+
     def get_default_element(self) -> Element:
         return self.elements[0]
 
@@ -83,34 +224,152 @@ class Collection:
             "cards": [card.to_json() for card in self.cards],
         }
 
+    @property
+    def collection_path(self) -> str:
+        return f"./output/{self.collection_name}/"
+
+    @property
+    def cards_folder(self) -> str:
+        return f"./output/{self.collection_name}/cards"
+
     def export(self):
-        collection_path = f"./output/{self.collection_name}/"
-        cards_folder = f"./output/{self.collection_name}/cards"
+        if self.is_streaming_export:
+            self.finish_streaming_export()
+            return
+
+        self.prepare_export_folders()
+
+        # Export entire collection as a single file.
+        with open(f"{self.collection_path}/{self.collection_name}.json", "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+        self.write_cards_jsonl()
+        self.write_card_table()
+
+        # Export the collection's cards.
+        for card in self.cards:
+            with open(self.get_card_path(card), "w") as f:
+                json.dump(self.get_card_file_json(card), f, indent=2)
+
+        # Export all image prompts so its easy to generate images.
+        self.write_image_prompts()
+
+    def write_cards_jsonl(self):
+        # One card per line, so a reader can stream cards without loading them all.
+        write_jsonl_atomic(
+            f"{self.collection_path}/{self.collection_name}.jsonl",
+            (card.to_json() for card in self.cards),
+        )
+
+    def write_card_table(self):
+        # A compact, memory-mappable copy of the cards, for large collections.
+        table = CardTable.from_cards(self.cards, self.elements, self.rarities)
+        table.save(f"{self.collection_path}/{self.collection_name}.cards")
+
+    def write_image_prompts(self):
+        with open(f"{self.collection_path}/_image_prompts.txt", "w") as f:
+            for card in self.cards:
+                f.write(self.get_image_prompt_entry(card))
+
+    def prepare_export_folders(self, keep_existing: bool = False):
         images_folder = f"./output/{self.collection_name}/images"
         rendered_cards_folder = f"./output/{self.collection_name}/renders"
 
         # If collection path exists, delete it.
-        if os.path.exists(collection_path):
-            shutil.rmtree(collection_path)
+        if os.path.exists(self.collection_path) and not keep_existing:
+            shutil.rmtree(self.collection_path)
 
-        os.makedirs(collection_path, exist_ok=True)
-        os.makedirs(cards_folder, exist_ok=True)
+        os.makedirs(self.collection_path, exist_ok=True)
+        os.makedirs(self.cards_folder, exist_ok=True)
         os.makedirs(images_folder, exist_ok=True)
         os.makedirs(rendered_cards_folder, exist_ok=True)
 
-        # Export entire collection as a single file.
-        with open(f"{collection_path}/{self.collection_name}.json", "w") as f:
-            json.dump(self.to_json(), f, indent=2)
+    def start_streaming_export(self, resume: bool = False):
+        """
+        Write each card to disk as soon as it's generated, rather than all at the end.
+        With resume, the cards already on disk are kept and loaded back in, so an
+        interrupted run can carry on from them.
+        """
+        self.prepare_export_folders(keep_existing=resume)
+        if resume:
+            self.load_exported_cards()
 
-        # Export the collection's cards.
+        # Rewrite the prompts from the cards we have, in case the last run was
+        # interrupted between writing a card and its prompt.
+        self.write_image_prompts()
+        self.is_streaming_export = True
+
+    def on_card_generated(self, card: Card):
+        """Called once a card is complete, including its name and description."""
+        if not self.is_streaming_export:
+            return
+
+        write_json_atomic(self.get_card_path(card), self.get_card_file_json(card))
+        with open(f"{self.collection_path}/_image_prompts.txt", "a") as f:
+            f.write(self.get_image_prompt_entry(card))
+
+    def finish_streaming_export(self):
+        # The collection files are written last, so they only exist for finished runs.
+        self.write_cards_jsonl()
+        self.write_card_table()
+        write_json_atomic(
+            f"{self.collection_path}/{self.collection_name}.json", self.to_json()
+        )
+        self.is_streaming_export = False
+
+    def load_exported_cards(self) -> list[Card]:
+        elements_by_name = {element.name.lower(): element for element in self.elements}
+        rarities_by_name = {rarity.name: rarity for rarity in self.rarities}
+
+        cards = []
+        for card_file in sorted(os.listdir(self.cards_folder)):
+            if not card_file.endswith(".json"):
+                continue
+
+            with open(f"{self.cards_folder}/{card_file}") as f:
+                data = json.load(f)
+            card = Card.from_json(
+                data,
+                lambda name: elements_by_name[name.lower()],
+                lambda name: rarities_by_name[name],
+            )
+            if "style" in data:
+                card.style = Style(**data["style"])
+            cards.append(card)
+
+        # Carry on numbering and de-duplicating from the cards on disk.
+        self.cards = sorted(cards, key=lambda card: card.index)
+        self.card_names_seen.update(card.name for card in self.cards)
+        self.subjects_seen.update(
+            card.style.subject for card in self.cards if card.style.subject
+        )
+        self.ability_key_counts = self.count_ability_keys(self.cards)
+        return self.cards
+
+    def has_exported_cards(self) -> bool:
+        if not os.path.isdir(self.cards_folder):
+            return False
+        return any(name.endswith(".json") for name in os.listdir(self.cards_folder))
+
+    def discard_cards_from(self, index: int):
+        """Remove the cards from this index onwards, both in memory and on disk."""
         for card in self.cards:
-            card_path = f"{cards_folder}/{card.index:03d}_{card.snake_case_name}.json"
-            with open(card_path, "w") as f:
-                json.dump(card.to_json(), f, indent=2)
+            card_path = self.get_card_path(card)
+            is_discarded = card.index >= index
+            if is_discarded and self.is_streaming_export and os.path.exists(card_path):
+                os.remove(card_path)
 
-        # Export all image prompts so its easy to generate images.
-        with open(f"{collection_path}/_image_prompts.txt", "w") as f:
-            for card in self.cards:
-                f.write(f"[{card.index:03d}] {card.name}\n")
-                f.write(card.image_prompt)
-                f.write("\n\n")
+        self.cards = [card for card in self.cards if card.index < index]
+        if self.is_streaming_export:
+            self.write_image_prompts()
+
+    @staticmethod
+    def get_card_file_json(card: Card) -> dict:
+        # The style isn't part of the card, but a resumed run needs its subject.
+        return {**card.to_json(), "style": asdict(card.style)}
+
+    def get_card_path(self, card: Card) -> str:
+        return f"{self.cards_folder}/{card.index:03d}_{card.snake_case_name}.json"
+
+    @staticmethod
+    def get_image_prompt_entry(card: Card) -> str:
+        return f"[{card.index:03d}] {card.name}\n{card.image_prompt}\n\n"
@@ -0,0 +1,213 @@
+from dataclasses import asdict, dataclass, field
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+from content.collection import Collection, SeriesPlan
+from content.style import Style
+from mechanics.card import Card
+from mechanics.element import Element
+from util.file_util import write_json_atomic
+
+PLAN_FILE = "plan.json"
+
+
+@dataclass
+class ShardSpec:
+    """One worker's share of a run: a contiguous range of planned series."""
+
+    shard_id: int
+    series: list[dict] = field(default_factory=list)
+
+
+@dataclass
+class ShardPlan:
+    """
+    Written by the coordinator before any worker starts. Workers only need this file
+    to do their share, and write their cards back next to it, so the shard folder
+    can live on any filesystem the workers share.
+    """
+
+    collection_name: str
+    collection_seed: int
+    concurrency: int = 1
+    shards: list[ShardSpec] = field(default_factory=list)
+
+    # Identifies the plan, so results left over from another plan are never merged.
+    plan_id: str = ""
+
+    @classmethod
+    def create(
+        cls,
+        collection: Collection,
+        collection_seed: int,
+        series_elements: list[str],
+        n_shards: int,
+        subject_override: str | None = None,
+        concurrency: int = 1,
+    ) -> "ShardPlan":
+        # Every series (and so every card's index and subject) is planned here, the
+        # same way a serial run plans them, so the shards can't pick differently.
+        collection.collection_seed = collection_seed
+        all_plans = collection.plan_series(
+            [get_element_by_name(collection, name) for name in series_elements],
+            subject_override,
+        )
+
+        n_shards = max(1, min(n_shards, len(all_plans)))
+        shards = []
+        for shard_id in range(n_shards):
+            start = len(all_plans) * shard_id // n_shards
+            end = len(all_plans) * (shard_id + 1) // n_shards
+            shards.append(
+                ShardSpec(
+                    shard_id=shard_id,
+                    series=[plan.to_json() for plan in all_plans[start:end]],
+                )
+            )
+
+        plan = cls(
+            collection_name=collection.collection_name,
+            collection_seed=collection_seed,
+            concurrency=concurrency,
+            shards=shards,
+        )
+        plan.plan_id = plan.get_plan_id()
+        return plan
+
+    def get_series_plans(
+        self, collection: Collection, shard_ids: list[int]
+    ) -> list[SeriesPlan]:
+        return [
+            SeriesPlan.from_json(
+                data, lambda name: get_element_by_name(collection, name)
+            )
+            for shard_id in shard_ids
+            for data in self.shards[shard_id].series
+        ]
+
+    def get_plan_id(self) -> str:
+        data = {**asdict(self), "plan_id": None}
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()[
+            :16
+        ]
+
+    def save(self, shard_dir: str):
+        """Start the shard folder with this plan, clearing out any earlier plan and results."""
+        if os.path.exists(shard_dir):
+            shutil.rmtree(shard_dir)
+        os.makedirs(shard_dir)
+        write_json_atomic(os.path.join(shard_dir, PLAN_FILE), asdict(self))
+
+    @classmethod
+    def load(cls, shard_dir: str) -> "ShardPlan":
+        with open(os.path.join(shard_dir, PLAN_FILE)) as f:
+            data = json.load(f)
+        data["shards"] = [ShardSpec(**shard) for shard in data["shards"]]
+        return cls(**data)
+
+
+def get_shard_dir(collection: Collection) -> str:
+    return f"./output/{collection.collection_name}_shards"
+
+
+def get_shard_result_path(shard_dir: str, shard_id: int) -> str:
+    return os.path.join(shard_dir, f"shard_{shard_id:03d}.json")
+
+
+def load_shard_result(shard_dir: str, plan: ShardPlan, shard_id: int) -> dict | None:
+    """The shard's result, or None if it hasn't finished this plan."""
+    path = get_shard_result_path(shard_dir, shard_id)
+    if not os.path.exists(path):
+        return None
+
+    with open(path) as f:
+        result = json.load(f)
+    return result if result.get("plan_id") == plan.plan_id else None
+
+
+def get_pending_shards(plan: ShardPlan, shard_dir: str) -> list[int]:
+    return [
+        shard.shard_id
+        for shard in plan.shards
+        if load_shard_result(shard_dir, plan, shard.shard_id) is None
+    ]
+
+
+def run_shard(
+    collection: Collection, plan: ShardPlan, shard_id: int, shard_dir: str
+) -> list[list[Card]]:
+    """Generate one shard's series and write them to its result file."""
+    collection.collection_seed = plan.collection_seed
+
+    # The cards of earlier shards aren't generated here, but the names their
+    # abilities use are, so the later cards draw the same names as a serial run.
+    collection.skip_series(plan.get_series_plans(collection, list(range(shard_id))))
+    series_plans = plan.get_series_plans(collection, [shard_id])
+
+    if plan.concurrency > 1:
+        all_series = asyncio.run(
+            collection.generate_series_async(
+                series_plans, max_concurrency=plan.concurrency
+            )
+        )
+    else:
+        all_series = [collection.generate_series(x) for x in series_plans]
+
+    # The result file only appears once the whole shard is done.
+    write_json_atomic(
+        get_shard_result_path(shard_dir, shard_id),
+        {
+            "plan_id": plan.plan_id,
+            "shard_id": shard_id,
+            "series": [[shard_card_to_json(card) for card in s] for s in all_series],
+        },
+    )
+    return all_series
+
+
+def merge_shards(collection: Collection, plan: ShardPlan, shard_dir: str) -> list[Card]:
+    """
+    Add every shard's cards to the collection, in shard order. The cards keep the
+    indices, stats and styles their shard gave them; only names that an earlier
+    card already took are picked again, as a serial run would have picked them.
+    """
+    missing_shards = get_pending_shards(plan, shard_dir)
+    if missing_shards:
+        raise FileNotFoundError(f"Shards {missing_shards} have not finished yet.")
+
+    collection.collection_seed = plan.collection_seed
+    for shard in plan.shards:
+        result = load_shard_result(shard_dir, plan, shard.shard_id)
+        for series in result["series"]:
+            cards = [shard_card_from_json(collection, data) for data in series]
+            collection.add_shard_series(cards)
+
+    return collection.cards
+
+
+def shard_card_to_json(card: Card) -> dict:
+    return {
+        **Collection.get_card_file_json(card),
+        "visual_description": card.visual_description,
+        "name_choices": card.name_choices,
+    }
+
+
+def shard_card_from_json(collection: Collection, data: dict) -> Card:
+    rarities_by_name = {rarity.name: rarity for rarity in collection.rarities}
+
+    card = Card.from_json(
+        data,
+        lambda name: get_element_by_name(collection, name),
+        lambda name: rarities_by_name[name],
+    )
+    card.style = Style(**data["style"])
+    card.visual_description = data.get("visual_description")
+    card.name_choices = data.get("name_choices", [])
+    return card
+
+
+def get_element_by_name(collection: Collection, name: str) -> Element:
+    return next(x for x in collection.elements if x.name.lower() == name.lower())
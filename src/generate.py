@@ -1,11 +1,51 @@
 #!/usr/bin/env python
 
 import argparse
+import asyncio
+import cProfile
+import pstats
 import random
+import time
 from pokemon_content.pokemon_collection import PokemonCollection
 from pokemon_content.pokemon_elements import PokemonElements
+from content.checkpoint import GenerationCheckpoint
 from content.style import Style
+from mechanics.element import Element
 from pokemon_content.pokemon_rarity import PokemonRarity
+from util.completion_cache import DEFAULT_CACHE_PATH, CompletionCache
+from util.fake_gpt_call import use_fake_gpt_client
+from util.gpt_call import gpt_client
+from util.tracing import tracer
+
+
+def get_classic_collection() -> PokemonCollection:
+    pokemon_style: Style = Style(
+        subject_type="pokemon",
+        style_suffix="--niji",
+    )
+
+    return PokemonCollection(
+        "pokemon-classic",
+        theme_style=pokemon_style,
+        elements=PokemonElements.ALL,
+        rarities=PokemonRarity.ALL,
+    )
+
+
+def get_series_elements(
+    collection: PokemonCollection, number_of_monsters: int, element: Element = None
+) -> list[Element]:
+    all_elements = collection.elements
+
+    if element is None:
+        n_monsters_to_generate = number_of_monsters * len(all_elements)
+    else:
+        n_monsters_to_generate = number_of_monsters
+
+    return [
+        element if element else all_elements[i % len(all_elements)]
+        for i in range(n_monsters_to_generate)
+    ]
 
 
 def main():
@@ -36,52 +76,251 @@ def main():
         help="What type of monster to generate (e.g. monkey, dragon, etc.).",
     )
 
+    argparser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of GPT requests to run at once (1 runs them one after another).",
+    )
+
+    argparser.add_argument(
+        "--fake-gpt",
+        type=float,
+        default=None,
+        metavar="LATENCY",
+        help="Use an offline fake GPT client that answers after LATENCY seconds (for benchmarking).",
+    )
+
+    argparser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for the collection, so a build can be repeated (default: random).",
+    )
+
+    argparser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each card to the output folder as soon as it's generated.",
+    )
+
+    argparser.add_argument(
+        "--checkpoint-every",
+        type=int,
+        default=10,
+        metavar="N",
+        help="When streaming, save a checkpoint to resume from every N cards.",
+    )
+
+    argparser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted streaming run from its last checkpoint.",
+    )
+
+    argparser.add_argument(
+        "--gpt-cache",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help="SQLite file to cache GPT completions in.",
+    )
+
+    argparser.add_argument(
+        "--no-gpt-cache",
+        action="store_true",
+        help="Send every prompt to GPT, even if it has been answered before.",
+    )
+
+    argparser.add_argument(
+        "--gpt-cache-ttl",
+        type=float,
+        default=None,
+        metavar="DAYS",
+        help="Ignore and evict cached completions older than this many days.",
+    )
+
+    argparser.add_argument(
+        "--gpt-cache-max-entries",
+        type=int,
+        default=None,
+        help="Evict the least recently used completions beyond this many entries.",
+    )
+
+    argparser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Only answer prompts from the GPT cache, and fail on any cache miss.",
+    )
+
+    argparser.add_argument(
+        "--trace",
+        type=str,
+        default=None,
+        metavar="FILE",
+        help="Write a JSONL trace of each card's stage timings and GPT usage to FILE.",
+    )
+
+    argparser.add_argument(
+        "--profile",
+        type=str,
+        nargs="?",
+        const="",
+        default=None,
+        metavar="FILE",
+        help="Run under cProfile, printing the top functions (and saving the stats to FILE).",
+    )
+
     args = argparser.parse_args()
+    if args.profile is None:
+        generate_collections(args)
+        return
+
+    profiler = cProfile.Profile()
+    profiler.runcall(generate_collections, args)
+    pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    if args.profile:
+        profiler.dump_stats(args.profile)
+        print(f"Saved profile to {args.profile}")
+
+
+def generate_collections(args: argparse.Namespace):
     number_of_monsters = args.n_monsters
     element_name = args.element
     subject_override = args.subject
+    concurrency = args.concurrency
+    is_streaming = args.stream or args.resume
+
+    if args.fake_gpt is not None:
+        use_fake_gpt_client(latency=args.fake_gpt)
+
+    if not args.no_gpt_cache:
+        gpt_client().cache = CompletionCache(
+            args.gpt_cache,
+            ttl_seconds=args.gpt_cache_ttl * 86400 if args.gpt_cache_ttl else None,
+            max_entries=args.gpt_cache_max_entries,
+            read_only=args.replay,
+        )
     element = (
         None
         if element_name is None
         else PokemonElements.get_element_by_name(element_name)
     )
 
-    pokemon_style: Style = Style(
-        subject_type="pokemon",
-        style_suffix="--niji",
-    )
-
-    classic_collection = PokemonCollection(
-        "pokemon-classic",
-        theme_style=pokemon_style,
-        elements=PokemonElements.ALL,
-        rarities=PokemonRarity.ALL,
-    )
+    classic_collection = get_classic_collection()
 
     all_collections = [
         classic_collection,
     ]
 
-    collection_seed = random.randint(0, 1000000)
+    collection_seed = args.seed if args.seed is not None else random.randint(0, 1000000)
+    print(f"Collection seed: {collection_seed}")
     for current_collection in all_collections:
-        random.seed(collection_seed)
-        all_elements = current_collection.elements
+        start_time = time.perf_counter()
+        series_elements = get_series_elements(
+            current_collection, number_of_monsters, element
+        )
 
-        if element is None:
-            n_monsters_to_generate = number_of_monsters * len(all_elements)
-        else:
-            n_monsters_to_generate = number_of_monsters
+        checkpoint = None
+        if args.resume:
+            checkpoint = GenerationCheckpoint.load(current_collection)
+            if checkpoint is None and current_collection.has_exported_cards():
+                # Without a checkpoint, there's no seed to carry these cards on from.
+                raise SystemExit(
+                    f"Found cards in {current_collection.cards_folder} but no "
+                    "checkpoint to resume them from. Run again without --resume "
+                    "to start over (this deletes them)."
+                )
+            if checkpoint is None:
+                print("No checkpoint found, starting a new run.")
 
-        for i in range(n_monsters_to_generate):
-            current_element = (
-                element if element else all_elements[i % len(all_elements)]
-            )
-            monsters = current_collection.generate_random_cards(
-                element=current_element, subject_override=subject_override
+        if checkpoint is not None:
+            # Carry on with the original run's settings and seed.
+            current_collection.start_streaming_export(resume=True)
+            checkpoint.restore(current_collection)
+            collection_seed = checkpoint.collection_seed
+            subject_override = checkpoint.subject_override
+            series_elements = [
+                PokemonElements.get_element_by_name(name)
+                for name in checkpoint.series_elements
+            ]
+            first_series = checkpoint.next_series
+            print(
+                f"Resuming from card {checkpoint.next_card_index} "
+                f"(collection seed: {collection_seed})."
             )
-            print(*monsters, sep="\n\n")
+        else:
+            if is_streaming:
+                # Never clear the output folder on the resume path.
+                current_collection.start_streaming_export(resume=args.resume)
+            current_collection.collection_seed = collection_seed
+            first_series = 0
+
+        # Planning every series up front fixes each card's index and subject, so a
+        # resumed run plans the same series again and skips the finished ones.
+        series_plans = current_collection.plan_series(series_elements, subject_override)
+
+        # Concurrent runs generate a batch of series at a time, and only split the
+        # run into smaller batches when they need to checkpoint along the way.
+        if concurrency <= 1:
+            batch_size = 1
+        elif is_streaming:
+            batch_size = concurrency
+        else:
+            batch_size = len(series_plans)
+
+        n_cards_at_checkpoint = len(current_collection.cards)
+        if is_streaming and checkpoint is None:
+            # Saved before the first card, so a run that's interrupted early can
+            # still be resumed with its seed.
+            GenerationCheckpoint.capture(
+                current_collection,
+                collection_seed,
+                [e.name for e in series_elements],
+                subject_override,
+                next_series=0,
+            ).save(current_collection)
+
+        for batch_start in range(first_series, len(series_plans), batch_size):
+            batch_plans = series_plans[batch_start : batch_start + batch_size]
+            if concurrency > 1:
+                all_monsters = asyncio.run(
+                    current_collection.generate_series_async(
+                        batch_plans, max_concurrency=concurrency
+                    )
+                )
+            else:
+                all_monsters = [current_collection.generate_series(batch_plans[0])]
+
+            for monsters in all_monsters:
+                print(*monsters, sep="\n\n")
+
+            n_new_cards = len(current_collection.cards) - n_cards_at_checkpoint
+            if is_streaming and n_new_cards >= args.checkpoint_every:
+                GenerationCheckpoint.capture(
+                    current_collection,
+                    collection_seed,
+                    [e.name for e in series_elements],
+                    subject_override,
+                    next_series=batch_start + len(batch_plans),
+                ).save(current_collection)
+                n_cards_at_checkpoint = len(current_collection.cards)
+
+        elapsed_time = time.perf_counter() - start_time
+        print(
+            f"Generated {len(current_collection.cards)} cards in {elapsed_time:.1f}s."
+        )
+        if gpt_client().cache is not None:
+            print(f"GPT cache: {gpt_client().cache}")
+        print(tracer().summary_table())
+        if args.trace:
+            tracer().write_jsonl(args.trace)
+            print(f"Saved trace to {args.trace}")
         current_collection.export()
 
+        # The run is complete, so there's nothing left to resume.
+        GenerationCheckpoint.clear(current_collection)
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import random
+import time
+from content.sharding import (
+    ShardPlan,
+    get_pending_shards,
+    get_shard_dir,
+    merge_shards,
+    run_shard,
+)
+from generate import get_classic_collection, get_series_elements
+from pokemon_content.pokemon_elements import PokemonElements
+from util.completion_cache import DEFAULT_CACHE_PATH, CompletionCache
+from util.fake_gpt_call import use_fake_gpt_client
+from util.gpt_call import gpt_client
+
+
+def setup_gpt_client(fake_gpt: float | None, gpt_cache: str | None):
+    if fake_gpt is not None:
+        use_fake_gpt_client(latency=fake_gpt)
+    if gpt_cache is not None:
+        gpt_client().cache = CompletionCache(gpt_cache)
+
+
+def run_shard_worker(
+    shard_dir: str, shard_id: int, fake_gpt: float | None, gpt_cache: str | None
+) -> int:
+    # Each worker process sets up its own GPT client and collection.
+    setup_gpt_client(fake_gpt, gpt_cache)
+    plan = ShardPlan.load(shard_dir)
+    all_series = run_shard(get_classic_collection(), plan, shard_id, shard_dir)
+    return sum(len(series) for series in all_series)
+
+
+def create_plan(args, collection, shard_dir: str) -> ShardPlan:
+    element = (
+        None
+        if args.element is None
+        else PokemonElements.get_element_by_name(args.element)
+    )
+    series_elements = get_series_elements(collection, args.n_monsters, element)
+
+    collection_seed = args.seed if args.seed is not None else random.randint(0, 1000000)
+    plan = ShardPlan.create(
+        collection,
+        collection_seed,
+        [e.name for e in series_elements],
+        args.shards,
+        subject_override=args.subject,
+        concurrency=args.concurrency,
+    )
+    plan.save(shard_dir)
+    print(
+        f"Planned {len(series_elements)} series over {len(plan.shards)} shards "
+        f"(collection seed: {collection_seed})."
+    )
+    return plan
+
+
+def run_local_workers(plan: ShardPlan, shard_dir: str, fake_gpt, gpt_cache):
+    # Shards that already finished this plan (e.g. before an interrupted run) are kept.
+    pending_shards = get_pending_shards(plan, shard_dir)
+    if not pending_shards:
+        return
+
+    with ProcessPoolExecutor(max_workers=len(pending_shards)) as executor:
+        futures = {
+            shard_id: executor.submit(
+                run_shard_worker, shard_dir, shard_id, fake_gpt, gpt_cache
+            )
+            for shard_id in pending_shards
+        }
+        for shard_id, future in futures.items():
+            print(f"Shard {shard_id} generated {future.result()} cards.")
+
+
+def main():
+
+    argparser = argparse.ArgumentParser(
+        description="Generate a collection in shards, across several processes or machines."
+    )
+    argparser.add_argument(
+        "-n",
+        "--n_monsters",
+        type=int,
+        default=1,
+        help="Number of monsters to generate per element.",
+    )
+
+    argparser.add_argument(
+        "-e",
+        "--element",
+        type=str,
+        default=None,
+        choices=[e.name.lower() for e in PokemonElements.ALL],
+        help="Which element to generate monsters for.",
+    )
+
+    argparser.add_argument(
+        "-s",
+        "--subject",
+        type=str,
+        default=None,
+        help="What type of monster to generate (e.g. monkey, dragon, etc.).",
+    )
+
+    argparser.add_argument(
+        "--shards",
+        type=int,
+        default=4,
+        help="Number of shards to split the collection into.",
+    )
+
+    argparser.add_argument(
+        "-c",
+        "--concurrency",
+        type=int,
+        default=1,
+        help="Number of GPT requests each shard runs at once.",
+    )
+
+    argparser.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="Seed for the collection, so a build can be repeated (default: random).",
+    )
+
+    argparser.add_argument(
+        "--plan-only",
+        action="store_true",
+        help="Only write the shard plan, for workers to be started separately.",
+    )
+
+    argparser.add_argument(
+        "--worker",
+        type=int,
+        default=None,
+        metavar="SHARD",
+        help="Generate a single shard from an existing plan.",
+    )
+
+    argparser.add_argument(
+        "--merge",
+        action="store_true",
+        help="Merge the finished shards of an existing plan into the collection.",
+    )
+
+    argparser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Carry on the existing plan, only generating the shards that haven't finished.",
+    )
+
+    argparser.add_argument(
+        "--fake-gpt",
+        type=float,
+        default=None,
+        metavar="LATENCY",
+        help="Use an offline fake GPT client that answers after LATENCY seconds.",
+    )
+
+    argparser.add_argument(
+        "--gpt-cache",
+        type=str,
+        default=DEFAULT_CACHE_PATH,
+        help="SQLite file to cache GPT completions in.",
+    )
+
+    argparser.add_argument(
+        "--no-gpt-cache",
+        action="store_true",
+        help="Send every prompt to GPT, even if it has been answered before.",
+    )
+
+    args = argparser.parse_args()
+    gpt_cache = None if args.no_gpt_cache else args.gpt_cache
+    collection = get_classic_collection()
+    shard_dir = get_shard_dir(collection)
+
+    if args.worker is not None:
+        n_cards = run_shard_worker(shard_dir, args.worker, args.fake_gpt, gpt_cache)
+        print(f"Shard {args.worker} generated {n_cards} cards.")
+        return
+
+    start_time = time.perf_counter()
+    if args.merge:
+        plan = ShardPlan.load(shard_dir)
+    elif args.resume:
+        plan = ShardPlan.load(shard_dir)
+        print(f"Resuming plan {plan.plan_id}.")
+        run_local_workers(plan, shard_dir, args.fake_gpt, gpt_cache)
+    else:
+        plan = create_plan(args, collection, shard_dir)
+        if args.plan_only:
+            print("Start each worker with: python src/generate_sharded.py --worker N")
+            return
+        run_local_workers(plan, shard_dir, args.fake_gpt, gpt_cache)
+
+    setup_gpt_client(args.fake_gpt, gpt_cache)
+    merge_shards(collection, plan, shard_dir)
+    collection.export()
+
+    elapsed_time = time.perf_counter() - start_time
+    print(f"Merged {len(collection.cards)} cards in {elapsed_time:.1f}s.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from functools import cached_property
 import math
+from typing import Callable
 
 from mechanics.element import NEUTRAL, Element
 
@@ -17,18 +18,9 @@ class Ability:
 
     @cached_property
     def power(self):
-        base_power = self.cost * 10
-
-        # If it's mixed or fully elemental, it's stronger.
-        if self.element.is_neutral:
-            elemental_bonus_points = 0
-        else:
-            if self.is_mixed_element or self.cost == 1:
-                elemental_bonus_points = 10
-            else:
-                elemental_bonus_points = 20
-
-        return base_power + elemental_bonus_points
+        return get_ability_power(
+            self.cost, self.element.is_neutral, self.is_mixed_element
+        )
 
     @cached_property
     def elemental_cost(self) -> int:
@@ -79,3 +71,27 @@ class Ability:
             "is_mixed_element": self.is_mixed_element,
             "power": self.power,
         }
+
+    @classmethod
+    def from_json(cls, data: dict, get_element: Callable[[str], Element]):
+        return cls(
+            name=data["name"],
+            element=get_element(data["element"]),
+            cost=data["cost"],
+            is_mixed_element=data["is_mixed_element"],
+        )
+
+
+def get_ability_power(cost: int, is_neutral: bool, is_mixed_element: bool) -> int:
+    base_power = cost * 10
+
+    # If it's mixed or fully elemental, it's stronger.
+    if is_neutral:
+        elemental_bonus_points = 0
+    else:
+        if is_mixed_element or cost == 1:
+            elemental_bonus_points = 10
+        else:
+            elemental_bonus_points = 20
+
+    return base_power + elemental_bonus_points
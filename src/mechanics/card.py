@@ -1,5 +1,6 @@
 from dataclasses import dataclass, field
 from functools import cached_property
+from typing import Callable
 from content.style import Style
 from mechanics.element import Element
 from mechanics.rarity import Rarity
@@ -23,6 +24,8 @@ class Card:
 
     image_prompt: str | None = None
     visual_description: str | None = None
+    # The names GPT suggested, so the name can be picked again against other cards.
+    name_choices: list[str] = field(default_factory=list)
 
     def __repr__(self):
         rarity_stars = STAR_UNICODE * (self.rarity.index + 1)
@@ -53,6 +56,27 @@ class Card:
             "image_file": self.image_file,
         }
 
+    @classmethod
+    def from_json(
+        cls,
+        data: dict,
+        get_element: Callable[[str], Element],
+        get_rarity: Callable[[str], Rarity],
+    ):
+        card = cls(
+            index=data["index"],
+            name=data["name"],
+            description=data["description"],
+            element=get_element(data["element"]),
+            rarity=get_rarity(data["rarity"]),
+            hp=data["hp"],
+            image_prompt=data.get("image_prompt"),
+        )
+        card.abilities = [
+            Ability.from_json(ability, get_element) for ability in data["abilities"]
+        ]
+        return card
+
     @property
     def image_file(self):
         return f"{self.index:03d}_{self.snake_case_name}.png"
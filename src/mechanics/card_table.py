@@ -0,0 +1,407 @@
+import json
+import os
+import pathlib
+import shutil
+from typing import Callable, Iterable
+import numpy as np
+from mechanics.ability import Ability
+from mechanics.card import Card
+from mechanics.element import Element
+from mechanics.rarity import Rarity
+
+# Cards have at most two abilities, so ability columns are (n_cards, 2).
+MAX_ABILITIES = 2
+NO_STRING = -1
+
+# Saved tables are a folder of .npy columns, which can be memory-mapped.
+TABLE_FORMAT_VERSION = 1
+TABLE_META_FILE = "meta.json"
+STRINGS_FILE = "strings.bin"
+STRING_OFFSETS_FILE = "string_offsets.npy"
+COLUMNS = [
+    "index",
+    "hp",
+    "element",
+    "rarity",
+    "name",
+    "description",
+    "image_prompt",
+    "ability_name",
+    "ability_element",
+    "ability_cost",
+    "ability_is_mixed",
+    "ability_power",
+]
+
+
+class StringPool:
+    """Each distinct string stored once, as UTF-8 in a single buffer."""
+
+    def __init__(self):
+        self._data = bytearray()
+        self._offsets = [0]
+        self._ids: dict[str, int] | None = {}
+
+    def add(self, text: str | None) -> int:
+        if text is None:
+            return NO_STRING
+        if text not in self._ids:
+            self._ids[text] = len(self._offsets) - 1
+            self._data += text.encode()
+            self._offsets.append(len(self._data))
+        return self._ids[text]
+
+    def get(self, string_id: int) -> str | None:
+        if string_id == NO_STRING:
+            return None
+        start, end = self._offsets[string_id], self._offsets[string_id + 1]
+        return bytes(self._data[start:end]).decode()
+
+    def get_many(self, string_ids: np.ndarray) -> list:
+        """Look up an array of string ids at once, keeping the array's shape."""
+        string_ids = np.asarray(string_ids)
+        if string_ids.size == 0:
+            return string_ids.tolist()
+
+        offsets = np.asarray(self._offsets)
+        valid_ids = np.maximum(string_ids, 0)
+        starts, ends = offsets[valid_ids], offsets[valid_ids + 1]
+
+        # Only copy the part of the buffer these strings are in.
+        low, high = int(starts.min()), int(ends.max())
+        data = bytes(self._data[low:high])
+        flat_strings = [
+            None if string_id == NO_STRING else data[start - low : end - low].decode()
+            for string_id, start, end in zip(
+                string_ids.ravel().tolist(),
+                starts.ravel().tolist(),
+                ends.ravel().tolist(),
+            )
+        ]
+        if string_ids.ndim == 1:
+            return flat_strings
+        width = string_ids.shape[1]
+        return [flat_strings[i : i + width] for i in range(0, len(flat_strings), width)]
+
+    def save(self, path: pathlib.Path):
+        with open(path / STRINGS_FILE, "wb") as f:
+            f.write(self._data)
+        np.save(path / STRING_OFFSETS_FILE, np.asarray(self._offsets, dtype=np.int64))
+
+    @classmethod
+    def load(cls, path: pathlib.Path, mmap: bool = True) -> "StringPool":
+        pool = cls()
+        pool._ids = None
+        pool._offsets = np.load(
+            path / STRING_OFFSETS_FILE, mmap_mode="r" if mmap else None
+        )
+        if mmap and pool._offsets[-1] > 0:
+            pool._data = np.memmap(path / STRINGS_FILE, dtype=np.uint8, mode="r")
+        else:
+            pool._data = (path / STRINGS_FILE).read_bytes()
+        return pool
+
+    def freeze(self):
+        # The lookup dict is only needed while adding, and costs more than the strings.
+        self._ids = None
+        self._data = bytes(self._data)
+        self._offsets = np.array(self._offsets, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._data) + np.asarray(self._offsets).nbytes
+
+
+class CardTable:
+    """
+    A read-only collection of cards stored as columns: numbers in NumPy arrays,
+    elements and rarities as indices into shared lists, and text in a StringPool.
+    It holds millions of cards in a fraction of the memory of Card objects, and
+    turns any row back into a Card (or its JSON) on demand.
+    """
+
+    def __init__(
+        self,
+        n_cards: int,
+        elements: list[Element],
+        rarities: list[Rarity],
+    ):
+        self.elements = elements
+        self.rarities = rarities
+        self.strings = StringPool()
+
+        self.index = np.zeros(n_cards, dtype=np.int32)
+        self.hp = np.zeros(n_cards, dtype=np.int16)
+        self.element = np.zeros(n_cards, dtype=np.int8)
+        self.rarity = np.zeros(n_cards, dtype=np.int8)
+        self.name = np.zeros(n_cards, dtype=np.int32)
+        self.description = np.zeros(n_cards, dtype=np.int32)
+        self.image_prompt = np.zeros(n_cards, dtype=np.int32)
+
+        # Ability slots with a cost of 0 are empty.
+        ability_shape = (n_cards, MAX_ABILITIES)
+        self.ability_name = np.full(ability_shape, NO_STRING, dtype=np.int32)
+        self.ability_element = np.zeros(ability_shape, dtype=np.int8)
+        self.ability_cost = np.zeros(ability_shape, dtype=np.int8)
+        self.ability_is_mixed = np.zeros(ability_shape, dtype=bool)
+        self.ability_power = np.zeros(ability_shape, dtype=np.int16)
+
+    @classmethod
+    def from_cards(
+        cls,
+        cards: list[Card],
+        elements: list[Element],
+        rarities: list[Rarity],
+    ) -> "CardTable":
+        return cls._from_rows(len(cards), cards, elements, rarities)
+
+    @classmethod
+    def from_json(
+        cls,
+        cards_data: list[dict],
+        elements: list[Element],
+        rarities: list[Rarity],
+        get_element: Callable[[str], Element],
+        get_rarity: Callable[[str], Rarity],
+    ) -> "CardTable":
+        # Convert one card at a time, so the Card objects never all exist at once.
+        cards = (Card.from_json(data, get_element, get_rarity) for data in cards_data)
+        return cls._from_rows(len(cards_data), cards, elements, rarities)
+
+    @classmethod
+    def _from_rows(
+        cls,
+        n_cards: int,
+        cards: Iterable[Card],
+        elements: list[Element],
+        rarities: list[Rarity],
+    ) -> "CardTable":
+        table = cls(n_cards, list(elements), list(rarities))
+        element_codes = {element.name: i for i, element in enumerate(elements)}
+        rarity_codes = {rarity.name: i for i, rarity in enumerate(rarities)}
+
+        def element_code(element: Element) -> int:
+            # Cards may use elements the collection doesn't list, like Neutral.
+            if element.name not in element_codes:
+                element_codes[element.name] = len(table.elements)
+                table.elements.append(element)
+            return element_codes[element.name]
+
+        def rarity_code(rarity: Rarity) -> int:
+            if rarity.name not in rarity_codes:
+                rarity_codes[rarity.name] = len(table.rarities)
+                table.rarities.append(rarity)
+            return rarity_codes[rarity.name]
+
+        for row, card in enumerate(cards):
+            table.index[row] = card.index
+            table.hp[row] = card.hp
+            table.element[row] = element_code(card.element)
+            table.rarity[row] = rarity_code(card.rarity)
+            table.name[row] = table.strings.add(card.name)
+            table.description[row] = table.strings.add(card.description)
+            table.image_prompt[row] = table.strings.add(card.image_prompt)
+
+            for slot, ability in enumerate(card.abilities):
+                table.ability_name[row, slot] = table.strings.add(ability.name)
+                table.ability_element[row, slot] = element_code(ability.element)
+                table.ability_cost[row, slot] = ability.cost
+                table.ability_is_mixed[row, slot] = ability.is_mixed_element
+                table.ability_power[row, slot] = ability.power
+
+        table.strings.freeze()
+        return table
+
+    def save(self, path: str):
+        """
+        Save the table as a folder of uncompressed columns, so it can be loaded
+        (memory-mapped) without reading the whole thing.
+        """
+        path = pathlib.Path(path)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        if tmp_path.exists():
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        for column in COLUMNS:
+            np.save(tmp_path / f"{column}.npy", getattr(self, column))
+        self.strings.save(tmp_path)
+        meta = {
+            "format_version": TABLE_FORMAT_VERSION,
+            "n_cards": len(self),
+            "elements": [element.name for element in self.elements],
+            "rarities": [[rarity.name, rarity.index] for rarity in self.rarities],
+        }
+        with open(tmp_path / TABLE_META_FILE, "w") as f:
+            json.dump(meta, f, indent=2)
+
+        # Swap the finished folder in, so readers never see a half-written table.
+        if path.exists():
+            old_path = path.with_name(f"{path.name}.old")
+            # A save that crashed mid-swap may have left its old folder behind.
+            shutil.rmtree(old_path, ignore_errors=True)
+            os.replace(path, old_path)
+            os.replace(tmp_path, path)
+            shutil.rmtree(old_path)
+        else:
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        get_element: Callable[[str], Element],
+        get_rarity: Callable[[str], Rarity],
+        mmap: bool = True,
+    ) -> "CardTable":
+        """
+        Load a saved table. With mmap, the columns are only read from disk as
+        they're used, so looking up a few cards doesn't load the whole table.
+        """
+        path = pathlib.Path(path)
+        with open(path / TABLE_META_FILE) as f:
+            meta = json.load(f)
+        if meta["format_version"] != TABLE_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported card table version {meta['format_version']} in {path}"
+            )
+
+        elements = [get_element(name) for name in meta["elements"]]
+        rarities = [get_rarity(name) for name, _ in meta["rarities"]]
+        table = cls(0, elements, rarities)
+        for column in COLUMNS:
+            setattr(
+                table,
+                column,
+                np.load(path / f"{column}.npy", mmap_mode="r" if mmap else None),
+            )
+        table.strings = StringPool.load(path, mmap)
+        return table
+
+    def row_of(self, card_index: int) -> int:
+        """The row of the card with this index, without scanning the table."""
+        row = int(np.searchsorted(self.index, card_index))
+        if row < len(self) and self.index[row] == card_index:
+            return row
+
+        # Only tables that aren't sorted by index get here.
+        rows = np.flatnonzero(self.index == card_index)
+        if len(rows) == 0:
+            raise KeyError(f"No card with index {card_index}")
+        return int(rows[0])
+
+    def __len__(self):
+        return len(self.index)
+
+    def card(self, row: int) -> Card:
+        return self._card(self._read_rows(row, row + 1)[0])
+
+    def to_json(self, row: int) -> dict:
+        """The same as Card.to_json, without building the Card."""
+        return self._card_json(self._read_rows(row, row + 1)[0])
+
+    def cards(self) -> Iterable[Card]:
+        for rows in self._read_chunks():
+            for values in rows:
+                yield self._card(values)
+
+    def to_json_rows(self) -> Iterable[dict]:
+        for rows in self._read_chunks():
+            for values in rows:
+                yield self._card_json(values)
+
+    def _read_chunks(self, chunk_size: int = 65536) -> Iterable[list[dict]]:
+        for start in range(0, len(self), chunk_size):
+            yield self._read_rows(start, min(start + chunk_size, len(self)))
+
+    def _read_rows(self, start: int, end: int) -> list[dict]:
+        """Rows as plain Python values, reading each column once for the whole range."""
+        columns = {column: getattr(self, column)[start:end] for column in COLUMNS}
+        strings = {
+            column: self.strings.get_many(columns[column])
+            for column in ["name", "description", "image_prompt", "ability_name"]
+        }
+        numbers = {
+            column: columns[column].tolist()
+            for column in COLUMNS
+            if column not in strings
+        }
+
+        rows = []
+        for i in range(end - start):
+            abilities = [
+                (
+                    strings["ability_name"][i][slot],
+                    self.elements[numbers["ability_element"][i][slot]],
+                    numbers["ability_cost"][i][slot],
+                    numbers["ability_is_mixed"][i][slot],
+                    numbers["ability_power"][i][slot],
+                )
+                for slot in range(MAX_ABILITIES)
+                if numbers["ability_cost"][i][slot] > 0
+            ]
+            rows.append(
+                {
+                    "index": numbers["index"][i],
+                    "hp": numbers["hp"][i],
+                    "element": self.elements[numbers["element"][i]],
+                    "rarity": self.rarities[numbers["rarity"][i]],
+                    "name": strings["name"][i],
+                    "description": strings["description"][i],
+                    "image_prompt": strings["image_prompt"][i],
+                    "abilities": abilities,
+                }
+            )
+        return rows
+
+    @staticmethod
+    def _card(values: dict) -> Card:
+        abilities = [
+            Ability(name=name, element=element, cost=cost, is_mixed_element=is_mixed)
+            for name, element, cost, is_mixed, _ in values["abilities"]
+        ]
+        return Card(
+            index=values["index"],
+            name=values["name"],
+            element=values["element"],
+            rarity=values["rarity"],
+            hp=values["hp"],
+            abilities=abilities,
+            description=values["description"],
+            image_prompt=values["image_prompt"],
+        )
+
+    @staticmethod
+    def _card_json(values: dict) -> dict:
+        index, name = values["index"], values["name"]
+        return {
+            "index": index,
+            "name": name,
+            "description": values["description"],
+            "element": values["element"].name,
+            "rarity": values["rarity"].name,
+            "rarity_index": values["rarity"].index,
+            "hp": values["hp"],
+            "abilities": [
+                {
+                    "name": name,
+                    "element": element.name,
+                    "cost": cost,
+                    "is_mixed_element": is_mixed,
+                    "power": power,
+                }
+                for name, element, cost, is_mixed, power in values["abilities"]
+            ],
+            "image_prompt": values["image_prompt"],
+            "image_file": f"{index:03d}_{name.lower().replace(' ', '_')}.png",
+        }
+
+    @property
+    def nbytes(self) -> int:
+        arrays = [
+            value for value in vars(self).values() if isinstance(value, np.ndarray)
+        ]
+        return sum(array.nbytes for array in arrays) + self.strings.nbytes
@@ -1,30 +1,39 @@
-from dataclasses import dataclass
+import asyncio
+from dataclasses import dataclass, field
 import random
 from pokemon_content.pokemon_content_pool import (
     AMBIENCE_BY_ELEMENT,
     get_closest_match,
-    get_creature_types,
     get_environments,
     get_random_ambience,
     get_random_detail_adjective,
     get_random_rarity_adjective,
     get_random_series_adjective,
     get_random_style_suffix,
+    get_sorted_details,
+    SUBJECTS_BY_ELEMENT,
+    UnseenSubjects,
 )
-from content.collection import Collection
+from content.collection import Collection, SeriesPlan
 from content.style import Style
 from mechanics.element import Element
 from mechanics.card import Card
 from mechanics.rarity import Rarity
 from mechanics.ability import Ability
 from pokemon_content.pokemon_prompts import (
-    generate_card_name,
+    generate_card_name_choices,
     generate_desc,
+    get_card_name_choices,
+    get_card_name_prompt,
+    get_desc_prompt,
     get_image_prompt,
     get_visual_description,
+    parse_desc,
+    pick_card_name,
 )
 from util.ability_name_library import get_ability_name
 from util.gpt_call import gpt_client
+from util.tracing import tracer
 
 
 @dataclass
@@ -34,6 +43,13 @@ class PokemonCollection(Collection):
     ABILITY_TO_HP_PTS = 2  # 1 ability cost is worth 2 HP points.
     NEUTRAL_ELEMENT_CHANCE = 0.5
     MIXED_ELEMENT_CHANCE = 0.5
+    # The chance that 3-5 ability points are split over two abilities.
+    SPLIT_ABILITY_CHANCE = 0.5
+
+    # Kept in step with subjects_seen, so picking a new subject doesn't scan them all.
+    unseen_subjects: UnseenSubjects = field(
+        default_factory=UnseenSubjects, repr=False, compare=False
+    )
 
     def generate_card(
         self,
@@ -41,33 +57,30 @@ class PokemonCollection(Collection):
         rarity: Rarity,
         inherited_style: Style = None,
         series_index: int | None = None,
-        subject_override: str = None,
+        subject: str = None,
+        generate_text: bool = True,
+        card_index: int | None = None,
     ) -> Card:
 
-        is_part_of_series = series_index is not None
-        if is_part_of_series:
-            max_ability_points = self.get_points_budget(rarity.index, series_index)
-        else:
-            max_ability_points = self.get_points_budget(rarity.index, 1)
-
-        hp_points = random.randint(0, max_ability_points // 2)
-        ability_points = max_ability_points - hp_points
-        ability_costs = self.get_ability_points_costs(ability_points, rarity.index)
-        abilities = self.generate_abilities(element, ability_costs)
-
-        for ability in abilities:
-            ability.name = get_ability_name(ability)
+        card_index = card_index if card_index else len(self.cards) + 1
+        rng = self.get_card_rng(card_index)
+        hp, abilities = self.generate_stats(element, rarity, series_index, rng)
 
-        # Calculate HP
-        bonus_hp_points = max_ability_points + (hp_points * self.ABILITY_TO_HP_PTS)
-        hp = 10 * bonus_hp_points
+        with tracer().span("get_ability_name", card_index):
+            for ability in abilities:
+                key = ability.ability_key
+                ability.name = get_ability_name(
+                    ability, self.ability_key_counts[key], self.get_names_seed()
+                )
+                self.ability_key_counts[key] += 1
 
-        style = self.generate_style(
-            inherited_style, element, rarity, series_index, subject_override
-        )
+        with tracer().span("generate_style", card_index):
+            style = self.generate_style(
+                inherited_style, element, rarity, series_index, subject, rng
+            )
 
         card = Card(
-            index=len(self.cards) + 1,
+            index=card_index,
             name="Untitled Card",
             element=element,
             rarity=rarity,
@@ -76,19 +89,169 @@ class PokemonCollection(Collection):
             style=style,
         )
 
-        card.image_prompt = get_image_prompt(card)
+        with tracer().span("get_image_prompt", card.index):
+            card.image_prompt = get_image_prompt(card)
         card.visual_description = get_visual_description(card)
 
+        # Cards without text still take their index now, so it stays the same.
+        self.cards.append(card)
+        if generate_text:
+            self.generate_card_text(card)
+        return card
+
+    def generate_stats(
+        self,
+        element: Element,
+        rarity: Rarity,
+        series_index: int | None,
+        rng: random.Random,
+    ) -> tuple[int, list[Ability]]:
+        """The card's HP and (unnamed) abilities, which are its first draws from rng."""
+        is_part_of_series = series_index is not None
+        if is_part_of_series:
+            max_ability_points = self.get_points_budget(rarity.index, series_index)
+        else:
+            max_ability_points = self.get_points_budget(rarity.index, 1)
+
+        hp_points = rng.randint(0, self.get_max_hp_points(max_ability_points))
+        ability_points = max_ability_points - hp_points
+        ability_costs = self.get_ability_points_costs(ability_points, rarity.index, rng)
+        abilities = self.generate_abilities(element, ability_costs, rng)
+        return self.get_hp(max_ability_points, hp_points), abilities
+
+    def skip_series(self, plans: list[SeriesPlan]):
+        # Only the abilities carry over to later cards (through the names they use),
+        # and rolling them doesn't need GPT, so this is cheap.
+        for plan in plans:
+            for card_index, rarity, series_index in self.get_series_cards(plan):
+                rng = self.get_card_rng(card_index)
+                _, abilities = self.generate_stats(
+                    plan.element, rarity, series_index, rng
+                )
+                self.ability_key_counts.update(
+                    ability.ability_key for ability in abilities
+                )
+            if plan.subject:
+                self.subjects_seen.add(plan.subject)
+
+    def generate_card_text(self, card: Card):
         # Generate a name for the card.
         if gpt_client().is_openai_enabled:
-            card.name = generate_card_name(card, self.card_names_seen)
-            card.description = generate_desc(card)
-
-        card.image_prompt = get_image_prompt(card)
+            with tracer().span("generate_card_name", card.index):
+                card.name_choices = generate_card_name_choices(card)
+                card.name = pick_card_name(card.name_choices, self.card_names_seen)
+            with tracer().span("generate_desc", card.index):
+                card.description = generate_desc(card)
+
+        with tracer().span("get_image_prompt", card.index):
+            card.image_prompt = get_image_prompt(card)
         card.visual_description = get_visual_description(card)
         self.card_names_seen.add(card.name)
-        self.cards.append(card)
-        return card
+        self.on_card_generated(card)
+
+    async def generate_series_async(
+        self, plans: list[SeriesPlan], max_concurrency: int = 8
+    ) -> list[list[Card]]:
+        # Roll every card first and in order, so the ability names (and therefore
+        # the cards) are the same as calling generate_series one plan at a time.
+        all_series = [self.generate_series(plan, generate_text=False) for plan in plans]
+        cards = [card for series in all_series for card in series]
+        await self.generate_card_text_async(cards, max_concurrency)
+        return all_series
+
+    async def generate_card_text_async(
+        self, cards: list[Card], max_concurrency: int = 8
+    ):
+        if not gpt_client().is_openai_enabled:
+            for card in cards:
+                self.generate_card_text(card)
+            return
+
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def get_completion(prompt: str, stage: str, card: Card, **kwargs):
+            async with semaphore:
+                with tracer().span(stage, card.index):
+                    return await gpt_client().get_completion_async(prompt, **kwargs)
+
+        name_tasks = [
+            asyncio.create_task(
+                get_completion(
+                    get_card_name_prompt(card),
+                    "generate_card_name",
+                    card,
+                    max_tokens=256,
+                    n=5,
+                )
+            )
+            for card in cards
+        ]
+        desc_tasks = []
+
+        try:
+            # Names are picked in card order, so de-duplication against the names
+            # already seen gives the same result as the serial path.
+            for card, name_task in zip(cards, name_tasks):
+                card.name_choices = get_card_name_choices(await name_task)
+                card.name = pick_card_name(card.name_choices, self.card_names_seen)
+                self.card_names_seen.add(card.name)
+                desc_tasks.append(
+                    asyncio.create_task(
+                        get_completion(
+                            get_desc_prompt(card), "generate_desc", card, max_tokens=256
+                        )
+                    )
+                )
+
+            for card, desc_task in zip(cards, desc_tasks):
+                card.description = parse_desc(await desc_task)
+                with tracer().span("get_image_prompt", card.index):
+                    card.image_prompt = get_image_prompt(card)
+                card.visual_description = get_visual_description(card)
+                self.on_card_generated(card)
+        finally:
+            for task in [*name_tasks, *desc_tasks]:
+                task.cancel()
+
+    def add_shard_series(self, cards: list[Card]):
+        """
+        Add a series that a shard generated. Its cards already have their indices,
+        stats and styles, but the shard could only avoid the names it had seen, so
+        each name is picked again from the card's name choices. A card whose name
+        changes gets its description generated again, for the new name.
+        """
+        for card in cards:
+            if card.name_choices:
+                name = pick_card_name(card.name_choices, self.card_names_seen)
+                if name != card.name:
+                    card.name = name
+                    with tracer().span("generate_desc", card.index):
+                        card.description = generate_desc(card)
+                    card.image_prompt = get_image_prompt(card)
+
+            self.cards.append(card)
+            self.subjects_seen.add(card.style.subject)
+            self.card_names_seen.add(card.name)
+            self.on_card_generated(card)
+
+    def pick_series_subject(
+        self,
+        element: Element,
+        subject_override: str | None,
+        subjects_seen: set[str],
+        rng: random.Random,
+    ) -> str:
+        if subject_override is not None:
+            return get_closest_match(subject_override).name
+
+        # Both are sorted by name, so the same seed always picks the same subject.
+        reduced_subjects = self.unseen_subjects.get(element, subjects_seen)
+        if len(reduced_subjects) == 0:
+            reduced_subjects = SUBJECTS_BY_ELEMENT[element]
+
+        subject = rng.choice(reduced_subjects)
+        self.unseen_subjects.mark_seen(subject.name, subjects_seen)
+        return subject.name
 
     def generate_style(
         self,
@@ -96,7 +259,8 @@ class PokemonCollection(Collection):
         element: Element,
         rarity: Rarity,
         series_index: int | None = None,
-        subject_override: str = None,
+        subject: str = None,
+        rng: random.Random = random,
     ) -> Style:
 
         style = Style(
@@ -113,36 +277,25 @@ class PokemonCollection(Collection):
             style.detail = inherited_style.detail
             style.environment = inherited_style.environment
         else:
-
-            if subject_override is not None:
-                subject = get_closest_match(subject_override)
-                style.subject = subject.name
-            else:
-                potential_subjects = get_creature_types(element)
-                reduced_subjects: set = potential_subjects - self.subjects_seen
-                if len(reduced_subjects) == 0:
-                    reduced_subjects = potential_subjects
-
-                subject = random.choice(list(reduced_subjects))
-                self.subjects_seen.add(subject)
-                style.subject = subject.name
-
-            potential_details = set(subject.details)
-            reduced_details: set = potential_details - self.subjects_seen
-            if len(reduced_details) == 0:
-                reduced_details = potential_details
-
-            detail = random.choice(list(reduced_details))
-            detail_adjective = get_random_detail_adjective(element=element)
+            if subject is None:
+                # Cards generated outside of a series plan pick their own subject.
+                subject = self.pick_series_subject(
+                    element, None, self.subjects_seen, rng
+                )
+            subject = get_closest_match(subject)
+            style.subject = subject.name
+
+            detail = rng.choice(get_sorted_details(subject))
+            detail_adjective = get_random_detail_adjective(element, rng)
             style.detail = detail.text(detail_adjective)
 
             # Pick the environment
             potential_environments = get_environments(element)
-            style.environment = random.choice(potential_environments)
+            style.environment = rng.choice(potential_environments)
 
         # Pick adjective(s) for the subject.
-        rarity_prefix = get_random_rarity_adjective(rarity.index)
-        series_prefix = get_random_series_adjective(series_index)
+        rarity_prefix = get_random_rarity_adjective(rarity.index, rng)
+        series_prefix = get_random_series_adjective(series_index, rng)
         element_prefix = f"{element.name.lower()}-type"
 
         if series_index is not None:
@@ -163,31 +316,38 @@ class PokemonCollection(Collection):
             # Use the last background for the final card in the series.
             style.ambience = AMBIENCE_BY_ELEMENT.get(element)[-1]
         else:
-            style.ambience = get_random_ambience(element)
+            style.ambience = get_random_ambience(element, rng)
 
         # Set the style suffix
-        style.style_suffix = (
-            f"{get_random_style_suffix(series_index)} {self.theme_style.style_suffix}"
-        )
+        style_suffix = get_random_style_suffix(series_index, rng)
+        style.style_suffix = f"{style_suffix} {self.theme_style.style_suffix}"
 
         return style
 
-    def generate_abilities(self, element: Element, ability_costs: list[int]):
+    def generate_abilities(
+        self,
+        element: Element,
+        ability_costs: list[int],
+        rng: random.Random = random,
+    ):
         abilities = []
         for i, cost in enumerate(ability_costs):
             is_primary = i == 0
             if (
                 not is_primary
-                and random.random() < PokemonCollection.NEUTRAL_ELEMENT_CHANCE
+                and rng.random() < PokemonCollection.NEUTRAL_ELEMENT_CHANCE
             ):
                 ability_element = self.get_default_element()
             else:
                 ability_element = element
 
-            ability = PokemonCollection.generate_ability(ability_element, cost)
+            ability = PokemonCollection.generate_ability(ability_element, cost, rng)
             abilities.append(ability)
         return abilities
 
+    # pokemon_stats calls these rules on whole arrays of cards too, so they only
+    # use arithmetic that also works on NumPy arrays.
+
     @staticmethod
     def get_points_budget(rarity_index: int, series_index: int) -> int:
         # Cards in a series start weaker, but get stronger as the series progresses.
@@ -196,12 +356,26 @@ class PokemonCollection(Collection):
         return PokemonCollection.BASE_POINTS + rarity_bonus + series_bonus
 
     @staticmethod
-    def generate_ability(element: Element, cost: int) -> Ability:
+    def get_max_hp_points(points_budget: int) -> int:
+        # Up to half of the points can be spent on HP instead of abilities.
+        return points_budget // 2
+
+    @staticmethod
+    def get_hp(points_budget: int, hp_points: int) -> int:
+        bonus_hp_points = (
+            points_budget + hp_points * PokemonCollection.ABILITY_TO_HP_PTS
+        )
+        return 10 * bonus_hp_points
+
+    @staticmethod
+    def generate_ability(
+        element: Element, cost: int, rng: random.Random = random
+    ) -> Ability:
 
         is_mix = (
             not element.is_neutral
             and cost > 1
-            and (random.random() < PokemonCollection.MIXED_ELEMENT_CHANCE)
+            and (rng.random() < PokemonCollection.MIXED_ELEMENT_CHANCE)
         )
         ability = Ability(
             name="New Ability", element=element, cost=cost, is_mixed_element=is_mix
@@ -209,20 +383,25 @@ class PokemonCollection(Collection):
         return ability
 
     @staticmethod
-    def get_ability_points_costs(ability_points: int, rarity_index: int) -> list[str]:
+    def get_ability_points_costs(
+        ability_points: int, rarity_index: int, rng: random.Random = random
+    ) -> list[int]:
+        is_split = rng.random() < PokemonCollection.SPLIT_ABILITY_CHANCE
+        return PokemonCollection.split_ability_points(
+            ability_points, rarity_index, is_split
+        )
+
+    @staticmethod
+    def split_ability_points(
+        ability_points: int, rarity_index: int, is_split: bool
+    ) -> list[int]:
         # Determine how many abilities the card will have, and how many points each ability will cost.
         if ability_points >= 6:
             return [4, ability_points - 4]
         elif ability_points >= 4:
-            first_ability_cost = random.choice([3, 4])
-            if first_ability_cost == 4:
-                return [4]
-            else:
-                return [first_ability_cost, ability_points - first_ability_cost]
+            return [3, ability_points - 3] if is_split else [4]
         elif ability_points == 3:
-            if rarity_index < 1:
-                return [2, 1]
-            else:
-                return [3] if random.random() < 0.5 else [2, 1]
+            # Common cards always split them.
+            return [2, 1] if is_split or rarity_index < 1 else [3]
         else:
             return [ability_points]
@@ -387,18 +387,22 @@ def get_style_suffix(series_index: int | None) -> set[str]:
         return {"anime sketch"}
 
 
-def get_random_style_suffix(series_index: int | None) -> str:
-    return random.choice(list(get_style_suffix(series_index)))
+def get_random_style_suffix(
+    series_index: int | None, rng: random.Random = random
+) -> str:
+    return rng.choice(STYLE_SUFFIXES.get(series_index, DEFAULT_STYLE_SUFFIXES))
 
 
-def get_random_rarity_adjective(rarity_index: int) -> str:
-    return random.choice(list(get_rarity_adjectives_set(rarity_index)))
+def get_random_rarity_adjective(rarity_index: int, rng: random.Random = random) -> str:
+    return rng.choice(RARITY_ADJECTIVES.get(rarity_index, ("",)))
 
 
-def get_random_series_adjective(series_index: int | None) -> str:
+def get_random_series_adjective(
+    series_index: int | None, rng: random.Random = random
+) -> str:
     if series_index is None:
         return ""
-    return random.choice(list(get_series_adjectives_set(series_index)))
+    return rng.choice(SERIES_ADJECTIVES.get(series_index, ("",)))
 
 
 def get_creature_types(element: Element) -> set[CreatuteType]:
@@ -417,13 +421,89 @@ def get_environments(element: Element) -> set[str]:
     return ENVIRONMENTS_BY_ELEMENT.get(element)
 
 
-def get_random_ambience(element: Element) -> str:
-    # Get a random ambience, but don't return the last one, which is for fully evolved pokemon.
-    return random.choice(AMBIENCE_BY_ELEMENT.get(element)[:-1])
+def get_random_ambience(element: Element, rng: random.Random = random) -> str:
+    return rng.choice(AMBIENCES_BY_ELEMENT[element])
 
 
-def get_random_detail_adjective(element: Element) -> str:
-    joined_adjectives = GLOBAL_DETAIL_ADJECTIVES + DETAIL_ADJECTIVES_BY_ELEMENT.get(
-        element
-    )
-    return random.choice(joined_adjectives)
+def get_random_detail_adjective(element: Element, rng: random.Random = random) -> str:
+    return rng.choice(ALL_DETAIL_ADJECTIVES_BY_ELEMENT[element])
+
+
+def get_sorted_details(subject: CreatuteType) -> tuple[Detail, ...]:
+    details = DETAILS_BY_SUBJECT.get(subject)
+    if details is None:
+        # A subject made up for an override.
+        details = tuple(sorted(set(subject.details), key=lambda x: x.text()))
+    return details
+
+
+# Everything the random draws pick from, worked out once. The sets are sorted,
+# so the same seed always picks the same values.
+STYLE_SUFFIXES = {i: tuple(sorted(get_style_suffix(i))) for i in range(3)}
+DEFAULT_STYLE_SUFFIXES = tuple(sorted(get_style_suffix(None)))
+RARITY_ADJECTIVES = {i: tuple(sorted(get_rarity_adjectives_set(i))) for i in range(3)}
+SERIES_ADJECTIVES = {i: tuple(sorted(get_series_adjectives_set(i))) for i in range(3)}
+
+# The last ambience is left out, because it's for fully evolved pokemon.
+AMBIENCES_BY_ELEMENT = {
+    element: tuple(ambiences[:-1]) for element, ambiences in AMBIENCE_BY_ELEMENT.items()
+}
+ALL_DETAIL_ADJECTIVES_BY_ELEMENT = {
+    element: (*GLOBAL_DETAIL_ADJECTIVES, *adjectives)
+    for element, adjectives in DETAIL_ADJECTIVES_BY_ELEMENT.items()
+}
+SUBJECTS_BY_ELEMENT = {
+    element: tuple(sorted(subjects, key=lambda x: x.name))
+    for element, subjects in CREATURES_BY_ELEMENT.items()
+}
+# Keyed on the subject itself, since a few names are used by two subjects.
+DETAILS_BY_SUBJECT = {
+    subject: tuple(sorted(set(subject.details), key=lambda x: x.text()))
+    for subject in ALL_SUBJECTS
+}
+
+
+class UnseenSubjects:
+    """
+    The subjects of each element that no card has used yet, in name order. They
+    are kept up to date as subjects are used, rather than worked out for every
+    card. If the seen subjects are changed some other way (e.g. restored from
+    a checkpoint), the lists are rebuilt on the next lookup.
+    """
+
+    def __init__(self):
+        self._subjects_by_element: dict[Element, list[CreatuteType]] = {}
+        self._subjects_seen: set[str] | None = None
+        self._n_seen = 0
+
+    def get(self, element: Element, subjects_seen: set[str]) -> list[CreatuteType]:
+        if not self._is_synced(subjects_seen):
+            self._subjects_by_element = {}
+            self._subjects_seen = subjects_seen
+            self._n_seen = len(subjects_seen)
+
+        if element not in self._subjects_by_element:
+            self._subjects_by_element[element] = [
+                subject
+                for subject in SUBJECTS_BY_ELEMENT[element]
+                if subject.name not in subjects_seen
+            ]
+        return self._subjects_by_element[element]
+
+    def mark_seen(self, subject_name: str, subjects_seen: set[str]):
+        is_synced = self._is_synced(subjects_seen)
+        subjects_seen.add(subject_name)
+        if not is_synced:
+            return
+
+        self._n_seen = len(subjects_seen)
+        for subjects in self._subjects_by_element.values():
+            for i, subject in enumerate(subjects):
+                if subject.name == subject_name:
+                    del subjects[i]
+                    break
+
+    def _is_synced(self, subjects_seen: set[str]) -> bool:
+        return (
+            subjects_seen is self._subjects_seen and len(subjects_seen) == self._n_seen
+        )
@@ -62,11 +62,18 @@ def get_full_subject_description(card: Card):
     return subject_line
 
 
-def generate_card_name(card: Card, seen_names: set[str]) -> str:
+def generate_card_name_choices(card: Card) -> list[str]:
 
     if not gpt_client().is_openai_enabled:
-        return "Untitled Card"
+        return ["Untitled Card"]
 
+    prompt = get_card_name_prompt(card)
+    print(prompt)
+    response = gpt_client().get_completion(prompt, max_tokens=256, n=5)
+    return get_card_name_choices(response)
+
+
+def get_card_name_prompt(card: Card) -> str:
     # Generate a name for the card.
     # additional_modifier = "(max 2 words), "
     if card.rarity.index == 0:
@@ -76,9 +83,10 @@ def generate_card_name(card: Card, seen_names: set[str]) -> str:
 
     prompt = f"Generate a unique, orignal, creative,{additional_modifier} {card.style.subject_type} name for a {get_visual_description(card)}"
     prompt += f" (without using the word {card.style.subject_type.lower()} or {card.element.name.lower()}):\n"
-    print(prompt)
-    response = gpt_client().get_completion(prompt, max_tokens=256, n=5)
+    return prompt
 
+
+def get_card_name_choices(response) -> list[str]:
     potential_names = set()
     for potential_name in response.choices:
         name = potential_name.text
@@ -87,27 +95,38 @@ def generate_card_name(card: Card, seen_names: set[str]) -> str:
         name = string.capwords(name)
         potential_names.add(name)
 
-    # Pick the shortest name.
-    filtered_names = set(potential_names) - seen_names
-    if len(filtered_names) > 0:
-        potential_names = filtered_names
+    # Shortest first, breaking ties alphabetically.
+    return sorted(potential_names, key=lambda x: (len(x), x))
+
 
-    potential_names = sorted(potential_names, key=lambda x: len(x))
-    name = potential_names[0]
-    return name
+def pick_card_name(name_choices: list[str], seen_names: set[str]) -> str:
+    # Pick the shortest name that hasn't been used yet, if there is one.
+    for name in name_choices:
+        if name not in seen_names:
+            return name
+    return name_choices[0]
 
 
 def generate_desc(card: Card) -> str:
     # Generate a name for the monster.
     if gpt_client().is_openai_enabled:
-        prompt = f"Generate a short, original, creative Pokedex description for {card.name}, {get_visual_description(card)}. "
-        prompt += f"It has the following abilities: {', '.join([ability.name for ability in card.abilities])}. "
-        prompt += f"Be creative about its day-to-day life. "
-        prompt += f" (do not use the word {card.style.subject.lower()} or {card.element.name.lower()} or the ability names):\n"
+        prompt = get_desc_prompt(card)
         print(prompt)
         response = gpt_client().get_completion(prompt, max_tokens=256)
-        desc = response.choices[0].text
-        desc = desc.strip()
-        return desc
+        return parse_desc(response)
     else:
         return "No description available."
+
+
+def get_desc_prompt(card: Card) -> str:
+    prompt = f"Generate a short, original, creative Pokedex description for {card.name}, {get_visual_description(card)}. "
+    prompt += f"It has the following abilities: {', '.join([ability.name for ability in card.abilities])}. "
+    prompt += f"Be creative about its day-to-day life. "
+    prompt += f" (do not use the word {card.style.subject.lower()} or {card.element.name.lower()} or the ability names):\n"
+    return prompt
+
+
+def parse_desc(response) -> str:
+    desc = response.choices[0].text
+    desc = desc.strip()
+    return desc
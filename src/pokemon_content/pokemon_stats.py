@@ -0,0 +1,227 @@
+from dataclasses import dataclass, fields
+from functools import cache
+import numpy as np
+from mechanics.ability import get_ability_power
+from pokemon_content.pokemon_collection import PokemonCollection
+from pokemon_content.pokemon_elements import PokemonElements
+
+# A card has at most two abilities, so the ability columns are (n_cards, 2).
+MAX_ABILITIES = 2
+MAX_ABILITY_COST = 4
+
+
+@dataclass
+class CardStats:
+    """
+    The stats of many cards as columns, one row per card. Ability columns have a
+    row per card and a column per ability slot; unused slots have a cost of 0.
+    """
+
+    rarity_index: np.ndarray
+    series_index: np.ndarray
+    is_neutral_card: np.ndarray
+    points_budget: np.ndarray
+    hp_points: np.ndarray
+    hp: np.ndarray
+    ability_cost: np.ndarray
+    ability_is_neutral: np.ndarray
+    ability_is_mixed: np.ndarray
+    ability_power: np.ndarray
+
+    def __len__(self):
+        return len(self.rarity_index)
+
+    @property
+    def n_abilities(self) -> np.ndarray:
+        return (self.ability_cost > 0).sum(axis=1)
+
+    @property
+    def total_power(self) -> np.ndarray:
+        return self.ability_power.sum(axis=1)
+
+    def to_columns(self) -> dict[str, np.ndarray]:
+        return {field.name: getattr(self, field.name) for field in fields(self)}
+
+
+def generate_card_stats(
+    rarity_index: np.ndarray,
+    series_index: np.ndarray,
+    is_neutral_card: np.ndarray,
+    rng: np.random.Generator,
+) -> CardStats:
+    """
+    Roll the stats of every card at once, with the same rules (and odds) as
+    PokemonCollection.generate_card. Cards that aren't part of a series have a
+    series_index of 1, as they do there. The rules are the ones generate_card
+    calls: the arithmetic ones work on whole arrays, and the others are tabulated
+    once for every input they can get.
+    """
+    rarity_index = np.asarray(rarity_index, dtype=np.int8)
+    series_index = np.asarray(series_index, dtype=np.int8)
+    is_neutral_card = np.asarray(is_neutral_card, dtype=bool)
+    n_cards = len(rarity_index)
+
+    points_budget = PokemonCollection.get_points_budget(
+        rarity_index.astype(np.int16), series_index.astype(np.int16)
+    )
+    max_hp_points = PokemonCollection.get_max_hp_points(points_budget)
+    hp_points = rng.integers(0, max_hp_points, endpoint=True).astype(np.int16)
+    ability_points = points_budget - hp_points
+    hp = PokemonCollection.get_hp(points_budget, hp_points)
+
+    ability_cost = get_ability_costs(ability_points, rarity_index, rng)
+    has_ability = ability_cost > 0
+
+    # Only the second ability can be neutral on an elemental card.
+    is_secondary = np.zeros((n_cards, MAX_ABILITIES), dtype=bool)
+    is_secondary[:, 1:] = True
+    rolled_neutral = (
+        rng.random((n_cards, MAX_ABILITIES)) < PokemonCollection.NEUTRAL_ELEMENT_CHANCE
+    )
+    ability_is_neutral = has_ability & (
+        is_neutral_card[:, None] | (is_secondary & rolled_neutral)
+    )
+
+    ability_is_mixed = (
+        has_ability
+        & ~ability_is_neutral
+        & (ability_cost > 1)
+        & (
+            rng.random((n_cards, MAX_ABILITIES))
+            < PokemonCollection.MIXED_ELEMENT_CHANCE
+        )
+    )
+
+    return CardStats(
+        rarity_index=rarity_index,
+        series_index=series_index,
+        is_neutral_card=is_neutral_card,
+        points_budget=points_budget,
+        hp_points=hp_points,
+        hp=hp.astype(np.int16),
+        ability_cost=ability_cost,
+        ability_is_neutral=ability_is_neutral,
+        ability_is_mixed=ability_is_mixed,
+        ability_power=get_ability_powers(
+            ability_cost, ability_is_neutral, ability_is_mixed
+        ),
+    )
+
+
+def get_ability_costs(
+    ability_points: np.ndarray, rarity_index: np.ndarray, rng: np.random.Generator
+) -> np.ndarray:
+    """PokemonCollection.get_ability_points_costs, for every card at once."""
+    is_split = rng.random(len(ability_points)) < PokemonCollection.SPLIT_ABILITY_CHANCE
+    cost_table = get_ability_cost_table(
+        int(ability_points.max(initial=0)), int(rarity_index.max(initial=0))
+    )
+    return cost_table[ability_points, rarity_index, is_split.astype(np.int8)]
+
+
+@cache
+def get_ability_cost_table(max_points: int, max_rarity_index: int) -> np.ndarray:
+    """The ability costs for each number of points, rarity and split roll."""
+    cost_table = np.zeros(
+        (max_points + 1, max_rarity_index + 1, 2, MAX_ABILITIES), dtype=np.int8
+    )
+    for points in range(max_points + 1):
+        for rarity_index in range(max_rarity_index + 1):
+            for is_split in (False, True):
+                costs = PokemonCollection.split_ability_points(
+                    points, rarity_index, is_split
+                )
+                cost_table[points, rarity_index, int(is_split), : len(costs)] = costs
+    return cost_table
+
+
+def get_ability_powers(
+    ability_cost: np.ndarray,
+    ability_is_neutral: np.ndarray,
+    ability_is_mixed: np.ndarray,
+) -> np.ndarray:
+    """Ability.power, for every ability at once. Unused slots have no power."""
+    power = get_ability_power_table()[
+        ability_cost,
+        ability_is_neutral.astype(np.int8),
+        ability_is_mixed.astype(np.int8),
+    ]
+    return np.where(ability_cost > 0, power, 0).astype(np.int16)
+
+
+@cache
+def get_ability_power_table() -> np.ndarray:
+    """The power of an ability for each cost, and whether it's neutral or mixed."""
+    power_table = np.zeros((MAX_ABILITY_COST + 1, 2, 2), dtype=np.int16)
+    for cost in range(MAX_ABILITY_COST + 1):
+        for is_neutral in (False, True):
+            for is_mixed in (False, True):
+                power_table[cost, int(is_neutral), int(is_mixed)] = get_ability_power(
+                    cost, is_neutral, is_mixed
+                )
+    return power_table
+
+
+def simulate_card_layout(
+    n_series: int, n_rarities: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    The rarity, series index and neutrality of the cards in n_series random
+    series, drawn like Collection.plan_series.
+    """
+    series_length = rng.integers(1, 3, size=n_series, endpoint=True)
+    rarity_range = np.maximum(n_rarities - series_length, 0)
+    starting_rarity = rng.integers(0, rarity_range, endpoint=True)
+    n_elements = len(PokemonElements.ALL)
+    neutral_index = PokemonElements.ALL.index(PokemonElements.NEUTRAL)
+    is_neutral_series = rng.integers(0, n_elements, size=n_series) == neutral_index
+
+    # Each card's position in its series.
+    series_starts = np.cumsum(series_length) - series_length
+    position = np.arange(series_length.sum()) - np.repeat(series_starts, series_length)
+    length = np.repeat(series_length, series_length)
+
+    rarity_index = np.minimum(
+        n_rarities - 1, np.repeat(starting_rarity, series_length) + position
+    )
+    series_index = np.where(length > 1, position, 1)
+    is_neutral_card = np.repeat(is_neutral_series, series_length)
+    return rarity_index, series_index, is_neutral_card
+
+
+def simulate_card_stats(
+    n_series: int, seed: int | None = None, n_rarities: int = 3
+) -> CardStats:
+    rng = np.random.default_rng(seed)
+    rarity_index, series_index, is_neutral_card = simulate_card_layout(
+        n_series, n_rarities, rng
+    )
+    return generate_card_stats(rarity_index, series_index, is_neutral_card, rng)
+
+
+def summarize_card_stats(stats: CardStats) -> list[dict]:
+    """Averages per rarity, for checking the balance of the cards."""
+    rows = []
+    for rarity_index in np.unique(stats.rarity_index):
+        is_rarity = stats.rarity_index == rarity_index
+        costs = stats.ability_cost[is_rarity]
+        n_abilities = stats.n_abilities[is_rarity]
+        has_ability = costs > 0
+        rows.append(
+            {
+                "rarity_index": int(rarity_index),
+                "cards": int(is_rarity.sum()),
+                "hp": float(stats.hp[is_rarity].mean()),
+                "total_power": float(stats.total_power[is_rarity].mean()),
+                "total_cost": float(costs.sum(axis=1).mean()),
+                "power_per_cost": float(
+                    stats.ability_power[is_rarity].sum() / costs.sum()
+                ),
+                "two_abilities": float((n_abilities == 2).mean()),
+                "mixed": float(stats.ability_is_mixed[is_rarity][has_ability].mean()),
+                "neutral": float(
+                    stats.ability_is_neutral[is_rarity][has_ability].mean()
+                ),
+            }
+        )
+    return rows
@@ -1,15 +1,30 @@
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import hashlib
 import json
 import os
 import pathlib
-from PIL import Image, ImageFont, ImageDraw
+import time
+from PIL import Image, ImageDraw
 
 from pokemon_content.pokemon_elements import PokemonElements, get_resist, get_weakness
 from pokemon_content.pokemon_rarity import PokemonRarity
 from mechanics.ability import Ability
 from mechanics.card import Card
 from mechanics.element import Element
-
+from rendering.card_source import (
+    CardSelection,
+    CardSource,
+    card_sources_from_file,
+    card_sources_from_folder,
+)
+from rendering.card_sheet import SHEET_FORMATS, SheetLayout, parse_sheet_grid
+from rendering.art_cache import DEFAULT_ART_CACHE_PATH, art_cache, use_art_cache
+from rendering.render_assets import RenderAssets, render_assets
+from rendering.render_format import EncodeStats, RenderFormat, RENDER_FORMATS
+from rendering.render_manifest import RenderManifest, card_fingerprint
+from util.file_util import write_json_atomic
 
 MONSTER_IMAGE_SCALE = 0.255
 MONSTER_IMAGE_SCALE_SQ = 0.355
@@ -27,59 +42,364 @@ STATUS_Y_POSITION = 568
 STATUS_X_GAP = 82
 STATUS_SIZE = 20
 
-
-def render_cards(collection_path: str):
-    card_path = pathlib.Path(collection_path, "cards")
+BOLD_FONT = "Cabin-Bold.ttf"
+CONDENSED_FONT = "Cabin_Condensed-Regular.ttf"
+SYMBOL_FONT = "NotoSansSymbols2-Regular.ttf"
+RARITY_SYMBOLS = ["⬤", "◆", "★"]
+RARITY_SYMBOL_SIZES = [10, 14, 22]
+
+# Every font and size used on a card, so the asset cache can be warmed up front.
+CARD_FONTS = [
+    (BOLD_FONT, 28),
+    (BOLD_FONT, 24),
+    (CONDENSED_FONT, 28),
+    (CONDENSED_FONT, 32),
+    (CONDENSED_FONT, 18),
+    *[(SYMBOL_FONT, size) for size in RARITY_SYMBOL_SIZES],
+]
+
+# Bump this when the drawing code changes in a way the constants above don't show.
+LAYOUT_REVISION = 2
+
+
+def render_cards(
+    collection_path: str,
+    workers: int = 1,
+    chunk_size: int = None,
+    incremental: bool = False,
+    sheet_layout: SheetLayout = None,
+    render_format: RenderFormat = None,
+    cards_file: str = None,
+    selection: CardSelection = None,
+):
+    render_format = render_format if render_format else RenderFormat()
     card_render_path = pathlib.Path(collection_path, "renders")
     os.makedirs(card_render_path, exist_ok=True)
 
-    for card_path in card_path.iterdir():
-        # Only render .json files.
-        if not card_path.suffix == ".json":
+    # Read the cards from one collection file if we have one, rather than from
+    # every file in the cards folder.
+    if cards_file is not None:
+        card_sources = card_sources_from_file(cards_file, selection)
+    else:
+        card_path = pathlib.Path(collection_path, "cards")
+        card_sources = card_sources_from_folder(card_path, selection)
+
+    if incremental:
+        manifest = RenderManifest.load(card_render_path)
+        # A partial render keeps track of the cards it didn't select.
+        if selection is None:
+            manifest.prune({card_source.key for card_source in card_sources})
+        fingerprints = get_changed_card_fingerprints(
+            card_sources, collection_path, manifest, render_format
+        )
+        print(f"Skipping {len(card_sources) - len(fingerprints)} unchanged cards.")
+        card_sources = [
+            card_source
+            for card_source in card_sources
+            if card_source.key in fingerprints
+        ]
+
+    if sheet_layout is not None:
+        results = render_card_sheets(
+            card_sources, collection_path, sheet_layout, workers
+        )
+    elif workers > 1:
+        results, encode_stats = render_card_files_in_pool(
+            card_sources, collection_path, workers, chunk_size, render_format
+        )
+        print(encode_stats)
+    else:
+        assets = warm_render_assets(render_assets())
+        results, encode_stats = render_card_files(
+            card_sources, collection_path, assets, render_format
+        )
+        print(encode_stats)
+        print(f"Asset cache: {assets}")
+        print(f"Ability layer cache: {assets.ability_layers}")
+        print(f"Art cache: {art_cache()}")
+
+    if incremental:
+        for card_key, error in results:
+            if not error and fingerprints[card_key]:
+                manifest.record(card_key, fingerprints[card_key])
+        manifest.save()
+
+    failures = [(card_key, error) for card_key, error in results if error]
+    print(f"Rendered {len(results) - len(failures)} of {len(results)} cards.")
+    for card_key, error in failures:
+        # Print in red ASCII.
+        print(f"\033[91m [ERROR] {card_key}: {error}\033[0m")
+
+    return failures
+
+
+def get_changed_card_fingerprints(
+    card_sources: list[CardSource],
+    collection_path: str,
+    manifest: RenderManifest,
+    render_format: RenderFormat,
+) -> dict[str, dict | None]:
+    layout_version = get_layout_version()
+    changed = {}
+    for card_source in card_sources:
+        try:
+            data = card_source.load()
+            card = card_from_json(data)
+        except (ValueError, KeyError):
+            # Let the render step report the broken card.
+            changed[card_source.key] = None
             continue
 
-        with open(card_path) as f:
-            data = json.load(f)
-            card = card_from_json(data)
-            card_image = render_card(card, collection_path)
-            image_name = f"{card.index:03d}_{card.snake_case_name}.png"
-            card_image.save(card_render_path / f"{image_name}")
+        art_path = pathlib.Path(collection_path, "images", card.image_file)
+        # Hash the card's data rather than its file, so a card read from the
+        # cards folder matches the same card read from the collection file.
+        card_bytes = json.dumps(data, sort_keys=True).encode()
+        fingerprint = card_fingerprint(
+            card_bytes,
+            art_path,
+            get_render_file(card, render_format),
+            layout_version,
+        )
+        if not manifest.is_current(card_source.key, fingerprint):
+            changed[card_source.key] = fingerprint
+    return changed
+
+
+def get_layout_version() -> str:
+    layout = [
+        LAYOUT_REVISION,
+        MONSTER_IMAGE_SCALE,
+        MONSTER_IMAGE_SCALE_SQ,
+        IDEAL_CARD_WIDTH,
+        ABILITY_WIDTH,
+        ABILITY_HEIGHT,
+        ABILITY_COST_WIDTH,
+        ABILITY_COST_GAP,
+        ELEMENT_SIZE,
+        ABILITY_GAP,
+        POWER_WIDTH,
+        STATUS_Y_POSITION,
+        STATUS_X_GAP,
+        STATUS_SIZE,
+        RARITY_SYMBOLS,
+        CARD_FONTS,
+    ]
+    return hashlib.sha256(json.dumps(layout).encode()).hexdigest()[:16]
+
+
+def render_card_files(
+    card_sources: list[CardSource],
+    collection_path: str,
+    assets: RenderAssets = None,
+    render_format: RenderFormat = None,
+) -> tuple[list[tuple[str, str | None]], EncodeStats]:
+    render_format = render_format if render_format else RenderFormat()
+    encode_stats = EncodeStats(render_format.image_format)
+
+    # Collect failures per card, so one bad card doesn't abort the whole run.
+    results = []
+    for card_source in card_sources:
+        try:
+            render_card_file(
+                card_source, collection_path, assets, render_format, encode_stats
+            )
+            results.append((card_source.key, None))
+        except Exception as e:
+            results.append((card_source.key, f"{type(e).__name__}: {e}"))
+    return results, encode_stats
+
+
+def render_card_file(
+    card_source: CardSource,
+    collection_path: str,
+    assets: RenderAssets = None,
+    render_format: RenderFormat = None,
+    encode_stats: EncodeStats = None,
+):
+    render_format = render_format if render_format else RenderFormat()
+    card_render_path = pathlib.Path(collection_path, "renders")
+    card = card_from_json(card_source.load())
+    card_image = render_card(card, collection_path, assets)
+
+    start_time = time.perf_counter()
+    image_bytes = render_format.encode(card_image)
+    if encode_stats is not None:
+        encode_stats.add(time.perf_counter() - start_time, len(image_bytes))
+
+    image_name = get_render_file(card, render_format)
+    with open(card_render_path / image_name, "wb") as f:
+        f.write(image_bytes)
+    return image_name
+
+
+def get_render_file(card: Card, render_format: RenderFormat) -> str:
+    return f"{card.index:03d}_{card.snake_case_name}.{render_format.extension}"
+
+
+def render_card_sheets(
+    card_sources: list[CardSource],
+    collection_path: str,
+    sheet_layout: SheetLayout,
+    workers: int = 1,
+) -> list[tuple[str, str | None]]:
+    """
+    Render the cards straight onto sheets of the given layout, with an index.json
+    of where each card is. Each sheet is saved as soon as it's full, so only one
+    sheet per process is ever held in memory.
+    """
+    sheets_path = pathlib.Path(collection_path, "renders", "sheets")
+    os.makedirs(sheets_path, exist_ok=True)
+
+    n = sheet_layout.cards_per_sheet
+    sheets = list(
+        enumerate(card_sources[i : i + n] for i in range(0, len(card_sources), n))
+    )
+    render_sheet = partial(
+        render_card_sheet, collection_path=collection_path, sheet_layout=sheet_layout
+    )
 
+    if workers > 1:
+        # Whole sheets are handed to the workers, so each one saves its own.
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_render_worker,
+            initargs=(str(art_cache().path),),
+        ) as executor:
+            sheet_results = list(executor.map(render_sheet, sheets))
+    else:
+        assets = warm_render_assets(render_assets())
+        sheet_results = [render_sheet(sheet, assets=assets) for sheet in sheets]
+
+    results = []
+    index_cards = []
+    for sheet_index_cards, sheet_card_results in sheet_results:
+        index_cards.extend(sheet_index_cards)
+        results.extend(sheet_card_results)
+
+    write_json_atomic(
+        sheets_path / "index.json",
+        {
+            "columns": sheet_layout.columns,
+            "rows": sheet_layout.rows,
+            "card_width": sheet_layout.card_size[0],
+            "card_height": sheet_layout.card_size[1],
+            "sheets": [sheet_layout.sheet_file(i) for i, _ in sheets],
+            "cards": index_cards,
+        },
+    )
+    print(f"Saved {len(sheets)} sheets to {sheets_path}")
+    return results
+
+
+def render_card_sheet(
+    sheet: tuple[int, list[CardSource]],
+    collection_path: str,
+    sheet_layout: SheetLayout,
+    assets: RenderAssets = None,
+) -> tuple[list[dict], list[tuple[str, str | None]]]:
+    sheet_index, card_sources = sheet
+    sheet_file = sheet_layout.sheet_file(sheet_index)
+    sheet_image = Image.new("RGBA", sheet_layout.sheet_size, (0, 0, 0, 0))
+
+    index_cards = []
+    results = []
+    for slot, card_source in enumerate(card_sources):
+        # A card that fails to render leaves its slot on the sheet empty.
+        try:
+            card = card_from_json(card_source.load())
+            card_image = render_card(card, collection_path, assets)
+        except Exception as e:
+            results.append((card_source.key, f"{type(e).__name__}: {e}"))
+            continue
 
-def render_card(card: Card, collection_path: str):
-    print(f"Rendering {card.name}")
-    card_template_name = f"{card.element.name.lower()}_card.png"
-    card_image = Image.open(f"resources/cards/{card_template_name}")
+        x, y = sheet_layout.card_position(slot)
+        sheet_image.paste(card_image, (x, y))
+        index_cards.append(
+            {
+                "card_file": card_source.key,
+                "index": card.index,
+                "name": card.name,
+                "sheet": sheet_file,
+                "x": x,
+                "y": y,
+                "width": card_image.width,
+                "height": card_image.height,
+            }
+        )
+        results.append((card_source.key, None))
+
+    sheets_path = pathlib.Path(collection_path, "renders", "sheets")
+    sheet_image.save(sheets_path / sheet_file, **sheet_layout.save_options())
+    return index_cards, results
+
+
+def render_card_files_in_pool(
+    card_sources: list[CardSource],
+    collection_path: str,
+    workers: int,
+    chunk_size: int = None,
+    render_format: RenderFormat = None,
+) -> tuple[list[tuple[str, str | None]], EncodeStats]:
+    render_format = render_format if render_format else RenderFormat()
+    if chunk_size is None:
+        # A few chunks per worker keeps them all busy until the end of the run.
+        chunk_size = max(1, min(64, len(card_sources) // (workers * 4)))
+
+    chunks = [
+        card_sources[i : i + chunk_size]
+        for i in range(0, len(card_sources), chunk_size)
+    ]
+
+    results = []
+    encode_stats = EncodeStats(render_format.image_format)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_render_worker,
+        initargs=(str(art_cache().path),),
+    ) as executor:
+        render_chunk = partial(
+            render_card_files,
+            collection_path=collection_path,
+            render_format=render_format,
+        )
+        for chunk_results, chunk_encode_stats in executor.map(render_chunk, chunks):
+            results.extend(chunk_results)
+            encode_stats.merge(chunk_encode_stats)
+    return results, encode_stats
 
-    card_art_path = pathlib.Path(collection_path, "images", card.image_file)
 
-    if pathlib.Path(card_art_path).exists():
-        canvas = Image.new("RGBA", card_image.size, (0, 0, 0, 0))
-        card_art_image = Image.open(card_art_path)
+def _init_render_worker(art_cache_path: str):
+    # Each worker process loads its own copy of the assets once.
+    warm_render_assets(render_assets())
+    use_art_cache(art_cache_path)
+
+
+def warm_render_assets(assets: RenderAssets) -> RenderAssets:
+    assets.warm(
+        [element.name for element in PokemonElements.ALL],
+        [ELEMENT_SIZE, STATUS_SIZE],
+        CARD_FONTS,
+    )
+    for element in PokemonElements.ALL:
+        render_card_overlay(element, assets)
+        render_card_overlay_mask(element, assets)
+        render_card_blank_base(element, assets)
+    return assets
+
+
+def render_card(card: Card, collection_path: str, assets: RenderAssets = None):
+    print(f"Rendering {card.name}")
+    assets = assets if assets else render_assets()
+    card_image = render_card_base(card, collection_path, assets)
+    draw_card_details(card, card_image, assets)
+    return card_image
 
-        # Rescale the image to fit the card.
-        rescale_factor = IDEAL_CARD_WIDTH / card_art_image.size[0]
-        resized_image_shape = (
-            int(card_art_image.size[0] * rescale_factor),
-            int(card_art_image.size[1] * rescale_factor),
-        )
-        card_art_image = card_art_image.resize(resized_image_shape)
-
-        # Center the image.
-        card_center_x = card_image.size[0] / 2
-        card_center_y = 210
-        monster_image_x = card_center_x - (card_art_image.size[0] / 2)
-        monster_image_y = card_center_y - (card_art_image.size[1] / 2)
-        canvas.paste(card_art_image, (int(monster_image_x), int(monster_image_y)))
-        canvas.paste(card_image, (0, 0), card_image)
-        card_image = canvas
-    else:
-        # Print in yellow ASCII.
-        print(f"\033[93m [WARN] {card_art_path} not found.\033[0m")
 
+def draw_card_details(card: Card, card_image: Image.Image, assets: RenderAssets):
+    """Draw the card's name, HP, abilities and rarity onto its base."""
     # Write the name of the card.
     name_text_position = (48, 64)
-    title_font = ImageFont.truetype("resources/font/Cabin-Bold.ttf", 28)
+    title_font = assets.font(BOLD_FONT, 28)
     name_text = card.name
 
     # Draw the name text onto the card.
@@ -91,7 +411,7 @@ def render_card(card: Card, collection_path: str):
     # Draw the HP on the card.
     hp_x_position = card_image.width - 86
     hp_y_position = 64
-    hp_font = ImageFont.truetype("resources/font/Cabin_Condensed-Regular.ttf", 28)
+    hp_font = assets.font(CONDENSED_FONT, 28)
     hp_text = f"{card.hp} HP"
     draw.text(
         (hp_x_position, hp_y_position),
@@ -116,7 +436,7 @@ def render_card(card: Card, collection_path: str):
     # Draw the abilities in reverse order so that the first ability is at the bottom.
     abilities = reversed(card.abilities)
     for i, ability in enumerate(abilities):
-        ability_image = render_ability(ability)
+        ability_image = render_ability(ability, assets)
         ability_y = ability_y_origin + (i * (ABILITY_HEIGHT + ABILITY_COST_GAP))
         card_image.paste(
             ability_image,
@@ -140,12 +460,9 @@ def render_card(card: Card, collection_path: str):
             width=2,
         )
 
-    # Render the status of the card (weakness, resistance, etc.)
-    render_weakness_and_resist(card, card_image)
-
     # Write the rarity of the Pokemon.
     rarity_text_position = (58, 602)
-    rarity_font = ImageFont.truetype("resources/font/Cabin_Condensed-Regular.ttf", 18)
+    rarity_font = assets.font(CONDENSED_FONT, 18)
     rarity_text = f"{card.rarity.name} {card.element.name}-type Card"
     draw.text(
         rarity_text_position,
@@ -157,15 +474,8 @@ def render_card(card: Card, collection_path: str):
 
     # Write the rarity of the Pokemon.
     rarity_symbol_position = (card_image.width - 64, 605)
-    symbol_font = ImageFont.truetype("resources/font/NotoSansSymbols2-Regular.ttf", 22)
-    rarity_symbols = ["⬤", "◆", "★"]
-    rarity_symbol_sizes = [10, 14, 22]
-
-    symbol_text = rarity_symbols[card.rarity.index]
-    symbol_font = ImageFont.truetype(
-        "resources/font/NotoSansSymbols2-Regular.ttf",
-        rarity_symbol_sizes[card.rarity.index],
-    )
+    symbol_text = RARITY_SYMBOLS[card.rarity.index]
+    symbol_font = assets.font(SYMBOL_FONT, RARITY_SYMBOL_SIZES[card.rarity.index])
 
     draw.text(
         rarity_symbol_position,
@@ -175,17 +485,111 @@ def render_card(card: Card, collection_path: str):
         anchor="mm",
     )
 
+
+def render_card_base(card: Card, collection_path: str, assets: RenderAssets = None):
+    """The card's art with its element's overlay on top, ready for the text."""
+    assets = assets if assets else render_assets()
+    overlay = render_card_overlay(card.element, assets)
+
+    card_art_path = pathlib.Path(collection_path, "images", card.image_file)
+
+    if not pathlib.Path(card_art_path).exists():
+        # Print in yellow ASCII.
+        print(f"\033[93m [WARN] {card_art_path} not found.\033[0m")
+        return overlay.copy()
+
+    # The art comes already rescaled to fit the card.
+    card_art_image = art_cache().get_card_art(card_art_path, IDEAL_CARD_WIDTH)
+    return compose_card_base(card.element, card_art_image, assets)
+
+
+def compose_card_base(
+    element: Element, card_art_image: Image.Image, assets: RenderAssets = None
+) -> Image.Image:
+    """Put card-sized art under the element's overlay."""
+    assets = assets if assets else render_assets()
+    overlay = render_card_overlay(element, assets)
+
+    # Center the image.
+    card_center_x = overlay.size[0] / 2
+    card_center_y = 210
+    monster_image_x = int(card_center_x - (card_art_image.size[0] / 2))
+    monster_image_y = int(card_center_y - (card_art_image.size[1] / 2))
+
+    # Outside the art, the card is the overlay over a blank canvas, which is the
+    # same for every card. So only the area under the art is composited per card.
+    card_image = render_card_blank_base(element, assets).copy()
+    art_box = (
+        max(monster_image_x, 0),
+        max(monster_image_y, 0),
+        min(monster_image_x + card_art_image.size[0], overlay.size[0]),
+        min(monster_image_y + card_art_image.size[1], overlay.size[1]),
+    )
+    art_area = Image.new(
+        "RGBA", (art_box[2] - art_box[0], art_box[3] - art_box[1]), (0, 0, 0, 0)
+    )
+    art_area.paste(
+        card_art_image, (monster_image_x - art_box[0], monster_image_y - art_box[1])
+    )
+
+    # Masking with the template's own alpha keeps the icons exactly as if they'd
+    # been pasted onto the card after the template.
+    mask = render_card_overlay_mask(element, assets)
+    art_area.paste(overlay.crop(art_box), (0, 0), mask.crop(art_box))
+    card_image.paste(art_area, art_box[:2])
     return card_image
 
 
-def render_ability(ability: Ability):
+def render_card_overlay(element: Element, assets: RenderAssets = None) -> Image.Image:
+    """The element's card template with its weakness, resistance and retreat icons."""
+    assets = assets if assets else render_assets()
+
+    def draw_overlay():
+        overlay = assets.card_template(element.name)
+        render_weakness_and_resist(element, overlay, assets)
+        return overlay
+
+    return assets.base_layers.get_or_render(("overlay", element.name), draw_overlay)
+
+
+def render_card_blank_base(element: Element, assets: RenderAssets = None):
+    """The element's overlay, as it looks over a card with no art behind it."""
+    assets = assets if assets else render_assets()
+
+    def draw_blank_base():
+        overlay = render_card_overlay(element, assets)
+        blank_base = Image.new("RGBA", overlay.size, (0, 0, 0, 0))
+        blank_base.paste(overlay, (0, 0), render_card_overlay_mask(element, assets))
+        return blank_base
+
+    return assets.base_layers.get_or_render(("blank", element.name), draw_blank_base)
+
+
+def render_card_overlay_mask(element: Element, assets: RenderAssets = None):
+    assets = assets if assets else render_assets()
+    return assets.base_layers.get_or_render(
+        ("mask", element.name),
+        lambda: assets.card_template(element.name).getchannel("A"),
+    )
+
+
+def render_ability(ability: Ability, assets: RenderAssets = None):
+    # An ability looks the same on every card, so each one is only drawn once.
+    assets = assets if assets else render_assets()
+    key = (ability.name, tuple(ability.costs_as_elements), ability.power)
+    return assets.ability_layers.get_or_render(
+        key, lambda: draw_ability(ability, assets)
+    )
+
+
+def draw_ability(ability: Ability, assets: RenderAssets):
     ability_image = Image.new("RGBA", (ABILITY_WIDTH, ABILITY_HEIGHT), (0, 0, 0, 0))
-    cost_image = render_element_cost(ability.costs_as_elements)
+    cost_image = render_element_cost(ability.costs_as_elements, assets)
     ability_image.paste(cost_image, (0, 0), cost_image)
 
     # Ability name description.
     name_text_position = (ABILITY_WIDTH // 2, ABILITY_HEIGHT // 2)
-    name_font = ImageFont.truetype("resources/font/Cabin-Bold.ttf", 24)
+    name_font = assets.font(BOLD_FONT, 24)
     name_text = ability.name
     draw = ImageDraw.Draw(ability_image)
     draw.text(
@@ -194,7 +598,7 @@ def render_ability(ability: Ability):
 
     # Draw the ability power text.
     power_text_position = (ABILITY_WIDTH - 12, ABILITY_HEIGHT // 2)
-    power_font = ImageFont.truetype("resources/font/Cabin_Condensed-Regular.ttf", 32)
+    power_font = assets.font(CONDENSED_FONT, 32)
     power_text = str(ability.power)
     draw.text(
         power_text_position,
@@ -206,7 +610,14 @@ def render_ability(ability: Ability):
     return ability_image
 
 
-def render_element_cost(elements: list[str]):
+def render_element_cost(elements: list[str], assets: RenderAssets = None):
+    assets = assets if assets else render_assets()
+    return assets.cost_layers.get_or_render(
+        tuple(elements), lambda: draw_element_cost(elements, assets)
+    )
+
+
+def draw_element_cost(elements: list[str], assets: RenderAssets):
     cost = len(elements)
     cost_canvas = Image.new(
         "RGBA", (ABILITY_COST_WIDTH, ABILITY_HEIGHT), (255, 255, 255, 0)
@@ -248,8 +659,7 @@ def render_element_cost(elements: list[str]):
     for i, element in enumerate(elements):
         # Draw circles for each element.
 
-        element_image = Image.open(f"resources/elements/{element.lower()}_element.png")
-        element_image = element_image.resize((ELEMENT_SIZE, ELEMENT_SIZE))
+        element_image = assets.element_icon(element, ELEMENT_SIZE)
         cost_canvas.paste(
             element_image,
             (
@@ -262,25 +672,34 @@ def render_element_cost(elements: list[str]):
     return cost_canvas
 
 
-def render_weakness_and_resist(card: Card, image: Image):
-    resist_element = get_resist(card.element)
-    weakness_element = get_weakness(card.element)
+def render_weakness_and_resist(
+    element: Element, image: Image, assets: RenderAssets = None
+):
+    # The status of the card (weakness, resistance, etc.) only depends on its element.
+    assets = assets if assets else render_assets()
+    resist_element = get_resist(element)
+    weakness_element = get_weakness(element)
 
     if weakness_element:
         weakness_x = STATUS_X_GAP
-        render_status_element(card, image, weakness_element, weakness_x)
+        render_status_element(image, weakness_element, weakness_x, assets)
 
     if resist_element:
         resist_x = image.width // 2
-        render_status_element(card, image, resist_element, resist_x)
+        render_status_element(image, resist_element, resist_x, assets)
 
     retreat_cost_gap = image.width - STATUS_X_GAP
-    render_status_element(card, image, PokemonElements.NEUTRAL, retreat_cost_gap)
+    render_status_element(image, PokemonElements.NEUTRAL, retreat_cost_gap, assets)
 
 
-def render_status_element(card: Card, image: Image, element: Element, x_position: int):
-    element_image = Image.open(f"resources/elements/{element.name.lower()}_element.png")
-    element_image = element_image.resize((STATUS_SIZE, STATUS_SIZE))
+def render_status_element(
+    image: Image,
+    element: Element,
+    x_position: int,
+    assets: RenderAssets = None,
+):
+    assets = assets if assets else render_assets()
+    element_image = assets.element_icon(element.name, STATUS_SIZE)
     image.paste(
         element_image,
         (
@@ -292,25 +711,32 @@ def render_status_element(card: Card, image: Image, element: Element, x_position
 
 
 def card_from_json(data: dict) -> Card:
-    card = Card(
-        index=data["index"],
-        name=data["name"],
-        description=data["description"],
-        element=PokemonElements.get_element_by_name(data["element"]),
-        rarity=PokemonRarity.get_rarity_by_name(data["rarity"]),
-        hp=data["hp"],
+    return Card.from_json(
+        data, PokemonElements.get_element_by_name, PokemonRarity.get_rarity_by_name
     )
-    card.abilities = [ability_from_json(ability) for ability in data["abilities"]]
-    return card
 
 
 def ability_from_json(data: dict) -> Ability:
-    return Ability(
-        name=data["name"],
-        element=PokemonElements.get_element_by_name(data["element"]),
-        cost=data["cost"],
-        is_mixed_element=data["is_mixed_element"],
-    )
+    return Ability.from_json(data, PokemonElements.get_element_by_name)
+
+
+def check_encode_options(argparser: argparse.ArgumentParser, args: argparse.Namespace):
+    """Reject encoding options that would have no effect on the chosen format."""
+    if args.sheet:
+        if args.format != "png":
+            argparser.error("Use --sheet-format to choose the format of --sheet.")
+        image_format = args.sheet_format
+    else:
+        image_format = args.format
+
+    if image_format == "tiff" and (args.compress_level is not None or args.draft):
+        argparser.error("--compress-level and --draft can't be used with tiff sheets.")
+    if image_format == "jpeg" and args.compress_level is not None:
+        argparser.error("--compress-level can't be used with jpeg; use --quality.")
+    if image_format in ("png", "tiff") and args.quality is not None:
+        argparser.error(
+            f"--quality can't be used with {image_format}, which is lossless."
+        )
 
 
 def main():
@@ -320,8 +746,107 @@ def main():
         help="File path to the collection to render",
         default="output/pokemon-classic",
     )
-    collection_path = argparser.parse_args().collection
-    render_cards(collection_path)
+    argparser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of processes to render the cards with.",
+    )
+    argparser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=None,
+        help="Number of cards handed to a worker at a time (default: automatic).",
+    )
+    argparser.add_argument(
+        "-i",
+        "--incremental",
+        action="store_true",
+        help="Skip cards whose JSON, art and layout haven't changed since the last render.",
+    )
+    argparser.add_argument(
+        "--art-cache",
+        default=DEFAULT_ART_CACHE_PATH,
+        help="Folder to keep the card-sized copies of the art in.",
+    )
+    argparser.add_argument(
+        "--sheet",
+        type=str,
+        default=None,
+        metavar="COLUMNSxROWS",
+        help="Render onto print sheets of this many cards (e.g. 3x3), instead of one file per card.",
+    )
+    argparser.add_argument(
+        "--sheet-format",
+        choices=list(SHEET_FORMATS),
+        default="png",
+        help="Image format for the sheets.",
+    )
+    argparser.add_argument(
+        "--format",
+        choices=RENDER_FORMATS,
+        default="png",
+        help="Image format for the rendered cards: png (lossless), webp or jpeg (small).",
+    )
+    argparser.add_argument(
+        "--compress-level",
+        type=int,
+        default=None,
+        help="PNG zlib level (0-9) or WebP method (0-6); higher is smaller but slower. Not for jpeg.",
+    )
+    argparser.add_argument(
+        "--quality",
+        type=int,
+        default=None,
+        help="Quality of webp and jpeg renders (1-100). Not for png.",
+    )
+    argparser.add_argument(
+        "--draft",
+        action="store_true",
+        help="Encode quickly with light compression, for previews.",
+    )
+    argparser.add_argument(
+        "--cards-file",
+        default=None,
+        help="Read the cards from a collection .json or .jsonl file, instead of the cards folder.",
+    )
+    argparser.add_argument(
+        "--only",
+        default=None,
+        metavar="CARDS",
+        help="Only render these cards, by index, index range or name (e.g. 1-100,250,chippo).",
+    )
+    args = argparser.parse_args()
+    check_encode_options(argparser, args)
+    render_format = RenderFormat(
+        args.format, args.compress_level, args.quality, args.draft
+    )
+
+    sheet_layout = None
+    if args.sheet:
+        if args.incremental:
+            argparser.error("--incremental can't be used with --sheet.")
+        try:
+            columns, rows = parse_sheet_grid(args.sheet)
+        except ValueError:
+            argparser.error(f"Invalid --sheet {args.sheet}, expected e.g. 3x3.")
+        card_size = render_assets().card_template(PokemonElements.NEUTRAL.name).size
+        sheet_layout = SheetLayout(
+            columns, rows, card_size, args.sheet_format, png_format=render_format
+        )
+
+    use_art_cache(args.art_cache)
+    render_cards(
+        args.collection,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        incremental=args.incremental,
+        sheet_layout=sheet_layout,
+        render_format=render_format,
+        cards_file=args.cards_file,
+        selection=CardSelection.parse(args.only) if args.only else None,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import hashlib
+import io
+import json
+import os
+import pathlib
+from PIL import Image
+from rendering.render_manifest import file_signature
+
+DEFAULT_ART_CACHE_PATH = ".cache/art"
+
+# Shrink by whole factors with reduce() first, then resample the rest of the way.
+# At 3x, the result is indistinguishable from resampling the full image.
+REDUCING_GAP = 3.0
+
+
+class ArtCache:
+    """
+    Keeps card-ready copies of the monster art, resized to the card's width. They
+    are keyed on a hash of the source file, so replacing the art is picked up, but
+    re-rendering a card (e.g. after a text change) never decodes the source again.
+
+    The hash of each source file is remembered along with its size and mtime, so
+    the source is only read (and hashed) again once those change.
+    """
+
+    SINGLETON_ART_CACHE = None
+
+    def __init__(self, path: str = DEFAULT_ART_CACHE_PATH):
+        self.path = pathlib.Path(path)
+        # A hit is served without reading the source. Every other lookup reads
+        # (and hashes) the source, and a miss also has to resize it.
+        self.hits = 0
+        self.source_reads = 0
+        self.misses = 0
+
+    def get_card_art(self, art_path: pathlib.Path, width: int) -> Image.Image:
+        signature = file_signature(pathlib.Path(art_path))
+        source_hash = self.get_known_hash(art_path, signature)
+        if source_hash is not None:
+            thumbnail = self.load_thumbnail(source_hash, width)
+            if thumbnail is not None:
+                self.hits += 1
+                return thumbnail
+
+        self.source_reads += 1
+        with open(art_path, "rb") as f:
+            source_bytes = f.read()
+
+        source_hash = hashlib.sha256(source_bytes).hexdigest()
+        self.set_known_hash(art_path, signature, source_hash)
+
+        # The file may only have been touched, or be a copy of art that's cached.
+        thumbnail = self.load_thumbnail(source_hash, width)
+        if thumbnail is not None:
+            return thumbnail
+
+        self.misses += 1
+        thumbnail = resize_art(Image.open(io.BytesIO(source_bytes)), width)
+        thumbnail_path = self.get_thumbnail_path(source_hash, width)
+
+        # Several render workers may write the same thumbnail at once.
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = thumbnail_path.with_suffix(f".{os.getpid()}.tmp")
+        thumbnail.save(tmp_path, format="PNG")
+        os.replace(tmp_path, thumbnail_path)
+        return thumbnail
+
+    def get_thumbnail_path(self, source_hash: str, width: int) -> pathlib.Path:
+        return self.path / f"{source_hash}_{width}.png"
+
+    def load_thumbnail(self, source_hash: str, width: int) -> Image.Image | None:
+        thumbnail_path = self.get_thumbnail_path(source_hash, width)
+        if not thumbnail_path.exists():
+            return None
+
+        with Image.open(thumbnail_path) as thumbnail:
+            thumbnail.load()
+            return thumbnail
+
+    def get_source_entry_path(self, art_path: pathlib.Path) -> pathlib.Path:
+        path_hash = hashlib.sha256(str(pathlib.Path(art_path).resolve()).encode())
+        return self.path / "sources" / f"{path_hash.hexdigest()[:32]}.json"
+
+    def get_known_hash(self, art_path: pathlib.Path, signature: str) -> str | None:
+        entry_path = self.get_source_entry_path(art_path)
+        if signature is None or not entry_path.exists():
+            return None
+
+        with open(entry_path) as f:
+            entry = json.load(f)
+        return entry["source_hash"] if entry["signature"] == signature else None
+
+    def set_known_hash(self, art_path: pathlib.Path, signature: str, source_hash: str):
+        entry_path = self.get_source_entry_path(art_path)
+        os.makedirs(entry_path.parent, exist_ok=True)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"signature": signature, "source_hash": source_hash}, f)
+        os.replace(tmp_path, entry_path)
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.source_reads
+        return {
+            "hits": self.hits,
+            "source_reads": self.source_reads,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __repr__(self):
+        stats = self.stats
+        return (
+            f"ArtCache(hits={stats['hits']}, source_reads={stats['source_reads']}, "
+            f"misses={stats['misses']}, "
+            f"hit_rate={stats['hit_rate']:.1%})"
+        )
+
+
+def resize_art(image: Image.Image, width: int) -> Image.Image:
+    rescale_factor = width / image.size[0]
+    width, height = (
+        int(image.size[0] * rescale_factor),
+        int(image.size[1] * rescale_factor),
+    )
+
+    # For JPEGs, this decodes straight at a fraction of the full size.
+    image.draft("RGB", (width, height))
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+    return image.resize((width, height), reducing_gap=REDUCING_GAP)
+
+
+def art_cache() -> ArtCache:
+    if ArtCache.SINGLETON_ART_CACHE is None:
+        ArtCache.SINGLETON_ART_CACHE = ArtCache()
+    return ArtCache.SINGLETON_ART_CACHE
+
+
+def use_art_cache(path: str) -> ArtCache:
+    ArtCache.SINGLETON_ART_CACHE = ArtCache(path)
+    return ArtCache.SINGLETON_ART_CACHE
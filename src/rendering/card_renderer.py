@@ -0,0 +1,95 @@
+import pathlib
+import threading
+import time
+from PIL import Image
+from mechanics.card import Card
+from rendering.art_cache import resize_art
+from rendering.layer_cache import LayerCache
+from rendering.render_assets import PACKAGE_RESOURCES_PATH, RenderAssets
+from rendering.render_format import EncodeStats, RenderFormat
+from rendering.render_manifest import file_signature
+import render_cards
+
+# Card-sized art is 390x218 RGBA (~340KB), so this holds about 20MB of it.
+CARD_ART_CACHE_SIZE = 64
+
+
+class CardRenderer:
+    """
+    Renders cards to image bytes in memory, for serving them on demand. All the
+    assets are loaded when it's created, from absolute paths, so rendering never
+    depends on the working directory and never writes to disk.
+
+    One renderer can be shared between threads. The layer caches aren't
+    thread-safe, so cards are drawn one at a time, but art is decoded and
+    images are encoded (the slow parts) outside the lock.
+    """
+
+    def __init__(
+        self,
+        images_path: str | None = None,
+        resources_path: str = PACKAGE_RESOURCES_PATH,
+        render_format: RenderFormat = None,
+    ):
+        self.images_path = pathlib.Path(images_path).resolve() if images_path else None
+        self.render_format = render_format if render_format else RenderFormat()
+        self.assets = render_cards.warm_render_assets(
+            RenderAssets(pathlib.Path(resources_path).resolve())
+        )
+        self.card_art_layers = LayerCache(CARD_ART_CACHE_SIZE)
+        self.encode_stats = EncodeStats(self.render_format.image_format)
+        self._lock = threading.Lock()
+
+    def render(self, card: Card | dict, render_format: RenderFormat = None) -> bytes:
+        render_format = render_format if render_format else self.render_format
+        card_image = self.render_image(card)
+
+        start_time = time.perf_counter()
+        image_bytes = render_format.encode(card_image)
+        with self._lock:
+            self.encode_stats.add(time.perf_counter() - start_time, len(image_bytes))
+        return image_bytes
+
+    def render_image(self, card: Card | dict) -> Image.Image:
+        if isinstance(card, dict):
+            card = render_cards.card_from_json(card)
+
+        card_art_image = self.card_art(card)
+        with self._lock:
+            if card_art_image is None:
+                card_image = render_cards.render_card_overlay(
+                    card.element, self.assets
+                ).copy()
+            else:
+                card_image = render_cards.compose_card_base(
+                    card.element, card_art_image, self.assets
+                )
+            render_cards.draw_card_details(card, card_image, self.assets)
+        return card_image
+
+    def card_art(self, card: Card) -> Image.Image | None:
+        if self.images_path is None:
+            return None
+
+        art_path = self.images_path / card.image_file
+        signature = file_signature(art_path)
+        if signature is None:
+            return None
+
+        # Keyed on the file's signature, so replaced art is picked up.
+        key = (card.image_file, signature)
+        with self._lock:
+            card_art_image = self.card_art_layers.get(key)
+        if card_art_image is None:
+            with Image.open(art_path) as image:
+                card_art_image = resize_art(image, render_cards.IDEAL_CARD_WIDTH)
+            with self._lock:
+                self.card_art_layers.put(key, card_art_image)
+        return card_art_image
+
+    def __repr__(self):
+        return (
+            f"CardRenderer(assets={self.assets}, "
+            f"card_art={self.card_art_layers}, "
+            f"ability_layers={self.assets.ability_layers})"
+        )
@@ -0,0 +1,45 @@
+from dataclasses import dataclass, field
+from rendering.render_format import RenderFormat
+
+SHEET_FORMATS = {"png": "PNG", "tiff": "TIFF"}
+
+
+@dataclass
+class SheetLayout:
+    """Where cards go on a print sheet (or sprite atlas) of columns x rows cards."""
+
+    columns: int
+    rows: int
+    card_size: tuple[int, int]
+    image_format: str = "png"
+    # How PNG sheets are compressed (--compress-level and --draft).
+    png_format: RenderFormat = field(default_factory=RenderFormat)
+
+    @property
+    def cards_per_sheet(self) -> int:
+        return self.columns * self.rows
+
+    @property
+    def sheet_size(self) -> tuple[int, int]:
+        return (self.columns * self.card_size[0], self.rows * self.card_size[1])
+
+    def sheet_file(self, sheet_index: int) -> str:
+        return f"sheet_{sheet_index:03d}.{self.image_format}"
+
+    def card_position(self, slot: int) -> tuple[int, int]:
+        # Fill each row left to right, then move down to the next one.
+        column, row = slot % self.columns, slot // self.columns
+        return (column * self.card_size[0], row * self.card_size[1])
+
+    def save_options(self) -> dict:
+        if self.image_format == "png":
+            return self.png_format.save_options()
+        return {"format": SHEET_FORMATS[self.image_format], "compression": "tiff_lzw"}
+
+
+def parse_sheet_grid(value: str) -> tuple[int, int]:
+    """Parse a grid like '3x3' into (columns, rows)."""
+    columns, rows = (int(x) for x in value.lower().split("x"))
+    if columns < 1 or rows < 1:
+        raise ValueError(f"Invalid sheet grid: {value}")
+    return columns, rows
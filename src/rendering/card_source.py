@@ -0,0 +1,174 @@
+from dataclasses import dataclass, field
+from functools import lru_cache
+import json
+import pathlib
+import re
+from typing import Iterator
+from mechanics.card_table import CardTable
+from pokemon_content.pokemon_elements import PokemonElements
+from pokemon_content.pokemon_rarity import PokemonRarity
+from rendering.render_manifest import file_signature
+
+CARD_FILE_PATTERN = re.compile(r"^(\d+)_(.*)\.json$")
+
+
+@dataclass
+class CardSource:
+    """One card to render: either its own JSON file, or its data from a collection file."""
+
+    # The card's file name (e.g. 001_chippo.json), which renders are tracked by.
+    key: str
+    path: str | None = None
+    data: dict | None = None
+
+    # Where the card is in a collection file, so it's only read when it's rendered:
+    # its row in a card table, or the byte offset of its line in a .jsonl file.
+    row: int | None = None
+    offset: int | None = None
+
+    def load(self) -> dict:
+        if self.data is not None:
+            return self.data
+        if self.row is not None:
+            return get_card_table(self.path).to_json(self.row)
+
+        with open(self.path, "rb") as f:
+            if self.offset is not None:
+                f.seek(self.offset)
+                return json.loads(f.readline())
+            return json.load(f)
+
+
+@dataclass
+class CardSelection:
+    """A subset of cards to render, like '1-100,250,chippo'."""
+
+    index_ranges: list[tuple[int, int]] = field(default_factory=list)
+    names: set[str] = field(default_factory=set)
+
+    @classmethod
+    def parse(cls, value: str) -> "CardSelection":
+        selection = cls()
+        for part in value.split(","):
+            part = part.strip()
+            if re.fullmatch(r"\d+", part):
+                selection.index_ranges.append((int(part), int(part)))
+            elif re.fullmatch(r"\d+-\d+", part):
+                start, end = part.split("-")
+                selection.index_ranges.append((int(start), int(end)))
+            elif part:
+                selection.names.add(get_snake_case_name(part))
+        return selection
+
+    def matches(self, index: int, snake_case_name: str) -> bool:
+        return snake_case_name in self.names or any(
+            start <= index <= end for start, end in self.index_ranges
+        )
+
+
+def card_sources_from_folder(
+    cards_path: pathlib.Path, selection: CardSelection = None
+) -> list[CardSource]:
+    card_sources = []
+    for path in pathlib.Path(cards_path).iterdir():
+        if path.suffix != ".json":
+            continue
+
+        # The file name is enough to select a card, without reading it.
+        match = CARD_FILE_PATTERN.match(path.name)
+        if selection is not None and not (
+            match and selection.matches(int(match.group(1)), match.group(2))
+        ):
+            continue
+        card_sources.append(CardSource(path.name, path=str(path)))
+
+    # Sort them so the work is split the same way each run.
+    return sorted(card_sources, key=lambda source: source.key)
+
+
+def card_sources_from_file(
+    path: str, selection: CardSelection = None
+) -> list[CardSource]:
+    """
+    The cards in a collection file. Only each card's key is kept, along with where
+    to find the card, so the cards are read one at a time as they're rendered.
+    """
+    if is_card_table(path):
+        return card_sources_from_table(path, selection)
+
+    card_sources = []
+    for data, offset in read_collection_cards(path):
+        snake_case_name = get_snake_case_name(data["name"])
+        if selection is not None and not selection.matches(
+            data["index"], snake_case_name
+        ):
+            continue
+
+        # Same name as the card's own file, so renders are tracked the same way.
+        key = f"{data['index']:03d}_{snake_case_name}.json"
+        if offset is not None:
+            card_sources.append(CardSource(key, path=str(path), offset=offset))
+        else:
+            # A .json collection is one document, so its cards can't be read
+            # on their own later. Use a .jsonl or .cards file for large ones.
+            card_sources.append(CardSource(key, path=str(path), data=data))
+
+    return sorted(card_sources, key=lambda source: source.key)
+
+
+def card_sources_from_table(
+    path: str, selection: CardSelection = None
+) -> list[CardSource]:
+    table = get_card_table(path)
+    card_sources = []
+    for row in range(len(table)):
+        # Select on the columns, so no card is read in full until it's rendered.
+        index = int(table.index[row])
+        snake_case_name = get_snake_case_name(table.strings.get(table.name[row]))
+        if selection is not None and not selection.matches(index, snake_case_name):
+            continue
+
+        key = f"{index:03d}_{snake_case_name}.json"
+        card_sources.append(CardSource(key, path=str(path), row=row))
+
+    return sorted(card_sources, key=lambda source: source.key)
+
+
+def read_collection_cards(path: str) -> Iterator[tuple[dict, int | None]]:
+    """Each card in a .json or .jsonl collection, and its line's offset in a .jsonl file."""
+    with open(path, "rb") as f:
+        if not str(path).endswith(".jsonl"):
+            for data in json.load(f)["cards"]:
+                yield data, None
+            return
+
+        # One card per line, so only one card is parsed at a time.
+        offset = 0
+        for line in f:
+            if line.strip():
+                yield json.loads(line), offset
+            offset += len(line)
+
+
+def get_snake_case_name(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def is_card_table(path: str) -> bool:
+    return str(path).rstrip("/").endswith(".cards")
+
+
+def load_card_table(path: str) -> CardTable:
+    return CardTable.load(
+        path, PokemonElements.get_element_by_name, PokemonRarity.get_rarity_by_name
+    )
+
+
+def get_card_table(path: str) -> CardTable:
+    """The memory-mapped table at path, opened once per process (and again if it's replaced)."""
+    return _get_card_table(str(path), file_signature(pathlib.Path(path)))
+
+
+@lru_cache(maxsize=4)
+def _get_card_table(path: str, signature: str | None) -> CardTable:
+    return load_card_table(path)
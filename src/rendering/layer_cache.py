@@ -0,0 +1,67 @@
+from collections import OrderedDict
+from typing import Callable, Hashable
+from PIL import Image
+
+
+class LayerCache:
+    """
+    A bounded LRU cache of rendered card layers, like ability strips. Layers are
+    only ever pasted from, so the cached image is shared between cards.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._layers: OrderedDict[Hashable, Image.Image] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_render(
+        self, key: Hashable, render: Callable[[], Image.Image]
+    ) -> Image.Image:
+        layer = self.get(key)
+        if layer is None:
+            layer = render()
+            self.put(key, layer)
+        return layer
+
+    def get(self, key: Hashable) -> Image.Image | None:
+        if key not in self._layers:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._layers.move_to_end(key)
+        return self._layers[key]
+
+    def put(self, key: Hashable, layer: Image.Image):
+        self._layers[key] = layer
+        self._layers.move_to_end(key)
+        if len(self._layers) > self.max_entries:
+            self._layers.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._layers.clear()
+
+    def __len__(self):
+        return len(self._layers)
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._layers),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __repr__(self):
+        stats = self.stats
+        return (
+            f"LayerCache(size={stats['size']}/{self.max_entries}, "
+            f"hits={stats['hits']}, misses={stats['misses']}, "
+            f"evictions={stats['evictions']}, hit_rate={stats['hit_rate']:.1%})"
+        )
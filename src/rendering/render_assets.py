@@ -0,0 +1,103 @@
+import pathlib
+from PIL import Image, ImageFont
+from rendering.layer_cache import LayerCache
+
+DEFAULT_RESOURCES_PATH = "resources"
+# The repo's own resources, wherever the code is run from.
+PACKAGE_RESOURCES_PATH = pathlib.Path(__file__).resolve().parents[2] / "resources"
+
+# Ability strips are 370x72 RGBA (~100KB each), so keep a few hundred at most.
+ABILITY_LAYER_CACHE_SIZE = 256
+COST_LAYER_CACHE_SIZE = 64
+BASE_LAYER_CACHE_SIZE = 32
+
+
+class RenderAssets:
+    """Loads card templates, element icons and fonts once per process."""
+
+    SINGLETON_ASSETS = None
+
+    def __init__(self, resources_path: str = DEFAULT_RESOURCES_PATH):
+        self.resources_path = pathlib.Path(resources_path)
+        self._templates: dict[str, Image.Image] = {}
+        self._icons: dict[tuple[str, int], Image.Image] = {}
+        self._fonts: dict[tuple[str, int], ImageFont.FreeTypeFont] = {}
+        self.hits = 0
+        self.misses = 0
+
+        # Layers drawn from these assets, which repeat across many cards.
+        self.ability_layers = LayerCache(ABILITY_LAYER_CACHE_SIZE)
+        self.cost_layers = LayerCache(COST_LAYER_CACHE_SIZE)
+        self.base_layers = LayerCache(BASE_LAYER_CACHE_SIZE)
+
+    def card_template(self, element_name: str) -> Image.Image:
+        # Return a copy, because the card is drawn directly onto the template.
+        key = element_name.lower()
+        if key in self._templates:
+            self.hits += 1
+        else:
+            self.misses += 1
+            path = self.resources_path / "cards" / f"{key}_card.png"
+            with Image.open(path) as image:
+                image.load()
+                self._templates[key] = image.copy()
+        return self._templates[key].copy()
+
+    def element_icon(self, element_name: str, size: int) -> Image.Image:
+        # Icons are only ever pasted from, so the cached image is shared.
+        key = (element_name.lower(), size)
+        if key in self._icons:
+            self.hits += 1
+        else:
+            self.misses += 1
+            path = self.resources_path / "elements" / f"{key[0]}_element.png"
+            with Image.open(path) as image:
+                self._icons[key] = image.resize((size, size))
+        return self._icons[key]
+
+    def font(self, font_name: str, size: int) -> ImageFont.FreeTypeFont:
+        key = (font_name, size)
+        if key in self._fonts:
+            self.hits += 1
+        else:
+            self.misses += 1
+            path = self.resources_path / "font" / font_name
+            self._fonts[key] = ImageFont.truetype(str(path), size)
+        return self._fonts[key]
+
+    def warm(
+        self,
+        element_names: list[str],
+        icon_sizes: list[int],
+        fonts: list[tuple[str, int]],
+    ):
+        """Load every asset up front, so rendering never touches the disk."""
+        for element_name in element_names:
+            self.card_template(element_name)
+            for size in icon_sizes:
+                self.element_icon(element_name, size)
+
+        for font_name, size in fonts:
+            self.font(font_name, size)
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __repr__(self):
+        stats = self.stats
+        return (
+            f"RenderAssets(hits={stats['hits']}, misses={stats['misses']}, "
+            f"hit_rate={stats['hit_rate']:.1%})"
+        )
+
+
+def render_assets() -> RenderAssets:
+    if RenderAssets.SINGLETON_ASSETS is None:
+        RenderAssets.SINGLETON_ASSETS = RenderAssets()
+    return RenderAssets.SINGLETON_ASSETS
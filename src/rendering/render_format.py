@@ -0,0 +1,85 @@
+from dataclasses import dataclass
+import io
+from PIL import Image
+
+RENDER_FORMATS = ["png", "webp", "jpeg"]
+FILE_EXTENSIONS = {"png": "png", "webp": "webp", "jpeg": "jpg"}
+
+
+@dataclass
+class RenderFormat:
+    """
+    How rendered cards are encoded. PNG is lossless (for archiving), WebP and JPEG
+    are much smaller (for the web). Draft mode trades size for encoding speed,
+    for quick previews.
+    """
+
+    image_format: str = "png"
+    compress_level: int | None = None
+    quality: int | None = None
+    is_draft: bool = False
+
+    @property
+    def extension(self) -> str:
+        return FILE_EXTENSIONS[self.image_format]
+
+    def save_options(self) -> dict:
+        if self.image_format == "png":
+            # zlib level: 0 (none, fastest) to 9 (smallest).
+            default_level = 1 if self.is_draft else 6
+            return {"format": "PNG", "compress_level": self.level(default_level, 9)}
+        elif self.image_format == "webp":
+            # WebP's "method": 0 (fastest) to 6 (smallest).
+            return {
+                "format": "WEBP",
+                "quality": self.quality or (50 if self.is_draft else 80),
+                "method": self.level(0 if self.is_draft else 4, 6),
+            }
+        else:
+            return {
+                "format": "JPEG",
+                "quality": self.quality or (60 if self.is_draft else 90),
+                "optimize": not self.is_draft,
+            }
+
+    def level(self, default_level: int, max_level: int) -> int:
+        if self.compress_level is None:
+            return default_level
+        return max(0, min(max_level, self.compress_level))
+
+    def encode(self, image: Image.Image) -> bytes:
+        if self.image_format == "jpeg" and image.mode == "RGBA":
+            # JPEG has no transparency, so the card's corners are made white.
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+
+        buffer = io.BytesIO()
+        image.save(buffer, **self.save_options())
+        return buffer.getvalue()
+
+
+@dataclass
+class EncodeStats:
+    image_format: str
+    n_images: int = 0
+    encode_seconds: float = 0.0
+    n_bytes: int = 0
+
+    def add(self, encode_seconds: float, n_bytes: int):
+        self.n_images += 1
+        self.encode_seconds += encode_seconds
+        self.n_bytes += n_bytes
+
+    def merge(self, other: "EncodeStats"):
+        self.n_images += other.n_images
+        self.encode_seconds += other.encode_seconds
+        self.n_bytes += other.n_bytes
+
+    def __repr__(self):
+        n = max(self.n_images, 1)
+        return (
+            f"Encoded {self.n_images} {self.image_format} renders in "
+            f"{self.encode_seconds:.2f}s ({self.encode_seconds / n * 1000:.1f}ms each), "
+            f"{self.n_bytes / 1024 / 1024:.1f}MB ({self.n_bytes / n / 1024:.1f}KB each)."
+        )
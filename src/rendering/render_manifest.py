@@ -0,0 +1,71 @@
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import pathlib
+
+MANIFEST_FILE = ".manifest.json"
+
+
+@dataclass
+class RenderManifest:
+    """Remembers the inputs each render was made from, so unchanged cards can be skipped."""
+
+    path: pathlib.Path
+    entries: dict[str, dict] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, render_path: str) -> "RenderManifest":
+        path = pathlib.Path(render_path, MANIFEST_FILE)
+        if not path.exists():
+            return cls(path)
+
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # A broken manifest just means everything is rendered again.
+            print(f"\033[93m [WARN] Ignoring unreadable manifest {path}.\033[0m")
+            entries = {}
+        return cls(path, entries)
+
+    def is_current(self, key: str, fingerprint: dict) -> bool:
+        if self.entries.get(key) != fingerprint:
+            return False
+
+        # The render itself may have been deleted since the last run.
+        return pathlib.Path(self.path.parent, fingerprint["render_file"]).exists()
+
+    def record(self, key: str, fingerprint: dict):
+        self.entries[key] = fingerprint
+
+    def prune(self, keys: set[str]):
+        """Forget any cards that are no longer part of the collection."""
+        self.entries = {k: v for k, v in self.entries.items() if k in keys}
+
+    def save(self):
+        # Write to a temp file first, so a crash never leaves a half-written manifest.
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def card_fingerprint(
+    card_bytes: bytes, art_path: pathlib.Path, render_file: str, layout_version: str
+) -> dict:
+    return {
+        "card_hash": hashlib.sha256(card_bytes).hexdigest(),
+        "art": file_signature(art_path),
+        "layout_version": layout_version,
+        "render_file": render_file,
+    }
+
+
+def file_signature(path: pathlib.Path) -> str | None:
+    # Size and mtime are enough to spot replaced art without reading large images.
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
@@ -0,0 +1,380 @@
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import pathlib
+import random
+import threading
+import time
+from typing import Callable
+from urllib.parse import parse_qs, urlparse
+from urllib.request import Request, urlopen
+
+from rendering.card_renderer import CardRenderer
+from rendering.card_source import (
+    CardSource,
+    card_sources_from_file,
+    card_sources_from_folder,
+    get_snake_case_name,
+)
+from rendering.render_format import FILE_EXTENSIONS, RenderFormat
+from rendering.render_manifest import file_signature
+
+CONTENT_TYPES = {"png": "image/png", "webp": "image/webp", "jpeg": "image/jpeg"}
+# The render format for each file extension, e.g. jpg -> jpeg.
+EXTENSION_FORMATS = {extension: name for name, extension in FILE_EXTENSIONS.items()}
+
+
+class ResponseCache:
+    """
+    A bounded LRU of rendered card bytes, shared by the request threads. Each
+    card is only rendered once, however many requests for it arrive at once.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.n_bytes = 0
+        self._responses: OrderedDict[tuple, bytes] = OrderedDict()
+        self._rendering: dict[tuple, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(
+        self, key: tuple, render: Callable[[], bytes]
+    ) -> tuple[bytes, bool]:
+        """Return the response, and whether it came from the cache."""
+        with self._lock:
+            response = self._get(key)
+            if response is not None:
+                self.hits += 1
+                return response, True
+            key_lock = self._rendering.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # Another request may have rendered it while we waited.
+            with self._lock:
+                response = self._get(key)
+            if response is not None:
+                with self._lock:
+                    self.hits += 1
+                return response, True
+
+            try:
+                response = render()
+            except:
+                # A failed render is tried again by the next request for it.
+                with self._lock:
+                    self._rendering.pop(key, None)
+                raise
+
+            # Cached before the key lock is dropped, so no other request can
+            # find neither the response nor the lock, and render it again.
+            with self._lock:
+                self.misses += 1
+                self._put(key, response)
+                self._rendering.pop(key, None)
+            return response, False
+
+    def _get(self, key: tuple) -> bytes | None:
+        if key not in self._responses:
+            return None
+        self._responses.move_to_end(key)
+        return self._responses[key]
+
+    def _put(self, key: tuple, response: bytes):
+        self._responses[key] = response
+        self.n_bytes += len(response)
+        while self.n_bytes > self.max_bytes and self._responses:
+            _, evicted = self._responses.popitem(last=False)
+            self.n_bytes -= len(evicted)
+
+    def __repr__(self):
+        lookups = max(self.hits + self.misses, 1)
+        return (
+            f"ResponseCache(size={len(self._responses)}, "
+            f"{self.n_bytes / 1024 / 1024:.1f}MB/{self.max_bytes / 1024 / 1024:.0f}MB, "
+            f"hits={self.hits}, misses={self.misses}, "
+            f"hit_rate={self.hits / lookups:.1%})"
+        )
+
+
+class CardServer(ThreadingHTTPServer):
+    """
+    Serves the rendered cards of a collection:
+
+        GET  /cards                  the index and name of every card
+        GET  /cards/<index|name>.png the card, rendered as png, webp or jpg
+        POST /render?format=webp     renders the card JSON in the request body
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address: tuple[str, int],
+        renderer: CardRenderer,
+        card_sources: list[CardSource],
+        response_cache: ResponseCache,
+        quiet: bool = False,
+    ):
+        super().__init__(address, CardRequestHandler)
+        self.renderer = renderer
+        self.response_cache = response_cache
+        self.quiet = quiet
+
+        # Cards can be looked up by index or by name.
+        self.card_sources = {}
+        for card_source in card_sources:
+            index, snake_case_name = card_source.key.removesuffix(".json").split("_", 1)
+            self.card_sources[str(int(index))] = card_source
+            self.card_sources[snake_case_name] = card_source
+        self.card_list = [
+            {"index": int(card_source.key.split("_", 1)[0]), "key": card_source.key}
+            for card_source in card_sources
+        ]
+
+    def get_card_signature(self, card_source: CardSource) -> tuple:
+        """
+        The card's key, with the size and mtime of its file and its art, so a card
+        that's edited while the server runs is rendered again.
+        """
+        art_path = None
+        if self.renderer.images_path is not None:
+            art_file = card_source.key.removesuffix(".json") + ".png"
+            art_path = self.renderer.images_path / art_file
+        return (
+            card_source.key,
+            file_signature(pathlib.Path(card_source.path)),
+            file_signature(art_path) if art_path else None,
+        )
+
+
+class CardRequestHandler(BaseHTTPRequestHandler):
+    server: CardServer
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path in ("/cards", "/cards/"):
+            self.send_body(
+                json.dumps(self.server.card_list).encode(), "application/json"
+            )
+            return
+
+        name, _, extension = url.path.removeprefix("/cards/").rpartition(".")
+        name = str(int(name)) if name.isdigit() else get_snake_case_name(name)
+        card_source = self.server.card_sources.get(name)
+        if not url.path.startswith("/cards/") or card_source is None:
+            self.send_error(404, "No such card")
+            return
+        if extension not in EXTENSION_FORMATS:
+            self.send_error(404, f"Unsupported format: {extension}")
+            return
+
+        render_format = RenderFormat(EXTENSION_FORMATS[extension])
+        self.send_card(
+            (*self.server.get_card_signature(card_source), extension),
+            card_source.load,
+            render_format,
+        )
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/render":
+            self.send_error(404)
+            return
+
+        image_format = parse_qs(url.query).get("format", ["png"])[0]
+        if image_format not in CONTENT_TYPES:
+            self.send_error(400, f"Unsupported format: {image_format}")
+            return
+
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            card = json.loads(body)
+        except ValueError:
+            self.send_error(400, "Invalid card JSON")
+            return
+        if not isinstance(card, dict):
+            self.send_error(400, "The card must be a JSON object")
+            return
+
+        # The same card JSON always renders the same image.
+        cache_key = (hashlib.sha256(body).hexdigest(), image_format)
+        self.send_card(
+            cache_key, lambda: card, RenderFormat(image_format), is_posted=True
+        )
+
+    def send_card(
+        self,
+        cache_key: tuple,
+        load_card: Callable[[], dict],
+        render_format: RenderFormat,
+        is_posted: bool = False,
+    ):
+        start_time = time.perf_counter()
+        try:
+            response, is_cached = self.server.response_cache.get_or_render(
+                cache_key,
+                lambda: self.server.renderer.render(load_card(), render_format),
+            )
+        except Exception as e:
+            # Posted cards can be invalid, but the collection's own cards should never fail.
+            if is_posted and isinstance(e, (ValueError, KeyError, TypeError)):
+                self.send_error(400, f"Invalid card: {type(e).__name__}: {e}")
+            else:
+                self.log_error("Failed to render %s: %r", cache_key, e)
+                self.send_error(500, f"Failed to render card: {type(e).__name__}")
+            return
+
+        render_ms = (time.perf_counter() - start_time) * 1000
+        self.send_body(
+            response,
+            CONTENT_TYPES[render_format.image_format],
+            {
+                "X-Cache": "HIT" if is_cached else "MISS",
+                "X-Render-Time-Ms": f"{render_ms:.1f}",
+            },
+        )
+
+    def send_body(self, body: bytes, content_type: str, headers: dict = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def create_server(
+    collection_path: str,
+    cards_file: str = None,
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    cache_mb: int = 64,
+    quiet: bool = False,
+) -> CardServer:
+    if cards_file is not None:
+        card_sources = card_sources_from_file(cards_file)
+    else:
+        card_sources = card_sources_from_folder(pathlib.Path(collection_path, "cards"))
+
+    renderer = CardRenderer(pathlib.Path(collection_path, "images"))
+    response_cache = ResponseCache(cache_mb * 1024 * 1024)
+    return CardServer((host, port), renderer, card_sources, response_cache, quiet)
+
+
+def run_load_test(
+    base_url: str, paths: list[str], n_requests: int, clients: int
+) -> tuple[list[float], float]:
+    """Request random paths from several clients at once. Returns the latencies and wall time."""
+    rng = random.Random(0)
+    request_paths = [rng.choice(paths) for _ in range(n_requests)]
+
+    def fetch(path: str) -> float:
+        start_time = time.perf_counter()
+        with urlopen(Request(base_url + path)) as response:
+            response.read()
+        return time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = list(executor.map(fetch, request_paths))
+    return latencies, time.perf_counter() - start_time
+
+
+def print_load_test(label: str, latencies: list[float], wall_seconds: float):
+    ordered = sorted(latencies)
+    p50 = ordered[len(ordered) // 2] * 1000
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] * 1000
+    print(
+        f"{label}: {len(latencies)} requests in {wall_seconds:.2f}s "
+        f"({len(latencies) / wall_seconds:.0f} req/s), p50 {p50:.1f}ms, p99 {p99:.1f}ms"
+    )
+
+
+def load_test(server: CardServer, n_requests: int, clients: int):
+    """Hit the server with concurrent requests, first with an empty cache, then a warm one."""
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    host, port = server.server_address[:2]
+    base_url = f"http://{host}:{port}"
+    paths = [f"/cards/{card['index']}.png" for card in server.card_list]
+
+    print(f"Load testing {len(paths)} cards with {clients} concurrent clients.")
+    latencies, wall_seconds = run_load_test(base_url, paths, n_requests, clients)
+    print_load_test("Cold cache", latencies, wall_seconds)
+    latencies, wall_seconds = run_load_test(base_url, paths, n_requests, clients)
+    print_load_test("Warm cache", latencies, wall_seconds)
+    print(server.response_cache)
+    print(server.renderer)
+
+    server.shutdown()
+    server.server_close()
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "--collection",
+        help="File path to the collection to serve",
+        default="output/pokemon-classic",
+    )
+    argparser.add_argument(
+        "--cards-file",
+        default=None,
+        help="Read the cards from a collection .json or .jsonl file, instead of the cards folder.",
+    )
+    argparser.add_argument("--host", default="127.0.0.1")
+    argparser.add_argument("-p", "--port", type=int, default=8000)
+    argparser.add_argument(
+        "--cache-mb",
+        type=int,
+        default=64,
+        help="Memory to keep rendered cards in, in MB.",
+    )
+    argparser.add_argument(
+        "--load-test",
+        type=int,
+        default=None,
+        metavar="N_REQUESTS",
+        help="Instead of serving, time this many requests against the server and exit.",
+    )
+    argparser.add_argument(
+        "--clients",
+        type=int,
+        default=8,
+        help="Number of concurrent clients for --load-test.",
+    )
+    args = argparser.parse_args()
+
+    if args.load_test:
+        # Any free port, since nothing else needs to find it.
+        server = create_server(
+            args.collection, args.cards_file, args.host, 0, args.cache_mb, quiet=True
+        )
+        load_test(server, args.load_test, args.clients)
+        return
+
+    server = create_server(
+        args.collection, args.cards_file, args.host, args.port, args.cache_mb
+    )
+    print(f"Serving {len(server.card_list)} cards on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import time
+import numpy as np
+from pokemon_content.pokemon_rarity import PokemonRarity
+from pokemon_content.pokemon_stats import simulate_card_stats, summarize_card_stats
+
+SUMMARY_COLUMNS = [
+    ("rarity", 10),
+    ("cards", 10),
+    ("hp", 8),
+    ("power", 8),
+    ("cost", 8),
+    ("pow/cost", 10),
+    ("2 abil.", 9),
+    ("mixed", 8),
+    ("neutral", 8),
+]
+
+
+def main():
+    argparser = argparse.ArgumentParser()
+    argparser.add_argument(
+        "-n",
+        "--series",
+        type=int,
+        default=1_000_000,
+        help="Number of random card series to simulate (1-3 cards each).",
+    )
+    argparser.add_argument("--seed", type=int, default=None)
+    argparser.add_argument(
+        "-o",
+        "--output",
+        default=None,
+        help="Save every card's stats to this .npz file, one array per column.",
+    )
+    args = argparser.parse_args()
+
+    start_time = time.perf_counter()
+    stats = simulate_card_stats(args.series, args.seed, len(PokemonRarity.ALL))
+    elapsed_time = time.perf_counter() - start_time
+    print(f"Simulated {len(stats)} cards in {elapsed_time:.2f}s.")
+
+    print("".join(f"{name:>{width}}" for name, width in SUMMARY_COLUMNS))
+    for row in summarize_card_stats(stats):
+        rarity_name = PokemonRarity.ALL[row["rarity_index"]].name
+        print(
+            f"{rarity_name:>10}{row['cards']:>10}{row['hp']:>8.1f}"
+            f"{row['total_power']:>8.1f}{row['total_cost']:>8.2f}"
+            f"{row['power_per_cost']:>10.2f}{row['two_abilities']:>9.1%}"
+            f"{row['mixed']:>8.1%}{row['neutral']:>8.1%}"
+        )
+
+    if args.output:
+        np.savez_compressed(args.output, **stats.to_columns())
+        print(f"Saved the stats to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,288 @@
+from functools import cache
 import json
+import math
+import os
 import random
 import re
+import sqlite3
 import string
+import time
 from mechanics.element import Element
 from mechanics.ability import Ability
 from pokemon_content.pokemon_elements import PokemonElements
+from util.file_util import write_json_atomic
 from util.gpt_call import gpt_client
+from util.seed_util import derive_seed
 
 DEFAULT_PATH = "data/ability_names.json"
+DEFAULT_STORE_PATH = ".cache/ability_names.sqlite"
 
 
-def get_ability_name(ability: Ability) -> str:
-    key = ability.ability_key
-    with open(DEFAULT_PATH, "r") as f:
-        ability_name_map = json.load(f)
+class AbilityNameStore:
+    """
+    Ability names in SQLite, indexed by ability key and by each name's position
+    within its key. Counts and random draws are single indexed lookups, and new
+    names are inserted without rewriting anything. JSON files (a dict of lists,
+    by ability key) are only used to import and export the names.
+    """
 
-    if key in ability_name_map:
-        potential_names = ability_name_map[key]
-        return random.choice(potential_names)
-    else:
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS names (
+                key TEXT,
+                position INTEGER,
+                name TEXT,
+                PRIMARY KEY (key, position)
+            );
+            CREATE INDEX IF NOT EXISTS names_by_name ON names (name);
+            CREATE TABLE IF NOT EXISTS key_counts (key TEXT PRIMARY KEY, count INTEGER);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+            """)
+        self.connection.commit()
+
+    def count(self, key: str) -> int:
+        row = self.connection.execute(
+            "SELECT count FROM key_counts WHERE key = ?", (key,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def keys(self) -> list[str]:
+        rows = self.connection.execute("SELECT key FROM key_counts ORDER BY rowid")
+        return [key for (key,) in rows]
+
+    def name_at(self, key: str, position: int) -> str | None:
+        row = self.connection.execute(
+            "SELECT name FROM names WHERE key = ? AND position = ?", (key, position)
+        ).fetchone()
+        return row[0] if row else None
+
+    def random_name(self, key: str, rng: random.Random = random) -> str | None:
+        count = self.count(key)
+        return self.name_at(key, rng.randrange(count)) if count else None
+
+    def get_names(self, key: str) -> list[str]:
+        rows = self.connection.execute(
+            "SELECT name FROM names WHERE key = ? ORDER BY position", (key,)
+        )
+        return [name for (name,) in rows]
+
+    def add_names(self, key: str, names: list[str]) -> list[str]:
+        """Add the names that aren't in the store yet (under any key)."""
+        added = []
+        with self.connection:
+            position = self.count(key)
+            for name in names:
+                is_known = self.connection.execute(
+                    "SELECT 1 FROM names WHERE name = ? LIMIT 1", (name,)
+                ).fetchone()
+                if is_known or name in added:
+                    continue
+                self.connection.execute(
+                    "INSERT INTO names VALUES (?, ?, ?)", (key, position, name)
+                )
+                position += 1
+                added.append(name)
+            self.connection.execute(
+                "INSERT INTO key_counts VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET count = excluded.count",
+                (key, position),
+            )
+        return added
+
+    def import_json(self, path: str, source_signature: str = None):
+        """Replace everything in the store with the names in a JSON file."""
+        with open(path) as f:
+            names_by_key = json.load(f)
+
+        with self.connection:
+            self.connection.execute("DELETE FROM names")
+            self.connection.execute("DELETE FROM key_counts")
+            for key, names in names_by_key.items():
+                # Kept exactly as they are, so draws match the JSON file.
+                self.connection.executemany(
+                    "INSERT INTO names VALUES (?, ?, ?)",
+                    [(key, position, name) for position, name in enumerate(names)],
+                )
+                self.connection.execute(
+                    "INSERT INTO key_counts VALUES (?, ?)", (key, len(names))
+                )
+            self.set_meta("source_signature", source_signature)
+
+    def export_json(self, path: str):
+        write_json_atomic(path, {key: self.get_names(key) for key in self.keys()})
+
+    def get_meta(self, name: str) -> str | None:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE name = ?", (name,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, name: str, value: str | None):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta VALUES (?, ?)", (name, value)
+        )
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM names").fetchone()[0]
+
+
+def get_shuffled_position(position: int, count: int, seed: int) -> int:
+    # Stepping through the positions by a step that shares no factor with the count
+    # visits each of them once, so this shuffles them without listing them all.
+    steps = get_coprime_steps(count)
+    offset = seed % count
+    step = steps[(seed // count) % len(steps)]
+    return (offset + position * step) % count
+
+
+@cache
+def get_coprime_steps(count: int) -> tuple[int, ...]:
+    return tuple(step for step in range(1, max(count, 2)) if math.gcd(step, count) == 1)
+
+
+class AbilityNameIndex:
+    """
+    The ability name library, served from an AbilityNameStore. The store is
+    rebuilt from the JSON file whenever the file changes, so the JSON stays the
+    source of truth.
+    """
+
+    SINGLETON_INDEX = None
+
+    # Only check the file for changes this often, so lookups don't hit the disk.
+    RELOAD_CHECK_INTERVAL = 1.0
+
+    def __init__(self, path: str = DEFAULT_PATH, store_path: str = DEFAULT_STORE_PATH):
+        self.path = path
+        self.store = AbilityNameStore(store_path)
+        self._counts: dict[str, int] = {}
+        self._signature = None
+        self._last_checked = None
+
+    def count(self, key: str) -> int:
+        self.reload_if_changed()
+        if key not in self._counts:
+            self._counts[key] = self.store.count(key)
+        return self._counts[key]
+
+    def random_name(self, key: str) -> str | None:
+        self.reload_if_changed()
+        return self.store.random_name(key)
+
+    def name_at(self, key: str, position: int) -> str | None:
+        self.reload_if_changed()
+        return self.store.name_at(key, position)
+
+    def reload_if_changed(self):
+        now = time.monotonic()
+        if (
+            self._last_checked is not None
+            and now - self._last_checked < self.RELOAD_CHECK_INTERVAL
+        ):
+            return
+
+        self._last_checked = now
+        stat = os.stat(self.path)
+        signature = f"{stat.st_size}:{stat.st_mtime_ns}"
+        if signature == self._signature:
+            return
+
+        # Another process may have imported this version of the file already.
+        if self.store.get_meta("source_signature") != signature:
+            self.store.import_json(self.path, signature)
+        self._counts = {}
+        self._signature = signature
+
+
+def ability_name_index() -> AbilityNameIndex:
+    if AbilityNameIndex.SINGLETON_INDEX is None:
+        AbilityNameIndex.SINGLETON_INDEX = AbilityNameIndex()
+    return AbilityNameIndex.SINGLETON_INDEX
+
+
+def get_ability_name(ability: Ability, use_index: int = 0, seed: int = 0) -> str:
+    """
+    The name for the use_index-th ability with this key in a collection. Names are
+    drawn without replacement: a name is repeated only once every other name for
+    this key has been used.
+    """
+    key = ability.ability_key
+    name = draw_ability_name(ability_name_index(), key, use_index, seed)
+    if name is None:
         print(f"Could not find ability name for {key}")
-        return generate_ability_name(ability, 1)[0]
+        name = generate_ability_name(ability, 1)[0]
+    return name
+
+
+def draw_ability_name(
+    names: AbilityNameStore | AbilityNameIndex, key: str, use_index: int, seed: int
+) -> str | None:
+    """
+    Each run of `count` uses of a key is a shuffle of its names, fixed by the seed,
+    so a use always gets the same name however the earlier uses were made. Only
+    the key's count and the one name are read from the store.
+    """
+    count = names.count(key)
+    if not count:
+        return None
 
+    cycle, position = divmod(use_index, count)
+    seed = derive_seed(seed, key, cycle)
+    return names.name_at(key, get_shuffled_position(position, count, seed))
 
-def generate_all_ability_names_to_file(path: str, elements: list[Element]) -> list[str]:
 
-    ability_name_map = {}
-    all_ability_names = set()
+def generate_all_ability_names_to_file(
+    path: str, elements: list[Element], batch_size: int = 8, n: int = 2
+):
+    """
+    Generate names for every ability key of the given elements, and save them to `path`.
+    With batch_size > 1, each request asks for the names of many keys at once, with n
+    completions per request. Results are inserted into a store next to `path` as they
+    arrive, so an interrupted run resumes where it stopped, and are exported to `path`
+    at the end. Delete the store to generate every name again.
+    """
     abilities_per_key = 4
+    store = AbilityNameStore(get_ability_name_store_path(path))
+    stored_keys = set(store.keys())
+
+    abilities = [
+        ability
+        for ability in get_all_abilities(elements)
+        if ability.ability_key not in stored_keys
+    ]
+    print(f"Generating names for {len(abilities)} ability keys.")
+
+    for i in range(0, len(abilities), batch_size):
+        batch = abilities[i : i + batch_size]
+        if batch_size > 1:
+            names_by_key = generate_ability_names_batch(batch, abilities_per_key, n)
+        else:
+            names_by_key = {}
+
+        for ability in batch:
+            # Fall back to a single request for any key the batch didn't answer.
+            if not names_by_key.get(ability.ability_key):
+                # Generate more names for expensive abilities.
+                names_by_key[ability.ability_key] = generate_ability_name(
+                    ability, abilities_per_key + ability.cost
+                )
+
+        # Names already used by another key are skipped, so every name is unique.
+        for key, names in names_by_key.items():
+            store.add_names(key, names)
+
+    store.export_json(path)
+    print(f"Saved {len(store)} ability names to {path}")
+
+
+def get_all_abilities(elements: list[Element]) -> list[Ability]:
     all_mixed_element_values = [False, True]
     all_cost_values = [1, 2, 3, 4]
+    abilities = []
 
     for element, cost, is_mixed_element in [
         (element, cost, is_mixed_element)
@@ -47,18 +300,53 @@ def generate_all_ability_names_to_file(path: str, elements: list[Element]) -> li
             cost=cost,
             is_mixed_element=is_mixed_element,
         )
+        abilities.append(ability)
+    return abilities
 
-        # Generate more names for expensive abilities.
-        abilities = generate_ability_name(ability, abilities_per_key + cost)
 
-        # Make sure we don't add anything we've already seen.
-        unique_abilities = [x for x in abilities if x not in all_ability_names]
-        ability_name_map[ability.ability_key] = unique_abilities
-        all_ability_names.update(unique_abilities)
+def generate_ability_names_batch(
+    abilities: list[Ability], abilities_per_key: int, n: int = 1
+) -> dict[str, list[str]]:
+    prompt = generate_ability_names_batch_prompt(abilities, abilities_per_key)
+    n_names = sum(abilities_per_key + ability.cost for ability in abilities)
+    response = gpt_client().get_completion(
+        prompt, max_tokens=min(2048, 16 * n_names), n=n
+    )
 
-        # Save each step so we don't lose progress if something goes wrong.
-        with open(path, "w") as f:
-            json.dump(ability_name_map, f, indent=2)
+    # Each line of the answer should look like "<number>: <name>, <name>, ...".
+    names_by_key = {ability.ability_key: [] for ability in abilities}
+    for choice in response.choices:
+        for line in choice.text.splitlines():
+            match = re.match(r"^\s*(\d+)\s*[:.)-]\s*(.+)$", line)
+            if not match or not 1 <= int(match.group(1)) <= len(abilities):
+                continue
+
+            key = abilities[int(match.group(1)) - 1].ability_key
+            for name in clean_ability_names(re.split(r"[,;]", match.group(2))):
+                if name not in names_by_key[key]:
+                    names_by_key[key].append(name)
+
+    print(f"Prompt: {prompt}\n")
+    print(f"Generated ability names: {names_by_key}\n")
+    return names_by_key
+
+
+def generate_ability_names_batch_prompt(
+    abilities: list[Ability], abilities_per_key: int
+) -> str:
+    prompt = (
+        "Generate unique, original Pokemon attack names for each of these attacks. "
+    )
+    prompt += 'Answer with one line per attack, formatted as "<number>: <name>, <name>, ...".\n'
+    for i, ability in enumerate(abilities):
+        n = abilities_per_key + ability.cost
+        prompt += f"{i + 1}: {n} names for a {get_ability_description(ability)} attack "
+        prompt += f"{get_ability_word_limit_prompt(ability)}\n"
+    return prompt
+
+
+def get_ability_name_store_path(path: str) -> str:
+    return os.path.splitext(path)[0] + ".sqlite"
 
 
 def generate_ability_name(ability: Ability, n: int) -> list[str]:
@@ -67,8 +355,14 @@ def generate_ability_name(ability: Ability, n: int) -> list[str]:
     response = gpt_client().get_completion(prompt, max_tokens=512)
     common_delimters_regex = r"[\n\.\,\?\!\:\;]"
     response_text = response.choices[0].text
-    ability_names = re.split(common_delimters_regex, response_text)
+    ability_names = clean_ability_names(re.split(common_delimters_regex, response_text))
+    print(f"Prompt: {prompt}\n")
+    print(f"Raw Response: {response_text}\n")
+    print(f"Generated {len(ability_names)} ability names: {ability_names}\n")
+    return ability_names
 
+
+def clean_ability_names(ability_names: list[str]) -> list[str]:
     # For all the ability names, remove any characters that are not letters or spaces.
     ability_names = [
         re.sub(r"[^a-zA-Z\s]", "", ability_name) for ability_name in ability_names
@@ -88,14 +382,18 @@ def generate_ability_name(ability: Ability, n: int) -> list[str]:
     ]
 
     # Set them all to the same casing.
-    ability_names = [string.capwords(ability_name) for ability_name in ability_names]
-    print(f"Prompt: {prompt}\n")
-    print(f"Raw Response: {response_text}\n")
-    print(f"Generated {len(ability_names)} ability names: {ability_names}\n")
-    return ability_names
+    return [string.capwords(ability_name) for ability_name in ability_names]
 
 
 def generate_ability_name_prompt(ability: Ability, n: int):
+    ability_description = get_ability_description(ability)
+    word_limit_prompt = get_ability_word_limit_prompt(ability)
+    prompt = f"Generate {n} unique, original Pokemon attack name(s) for a {ability_description} attack "
+    prompt += f"({word_limit_prompt}):\n"
+    return prompt
+
+
+def get_ability_description(ability: Ability) -> str:
     cost_adjectives = [
         "weak, basic",
         "standard",
@@ -115,16 +413,14 @@ def generate_ability_name_prompt(ability: Ability, n: int):
         elif ability.cost > 2:
             ability_elemental_description = f"mythical {ability_elemental_description}"
 
-    ability_description = f"{ability_cost_description} {ability_elemental_description}"
+    return f"{ability_cost_description} {ability_elemental_description}"
+
 
+def get_ability_word_limit_prompt(ability: Ability) -> str:
     if ability.cost <= 2:
-        word_limit_prompt = f"(single-word ability names only)"
+        return f"(single-word ability names only)"
     else:
-        word_limit_prompt = f"(max 1-2 words per ability name)"
-
-    prompt = f"Generate {n} unique, original Pokemon attack name(s) for a {ability_description} attack "
-    prompt += f"({word_limit_prompt}):\n"
-    return prompt
+        return f"(max 1-2 words per ability name)"
 
 
 if __name__ == "__main__":
@@ -0,0 +1,193 @@
+from dataclasses import dataclass, field
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+DEFAULT_CACHE_PATH = ".cache/gpt_completions.sqlite"
+
+
+class CompletionCacheMiss(KeyError):
+    """Raised in replay mode when a prompt has no cached completion."""
+
+
+@dataclass
+class CompletionChoice:
+    text: str
+
+
+@dataclass
+class Completion:
+    """A completion response, in the same shape as the OpenAI one the code reads."""
+
+    choices: list[CompletionChoice] = field(default_factory=list)
+    usage: dict | None = None
+
+
+class CompletionCache:
+    """
+    Persists prompt -> completion pairs in SQLite, so prompts we've already paid
+    for are never sent to the API again. In read-only (replay) mode, a miss is an
+    error instead of a network call, which keeps regression runs deterministic.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        ttl_seconds: float | None = None,
+        max_entries: int | None = None,
+        read_only: bool = False,
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.read_only = read_only
+        self.hits = 0
+        self.misses = 0
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS completions (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                prompt TEXT,
+                max_tokens INTEGER,
+                temperature REAL,
+                n INTEGER,
+                response TEXT,
+                created_at REAL,
+                last_used_at REAL
+            )
+            """)
+        self.connection.commit()
+
+        if not self.read_only:
+            self.evict()
+
+    def get(
+        self, model: str, prompt: str, max_tokens: int, temperature: float, n: int
+    ) -> Completion | None:
+        key = completion_key(model, prompt, max_tokens, temperature, n)
+        row = self.connection.execute(
+            "SELECT response, created_at FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+
+        # Replay runs use whatever is cached, however old it is.
+        if row is not None and not self.read_only and self._is_expired(row[1]):
+            row = None
+
+        if row is None:
+            self.misses += 1
+            if self.read_only:
+                raise CompletionCacheMiss(f"No cached completion for prompt: {prompt}")
+            return None
+
+        self.hits += 1
+        if not self.read_only:
+            self.connection.execute(
+                "UPDATE completions SET last_used_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self.connection.commit()
+        return completion_from_json(json.loads(row[0]))
+
+    def put(
+        self,
+        model: str,
+        prompt: str,
+        max_tokens: int,
+        temperature: float,
+        n: int,
+        response,
+    ):
+        if self.read_only:
+            return
+
+        now = time.time()
+        key = completion_key(model, prompt, max_tokens, temperature, n)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO completions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                model,
+                prompt,
+                max_tokens,
+                temperature,
+                n,
+                json.dumps(completion_to_json(response)),
+                now,
+                now,
+            ),
+        )
+        self.connection.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones over max_entries."""
+        if self.ttl_seconds is not None:
+            self.connection.execute(
+                "DELETE FROM completions WHERE created_at < ?",
+                (time.time() - self.ttl_seconds,),
+            )
+
+        if self.max_entries is not None:
+            self.connection.execute(
+                """
+                DELETE FROM completions WHERE key IN (
+                    SELECT key FROM completions ORDER BY last_used_at DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM completions").fetchone()[0]
+
+    def _is_expired(self, created_at: float) -> bool:
+        return (
+            self.ttl_seconds is not None and created_at < time.time() - self.ttl_seconds
+        )
+
+    @property
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def __repr__(self):
+        stats = self.stats
+        mode = "replay" if self.read_only else "read-write"
+        return (
+            f"CompletionCache({mode}, hits={stats['hits']}, misses={stats['misses']}, "
+            f"hit_rate={stats['hit_rate']:.1%})"
+        )
+
+
+def completion_key(
+    model: str, prompt: str, max_tokens: int, temperature: float, n: int
+) -> str:
+    key_data = json.dumps([model, prompt, max_tokens, temperature, n])
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+def completion_to_json(response) -> dict:
+    usage = getattr(response, "usage", None)
+    return {
+        "choices": [{"text": choice.text} for choice in response.choices],
+        "usage": dict(usage) if usage else None,
+    }
+
+
+def completion_from_json(data: dict) -> Completion:
+    return Completion(
+        choices=[CompletionChoice(text=choice["text"]) for choice in data["choices"]],
+        usage=data.get("usage"),
+    )
@@ -0,0 +1,48 @@
+import asyncio
+import hashlib
+import time
+from util.completion_cache import Completion, CompletionChoice
+from util.gpt_call import OpenAIClient
+
+SYLLABLES = ["zap", "flo", "ra", "gon", "chi", "mo", "vex", "lu", "tor", "ki", "ba"]
+
+
+class FakeOpenAIClient(OpenAIClient):
+    """
+    Stands in for the OpenAI API so generation can be run and timed offline.
+    Every request waits `latency` seconds, then answers with made-up words that
+    only depend on the prompt, so runs are repeatable.
+    """
+
+    is_openai_enabled = True
+
+    def __init__(self, latency: float = 0.5, cache=None):
+        super().__init__(cache)
+        self.latency = latency
+        self.calls = 0
+
+    def create_completion(self, prompt: str, max_tokens: int, n: int):
+        self.calls += 1
+        time.sleep(self.latency)
+        return fake_completion(prompt, n)
+
+    async def create_completion_async(
+        self, prompt: str, max_tokens: int, n: int, tries: int = 3
+    ):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return fake_completion(prompt, n)
+
+
+def fake_completion(prompt: str, n: int) -> Completion:
+    choices = []
+    for i in range(n):
+        digest = hashlib.sha256(f"{i}:{prompt}".encode()).digest()
+        word = "".join(SYLLABLES[b % len(SYLLABLES)] for b in digest[: 2 + i % 3])
+        choices.append(CompletionChoice(text=f"\n\n{word.capitalize()}"))
+    return Completion(choices=choices)
+
+
+def use_fake_gpt_client(latency: float = 0.5) -> FakeOpenAIClient:
+    OpenAIClient.SINGLETON_CLIENT = FakeOpenAIClient(latency)
+    return OpenAIClient.SINGLETON_CLIENT
@@ -0,0 +1,19 @@
+import json
+import os
+from typing import Iterable
+
+
+def write_json_atomic(path: str, data, indent: int | None = 2):
+    # Write to a temp file first, so a crash never leaves a half-written file behind.
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=indent)
+    os.replace(tmp_path, path)
+
+
+def write_jsonl_atomic(path: str, rows: Iterable):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    os.replace(tmp_path, path)
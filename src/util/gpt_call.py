@@ -1,16 +1,37 @@
+import asyncio
 from functools import cached_property
 import os
+from retry.api import logging_logger
 from dotenv import load_dotenv
 import openai
 from retry import retry
+from util.completion_cache import CompletionCache
+from util.tracing import tracer
+
+
+class RetryTraceLogger:
+    """Given to @retry, which calls warning() before each retry."""
+
+    def warning(self, message, *args):
+        tracer().record_gpt_retry()
+        logging_logger.warning(message, *args)
 
 
 class OpenAIClient:
 
     SINGLETON_CLIENT = None
+    MODEL = "text-davinci-003"
+    TEMPERATURE = 0.9
+
+    def __init__(self, cache: CompletionCache | None = None):
+        self.cache = cache
 
     @cached_property
     def is_openai_enabled(self):
+        if self.cache is not None and self.cache.read_only:
+            # Replay runs answer everything from the cache, so no key is needed.
+            return True
+
         print("Checking for OpenAI API key...")
         load_dotenv()
         if os.getenv("OPENAI_API_KEY") is None or os.getenv("OPENAI_API_KEY") == "":
@@ -24,20 +45,73 @@ class OpenAIClient:
         else:
             return True
 
-    @retry(tries=3, delay=3.0)
     def get_completion(self, prompt: str, max_tokens: int = 128, n: int = 1):
+        response = self.get_cached_completion(prompt, max_tokens, n)
+        is_cached = response is not None
+        if not is_cached:
+            response = self.create_completion(prompt, max_tokens, n)
+            self.cache_completion(prompt, max_tokens, n, response)
+        tracer().record_gpt_call(response, is_cached)
+        return response
+
+    async def get_completion_async(
+        self, prompt: str, max_tokens: int = 128, n: int = 1
+    ):
+        response = self.get_cached_completion(prompt, max_tokens, n)
+        is_cached = response is not None
+        if not is_cached:
+            response = await self.create_completion_async(prompt, max_tokens, n)
+            self.cache_completion(prompt, max_tokens, n, response)
+        tracer().record_gpt_call(response, is_cached)
+        return response
+
+    def get_cached_completion(self, prompt: str, max_tokens: int, n: int):
+        if self.cache is None:
+            return None
+        return self.cache.get(self.MODEL, prompt, max_tokens, self.TEMPERATURE, n)
+
+    def cache_completion(self, prompt: str, max_tokens: int, n: int, response):
+        if self.cache is not None:
+            self.cache.put(
+                self.MODEL, prompt, max_tokens, self.TEMPERATURE, n, response
+            )
+
+    @retry(tries=3, delay=3.0, logger=RetryTraceLogger())
+    def create_completion(self, prompt: str, max_tokens: int, n: int):
         load_dotenv()
         openai.api_key = os.getenv("OPENAI_API_KEY")
 
         response = openai.Completion.create(
-            model="text-davinci-003",
+            model=self.MODEL,
             prompt=prompt,
             max_tokens=max_tokens,
-            temperature=0.9,
+            temperature=self.TEMPERATURE,
             n=n,
         )
         return response
 
+    async def create_completion_async(
+        self, prompt: str, max_tokens: int, n: int, tries: int = 3
+    ):
+        load_dotenv()
+        openai.api_key = os.getenv("OPENAI_API_KEY")
+
+        # Same retry policy as create_completion, without blocking the event loop.
+        for attempt in range(tries):
+            try:
+                return await openai.Completion.acreate(
+                    model=self.MODEL,
+                    prompt=prompt,
+                    max_tokens=max_tokens,
+                    temperature=self.TEMPERATURE,
+                    n=n,
+                )
+            except Exception:
+                if attempt == tries - 1:
+                    raise
+                tracer().record_gpt_retry()
+                await asyncio.sleep(3.0)
+
 
 def gpt_client():
     if OpenAIClient.SINGLETON_CLIENT is None:
@@ -0,0 +1,8 @@
+import hashlib
+
+
+def derive_seed(seed: int, *parts) -> int:
+    # Mix the parts into the seed with a hash, so derived seeds don't overlap or
+    # depend on the order they're asked for.
+    key = ":".join(str(part) for part in (seed, *parts))
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big")
@@ -0,0 +1,110 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+import json
+import time
+
+# The card being worked on. Each asyncio task has its own copy, so concurrent
+# cards don't get mixed up.
+_current_card_index: ContextVar[int | None] = ContextVar(
+    "current_card_index", default=None
+)
+
+
+@dataclass
+class CardTrace:
+    card_index: int
+    stages: dict[str, float] = field(default_factory=dict)
+    gpt_calls: int = 0
+    gpt_cache_hits: int = 0
+    gpt_retries: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class Tracer:
+    """
+    Records how long each card spends in each stage of generation, and what its
+    GPT calls cost. Stages are timed with spans:
+
+        with tracer().span("generate_style", card_index):
+            ...
+    """
+
+    SINGLETON_TRACER = None
+
+    def __init__(self):
+        self.card_traces: dict[int, CardTrace] = {}
+
+    def get_card_trace(self, card_index: int) -> CardTrace:
+        if card_index not in self.card_traces:
+            self.card_traces[card_index] = CardTrace(card_index)
+        return self.card_traces[card_index]
+
+    @contextmanager
+    def span(self, stage: str, card_index: int):
+        token = _current_card_index.set(card_index)
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_time = time.perf_counter() - start_time
+            _current_card_index.reset(token)
+            stages = self.get_card_trace(card_index).stages
+            stages[stage] = stages.get(stage, 0.0) + elapsed_time
+
+    def record_gpt_call(self, response, is_cached: bool):
+        card_index = _current_card_index.get()
+        if card_index is None:
+            return
+
+        card_trace = self.get_card_trace(card_index)
+        if is_cached:
+            card_trace.gpt_cache_hits += 1
+            return
+
+        card_trace.gpt_calls += 1
+        usage = getattr(response, "usage", None) or {}
+        card_trace.prompt_tokens += usage.get("prompt_tokens", 0)
+        card_trace.completion_tokens += usage.get("completion_tokens", 0)
+
+    def record_gpt_retry(self):
+        card_index = _current_card_index.get()
+        if card_index is not None:
+            self.get_card_trace(card_index).gpt_retries += 1
+
+    def write_jsonl(self, path: str):
+        with open(path, "w") as f:
+            for card_index in sorted(self.card_traces):
+                f.write(json.dumps(asdict(self.card_traces[card_index])) + "\n")
+
+    def summary_table(self) -> str:
+        stage_times: dict[str, list[float]] = {}
+        for card_trace in self.card_traces.values():
+            for stage, elapsed_time in card_trace.stages.items():
+                stage_times.setdefault(stage, []).append(elapsed_time)
+
+        lines = [
+            f"{'Stage':<20} {'Cards':>6} {'Total (s)':>10} {'Mean (ms)':>10} {'Max (ms)':>10}"
+        ]
+        for stage, times in sorted(stage_times.items(), key=lambda x: -sum(x[1])):
+            lines.append(
+                f"{stage:<20} {len(times):>6} {sum(times):>10.2f} "
+                f"{sum(times) / len(times) * 1000:>10.1f} {max(times) * 1000:>10.1f}"
+            )
+
+        traces = self.card_traces.values()
+        lines.append(
+            f"GPT: {sum(t.gpt_calls for t in traces)} calls "
+            f"({sum(t.gpt_cache_hits for t in traces)} cached), "
+            f"{sum(t.gpt_retries for t in traces)} retries, "
+            f"{sum(t.prompt_tokens for t in traces)} prompt + "
+            f"{sum(t.completion_tokens for t in traces)} completion tokens."
+        )
+        return "\n".join(lines)
+
+
+def tracer() -> Tracer:
+    if Tracer.SINGLETON_TRACER is None:
+        Tracer.SINGLETON_TRACER = Tracer()
+    return Tracer.SINGLETON_TRACER
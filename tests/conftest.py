@@ -0,0 +1,30 @@
+import pathlib
+import sys
+import pytest
+
+REPO_PATH = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_PATH / "src"))
+
+from util.ability_name_library import AbilityNameIndex
+from util.fake_gpt_call import use_fake_gpt_client
+from util.gpt_call import OpenAIClient
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """
+    Run in an empty folder (output paths are relative), with the offline GPT
+    client and the repo's ability names.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(
+        AbilityNameIndex,
+        "SINGLETON_INDEX",
+        AbilityNameIndex(
+            str(REPO_PATH / "data/ability_names.json"),
+            str(tmp_path / ".cache/ability_names.sqlite"),
+        ),
+    )
+    monkeypatch.setattr(OpenAIClient, "SINGLETON_CLIENT", None)
+    use_fake_gpt_client(latency=0)
+    return tmp_path
@@ -0,0 +1,37 @@
+import random
+import pytest
+from generate import get_classic_collection
+from mechanics.ability import Ability
+from pokemon_content.pokemon_elements import PokemonElements
+from util.ability_name_library import (
+    AbilityNameStore,
+    ability_name_index,
+    get_ability_name,
+)
+
+
+def test_generation_draws_single_names_from_the_store(workdir, monkeypatch):
+    def get_names(self, key):
+        raise AssertionError(f"Loaded every name for {key}")
+
+    monkeypatch.setattr(AbilityNameStore, "get_names", get_names)
+    collection = get_classic_collection()
+    random.seed(0)
+    for element in collection.elements:
+        collection.generate_random_cards(element, generate_text=False)
+
+    abilities = [ability for card in collection.cards for ability in card.abilities]
+    assert abilities
+    assert all(ability.name != "New Ability" for ability in abilities)
+
+
+@pytest.mark.parametrize("seed", [0, 1234])
+def test_names_are_drawn_without_replacement(workdir, seed):
+    ability = Ability(name="", element=PokemonElements.FIRE, cost=2)
+    n_names = ability_name_index().count(ability.ability_key)
+    assert n_names > 1
+
+    names = [get_ability_name(ability, i, seed) for i in range(2 * n_names)]
+    assert len(set(names[:n_names])) == n_names
+    assert len(set(names[n_names:])) == n_names
+    assert names == [get_ability_name(ability, i, seed) for i in range(2 * n_names)]
@@ -0,0 +1,48 @@
+import builtins
+import os
+from PIL import Image
+from rendering import art_cache as art_cache_module
+from rendering.art_cache import ArtCache
+
+
+def test_cache_hit_does_not_read_the_source_art(tmp_path, monkeypatch):
+    art_path = tmp_path / "001_chippo.png"
+    Image.new("RGB", (800, 600), "red").save(art_path)
+    cache = ArtCache(str(tmp_path / "art"))
+    assert cache.get_card_art(art_path, 400).size == (400, 300)
+
+    opened_paths = []
+
+    def spy_open(path, *args, **kwargs):
+        opened_paths.append(str(path))
+        return builtins.open(path, *args, **kwargs)
+
+    monkeypatch.setattr(art_cache_module, "open", spy_open, raising=False)
+    assert cache.get_card_art(art_path, 400).size == (400, 300)
+    assert str(art_path) not in opened_paths
+    assert (cache.hits, cache.source_reads, cache.misses) == (1, 1, 1)
+
+
+def test_replaced_art_is_picked_up(tmp_path):
+    art_path = tmp_path / "001_chippo.png"
+    Image.new("RGB", (800, 600), "red").save(art_path)
+    cache = ArtCache(str(tmp_path / "art"))
+    cache.get_card_art(art_path, 400)
+
+    Image.new("RGB", (800, 400), "blue").save(art_path)
+    thumbnail = cache.get_card_art(art_path, 400)
+    assert thumbnail.size == (400, 200)
+    assert thumbnail.getpixel((0, 0)) == (0, 0, 255)
+
+
+def test_touched_art_is_not_counted_as_a_hit(tmp_path):
+    art_path = tmp_path / "001_chippo.png"
+    Image.new("RGB", (800, 600), "red").save(art_path)
+    cache = ArtCache(str(tmp_path / "art"))
+    cache.get_card_art(art_path, 400)
+
+    # Same art, but the source has to be read again to find that out.
+    os.utime(art_path, ns=(1, 1))
+    cache.get_card_art(art_path, 400)
+    assert (cache.hits, cache.source_reads, cache.misses) == (0, 2, 1)
+    assert cache.stats["hit_rate"] == 0.0
@@ -0,0 +1,21 @@
+from generate import get_classic_collection
+from rendering.card_source import CardSelection, card_sources_from_file
+
+
+def test_collection_files_are_read_one_card_at_a_time(workdir):
+    collection = get_classic_collection()
+    collection.collection_seed = 1
+    for element in collection.elements:
+        collection.generate_random_cards(element)
+    collection.export()
+
+    path = f"{collection.collection_path}/{collection.collection_name}"
+    json_sources = card_sources_from_file(f"{path}.json")
+    for extension in ["jsonl", "cards"]:
+        card_sources = card_sources_from_file(f"{path}.{extension}")
+        assert all(card_source.data is None for card_source in card_sources)
+        assert [x.key for x in card_sources] == [x.key for x in json_sources]
+        assert [x.load() for x in card_sources] == [x.load() for x in json_sources]
+
+    selected = card_sources_from_file(f"{path}.cards", CardSelection.parse("2-3"))
+    assert [x.load()["index"] for x in selected] == [2, 3]
@@ -0,0 +1,24 @@
+from generate import get_classic_collection
+from mechanics.card_table import CardTable
+from rendering.card_source import load_card_table
+
+
+def test_save_replaces_a_table_left_by_a_crashed_save(workdir):
+    collection = get_classic_collection()
+    collection.collection_seed = 1
+    collection.generate_random_cards(generate_text=False)
+    table = CardTable.from_cards(
+        collection.cards, collection.elements, collection.rarities
+    )
+
+    path = workdir / "collection.cards"
+    table.save(path)
+    # A crash between the two renames in save() leaves the old table behind.
+    table.save(workdir / "collection.cards.old")
+
+    table.save(path)
+    table.save(path)
+    assert not (workdir / "collection.cards.old").exists()
+    assert list(load_card_table(path).to_json_rows()) == [
+        card.to_json() for card in collection.cards
+    ]
@@ -0,0 +1,17 @@
+import random
+from generate import get_classic_collection
+
+
+def test_resumed_collection_remembers_used_subjects(workdir):
+    collection = get_classic_collection()
+    collection.start_streaming_export()
+    random.seed(0)
+    for element in collection.elements:
+        collection.generate_random_cards(element)
+    subjects = {card.style.subject for card in collection.cards}
+
+    resumed_collection = get_classic_collection()
+    resumed_collection.start_streaming_export(resume=True)
+    assert len(resumed_collection.cards) == len(collection.cards)
+    assert resumed_collection.subjects_seen == subjects
+    assert resumed_collection.card_names_seen == collection.card_names_seen
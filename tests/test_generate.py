@@ -0,0 +1,55 @@
+import os
+import sys
+import pytest
+import generate
+from pokemon_content.pokemon_collection import PokemonCollection
+
+JSONL_PATH = "output/pokemon-classic/pokemon-classic.jsonl"
+CARDS_PATH = "output/pokemon-classic/cards"
+
+
+def run_generate(monkeypatch, *args: str):
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["generate.py", "-n", "1", "--fake-gpt", "0", "--no-gpt-cache", *args],
+    )
+    generate.main()
+
+
+def interrupt_after(monkeypatch, n_series: int):
+    generate_series = PokemonCollection.generate_series
+    calls = []
+
+    def interrupted(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) > n_series:
+            raise KeyboardInterrupt
+        return generate_series(self, *args, **kwargs)
+
+    monkeypatch.setattr(PokemonCollection, "generate_series", interrupted)
+
+
+def test_resume_before_the_first_checkpoint(workdir, monkeypatch):
+    run_generate(monkeypatch, "--seed", "42")
+    with open(JSONL_PATH) as f:
+        expected = f.read()
+
+    with monkeypatch.context() as m:
+        interrupt_after(m, 3)
+        with pytest.raises(KeyboardInterrupt):
+            run_generate(m, "--seed", "42", "--stream", "--checkpoint-every", "100")
+    assert len(os.listdir(CARDS_PATH)) > 0
+
+    run_generate(monkeypatch, "--resume")
+    with open(JSONL_PATH) as f:
+        assert f.read() == expected
+
+
+def test_resume_without_a_checkpoint_keeps_the_cards(workdir, monkeypatch):
+    run_generate(monkeypatch, "--seed", "42", "--stream")
+    card_files = sorted(os.listdir(CARDS_PATH))
+
+    with pytest.raises(SystemExit, match="no checkpoint"):
+        run_generate(monkeypatch, "--resume")
+    assert sorted(os.listdir(CARDS_PATH)) == card_files
@@ -0,0 +1,63 @@
+import random
+import numpy as np
+from generate import get_classic_collection
+from pokemon_content.pokemon_elements import PokemonElements
+from pokemon_content.pokemon_stats import (
+    generate_card_stats,
+    simulate_card_layout,
+    summarize_card_stats,
+)
+
+N_SERIES = 1500
+
+
+def summarize_generated_cards(rarity_index, series_index, is_neutral_card) -> list:
+    """The same summary as summarize_card_stats, for cards from generate_card."""
+    collection = get_classic_collection()
+    random.seed(0)
+    cards = [
+        collection.generate_card(
+            PokemonElements.NEUTRAL if is_neutral else PokemonElements.FIRE,
+            collection.rarities[rarity],
+            series_index=int(series),
+            generate_text=False,
+        )
+        for rarity, series, is_neutral in zip(
+            rarity_index, series_index, is_neutral_card
+        )
+    ]
+
+    rows = []
+    for rarity in sorted(set(rarity_index)):
+        rarity_cards = [card for card in cards if card.rarity.index == rarity]
+        abilities = [ability for card in rarity_cards for ability in card.abilities]
+        rows.append(
+            {
+                "hp": np.mean([card.hp for card in rarity_cards]),
+                "total_power": np.mean(
+                    [sum(a.power for a in card.abilities) for card in rarity_cards]
+                ),
+                "total_cost": np.mean(
+                    [sum(a.cost for a in card.abilities) for card in rarity_cards]
+                ),
+                "two_abilities": np.mean(
+                    [len(card.abilities) == 2 for card in rarity_cards]
+                ),
+                "mixed": np.mean([a.is_mixed_element for a in abilities]),
+                "neutral": np.mean([a.element.is_neutral for a in abilities]),
+            }
+        )
+    return rows
+
+
+def test_stats_engine_matches_generate_card(workdir):
+    rng = np.random.default_rng(0)
+    layout = simulate_card_layout(N_SERIES, 3, rng)
+    expected_rows = summarize_generated_cards(*layout)
+    rows = summarize_card_stats(generate_card_stats(*layout, rng))
+
+    for row, expected_row in zip(rows, expected_rows, strict=True):
+        for column in ("hp", "total_power", "total_cost"):
+            assert abs(row[column] / expected_row[column] - 1) < 0.05, column
+        for column in ("two_abilities", "mixed", "neutral"):
+            assert abs(row[column] - expected_row[column]) < 0.05, column
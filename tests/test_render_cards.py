@@ -0,0 +1,26 @@
+import sys
+import pytest
+import render_cards
+from rendering.card_sheet import SheetLayout
+from rendering.render_format import RenderFormat
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        ["--format", "jpeg", "--compress-level", "3"],
+        ["--format", "png", "--quality", "50"],
+        ["--sheet", "3x3", "--format", "webp"],
+        ["--sheet", "3x3", "--sheet-format", "tiff", "--compress-level", "1"],
+    ],
+)
+def test_options_without_an_effect_are_rejected(monkeypatch, args):
+    monkeypatch.setattr(sys, "argv", ["render_cards.py", *args])
+    with pytest.raises(SystemExit):
+        render_cards.main()
+
+
+def test_png_sheets_use_the_render_format():
+    png_format = RenderFormat("png", compress_level=0)
+    layout = SheetLayout(3, 3, (10, 10), "png", png_format=png_format)
+    assert layout.save_options() == {"format": "PNG", "compress_level": 0}
@@ -0,0 +1,112 @@
+import os
+import shutil
+import threading
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+from PIL import Image
+import pytest
+from conftest import REPO_PATH
+from serve_cards import ResponseCache, create_server
+
+GALLERY_CARD = REPO_PATH / "gallery/cards/001_chippo.json"
+
+
+def test_cache_is_usable_after_a_failed_render():
+    cache = ResponseCache(max_bytes=1024)
+
+    def fail():
+        raise ValueError("broken card")
+
+    with pytest.raises(ValueError):
+        cache.get_or_render(("card", "png"), fail)
+    assert cache._rendering == {}
+
+    response, is_cached = cache.get_or_render(("card", "png"), lambda: b"image")
+    assert (response, is_cached) == (b"image", False)
+    assert cache.get_or_render(("card", "png"), fail) == (b"image", True)
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    cards_path = tmp_path / "cards"
+    cards_path.mkdir()
+    shutil.copy(GALLERY_CARD, cards_path / "001_chippo.json")
+    (cards_path / "002_broken.json").write_text("{not json")
+
+    server = create_server(str(tmp_path), port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address[:2]
+    yield f"http://{host}:{port}"
+    server.shutdown()
+    server.server_close()
+
+
+def get_status(url: str, body: bytes = None) -> int:
+    try:
+        with urlopen(Request(url, data=body)) as response:
+            response.read()
+            return response.status
+    except HTTPError as e:
+        return e.code
+
+
+def test_server_rejects_bad_cards_with_an_error_response(server_url):
+    assert get_status(f"{server_url}/cards/1.png") == 200
+    assert get_status(f"{server_url}/cards/2.png") == 500
+    assert get_status(f"{server_url}/render", b"[1, 2]") == 400
+    assert get_status(f"{server_url}/render", b'{"name": "Chippo"}') == 400
+    assert get_status(f"{server_url}/render", GALLERY_CARD.read_bytes()) == 200
+
+
+def test_each_card_is_rendered_once():
+    cache = ResponseCache(max_bytes=1024)
+    is_rendering = threading.Event()
+    can_finish = threading.Event()
+    n_renders = []
+    results = []
+
+    def render():
+        n_renders.append(1)
+        is_rendering.set()
+        can_finish.wait(5)
+        return b"image"
+
+    def request():
+        results.append(cache.get_or_render(("card", "png"), render))
+
+    first = threading.Thread(target=request)
+    first.start()
+    assert is_rendering.wait(5)
+
+    # The second request arrives while the first is still rendering.
+    second = threading.Thread(target=request)
+    second.start()
+    can_finish.set()
+    first.join(5)
+    second.join(5)
+
+    assert len(n_renders) == 1
+    assert sorted(results) == [(b"image", False), (b"image", True)]
+    assert cache._rendering == {}
+
+
+def get_cache_status(url: str) -> str:
+    with urlopen(url) as response:
+        response.read()
+        return response.headers["X-Cache"]
+
+
+def test_edited_cards_are_rendered_again(server_url, tmp_path):
+    card_path = tmp_path / "cards/001_chippo.json"
+    assert get_cache_status(f"{server_url}/cards/1.png") == "MISS"
+    assert get_cache_status(f"{server_url}/cards/1.png") == "HIT"
+
+    card_path.write_text(card_path.read_text().replace("Chippo", "Chippo "))
+    os.utime(card_path, ns=(1, 1))
+    assert get_cache_status(f"{server_url}/cards/1.png") == "MISS"
+
+    (tmp_path / "images").mkdir(exist_ok=True)
+    Image.new("RGB", (64, 64), "red").save(tmp_path / "images/001_chippo.png")
+    assert get_cache_status(f"{server_url}/cards/1.png") == "MISS"
+    assert get_cache_status(f"{server_url}/cards/1.png") == "HIT"
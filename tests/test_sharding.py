@@ -0,0 +1,59 @@
+import os
+import shutil
+from content.sharding import (
+    ShardPlan,
+    get_pending_shards,
+    get_shard_result_path,
+    load_shard_result,
+    merge_shards,
+    run_shard,
+)
+from generate import get_classic_collection, get_series_elements
+
+
+def create_plan(seed: int, n_monsters: int, shard_dir: str) -> ShardPlan:
+    collection = get_classic_collection()
+    series_elements = get_series_elements(collection, n_monsters)
+    plan = ShardPlan.create(collection, seed, [e.name for e in series_elements], 3)
+    plan.save(shard_dir)
+    return plan
+
+
+def run_all_shards(plan: ShardPlan, shard_dir: str):
+    for shard_id in get_pending_shards(plan, shard_dir):
+        run_shard(get_classic_collection(), plan, shard_id, shard_dir)
+
+
+def test_new_plan_does_not_reuse_old_results(workdir):
+    shard_dir = str(workdir / "shards")
+    old_plan = create_plan(5, 1, shard_dir)
+    run_all_shards(old_plan, shard_dir)
+    old_result_path = str(workdir / "old_result.json")
+    shutil.copy(get_shard_result_path(shard_dir, 0), old_result_path)
+
+    new_plan = create_plan(9, 4, shard_dir)
+    assert new_plan.plan_id != old_plan.plan_id
+    assert not os.path.exists(get_shard_result_path(shard_dir, 0))
+    assert get_pending_shards(new_plan, shard_dir) == [0, 1, 2]
+
+    # A stale result that's still in the folder is ignored too.
+    shutil.copy(old_result_path, get_shard_result_path(shard_dir, 0))
+    assert load_shard_result(shard_dir, new_plan, 0) is None
+    assert get_pending_shards(new_plan, shard_dir) == [0, 1, 2]
+
+    run_all_shards(new_plan, shard_dir)
+    collection = get_classic_collection()
+    merge_shards(collection, new_plan, shard_dir)
+    n_series = sum(len(shard.series) for shard in new_plan.shards)
+    assert n_series == 28
+    assert len(collection.cards) >= n_series
+
+
+def test_resume_keeps_finished_shards(workdir):
+    shard_dir = str(workdir / "shards")
+    plan = create_plan(5, 1, shard_dir)
+    run_shard(get_classic_collection(), plan, 1, shard_dir)
+
+    resumed_plan = ShardPlan.load(shard_dir)
+    assert resumed_plan.plan_id == plan.plan_id
+    assert get_pending_shards(resumed_plan, shard_dir) == [0, 2]
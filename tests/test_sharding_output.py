@@ -0,0 +1,78 @@
+import asyncio
+import json
+import pytest
+from content.sharding import (
+    ShardPlan,
+    get_shard_result_path,
+    merge_shards,
+    run_shard,
+)
+from generate import get_classic_collection, get_series_elements
+
+
+@pytest.fixture
+def few_names(monkeypatch):
+    # With only two syllables, the fake GPT suggests the same names for many
+    # cards, so the shards pick names that the merge has to pick again.
+    monkeypatch.setattr("util.fake_gpt_call.SYLLABLES", ["zap", "flo"])
+
+
+def get_cards_json(cards) -> list[dict]:
+    return [
+        {**card.to_json(), "style": card.style, "subject": card.style.subject}
+        for card in cards
+    ]
+
+
+def generate_serial(seed: int, n_monsters: int, concurrency: int = 1):
+    collection = get_classic_collection()
+    collection.collection_seed = seed
+    plans = collection.plan_series(get_series_elements(collection, n_monsters))
+    if concurrency > 1:
+        asyncio.run(collection.generate_series_async(plans, concurrency))
+    else:
+        for plan in plans:
+            collection.generate_series(plan)
+    return collection.cards
+
+
+def generate_sharded(seed: int, n_monsters: int, n_shards: int, shard_dir: str):
+    collection = get_classic_collection()
+    series_elements = get_series_elements(collection, n_monsters)
+    plan = ShardPlan.create(
+        collection, seed, [e.name for e in series_elements], n_shards
+    )
+    plan.save(shard_dir)
+    for shard in plan.shards:
+        run_shard(get_classic_collection(), plan, shard.shard_id, shard_dir)
+
+    collection = get_classic_collection()
+    merge_shards(collection, plan, shard_dir)
+    return plan, collection.cards
+
+
+@pytest.mark.parametrize("seed", [3, 1234])
+def test_sharded_output_is_the_same_as_serial(workdir, few_names, seed):
+    serial_cards = generate_serial(seed, 3)
+    plan, sharded_cards = generate_sharded(seed, 3, 4, str(workdir / "shards"))
+
+    assert len(plan.shards) == 4
+    assert get_cards_json(sharded_cards) == get_cards_json(serial_cards)
+    assert get_cards_json(generate_serial(seed, 3, concurrency=4)) == get_cards_json(
+        serial_cards
+    )
+
+    # Make sure the merge really had names to pick again.
+    shard_names = []
+    for shard in plan.shards:
+        with open(get_shard_result_path(str(workdir / "shards"), shard.shard_id)) as f:
+            result = json.load(f)
+        shard_names += [card["name"] for series in result["series"] for card in series]
+    assert shard_names != [card.name for card in serial_cards]
+
+
+def test_cards_only_depend_on_the_seed(workdir, few_names):
+    cards = generate_serial(7, 2)
+    other_cards = generate_serial(8, 2)
+    assert get_cards_json(cards) == get_cards_json(generate_serial(7, 2))
+    assert get_cards_json(cards) != get_cards_json(other_cards)